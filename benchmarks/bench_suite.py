@@ -0,0 +1,352 @@
+"""Benchmark suite of the main code paths at production scale
+
+Scenarios run offline on synthetic data: index files of `--plugins`
+plugins with `--versions` versions each split between `--sources`
+remotes, a plugin directory of `--local-plugins` plugins and
+`--installs` plugin archives served with `file:` URLs, or by a local
+HTTP server simulating `--latency` and `--bandwidth`.
+
+Scenarios:
+
+    parse    Parse the XML index files
+    update   Fetch the index files and write the precompiled index
+    latest   Resolve the latest version of plugins with a fresh remote
+    search   Full-text search of plugins with a fresh remote
+    list     Scan the plugin directory, with cold and warm metadata cache
+    table    Print the table of installed plugins
+    install  Install plugins from `file:` URLs
+    download Update and install over HTTP with simulated network conditions
+
+Results are printed as JSON, or written to the `--output` file.
+
+Usage, from the root of the repository:
+
+    python -m benchmarks.bench_suite [--scenario NAME ...] [--output FILE]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+)
+
+from qgis_plugin_manager import local_directory
+from qgis_plugin_manager.definitions import PluginDict
+from qgis_plugin_manager.local_directory import LocalDirectory
+from qgis_plugin_manager.remote import RESOLVE_FIELDS, InstallTask, Remote
+from qgis_plugin_manager.utils import print_table
+from tests.netsim import NetworkSimulator
+
+from . import synthetic
+
+SCENARIOS = ("parse", "update", "latest", "search", "list", "table", "install", "download")
+
+QGIS_VERSION = "3.34"
+
+SEARCH_QUERIES = ("raster", "web server", "hydrolgy", "print export layer", "cloud 42")
+
+# Environment variables changing the paths used by the plugin manager
+ENVIRONMENT = (
+    "QGIS_PLUGIN_MANAGER_CACHE_DIR",
+    "QGIS_PLUGIN_MANAGER_SOURCES_FILE",
+    "QGIS_PLUGIN_MANAGER_ARCHIVE_CACHE_SIZE",
+)
+
+
+def measure(
+    func: Callable[[], Optional[int]],
+    repeat: int,
+    setup: Optional[Callable[[], None]] = None,
+) -> Dict:
+    """Run `func` `repeat` times, `setup` is not measured
+
+    `func` may return the number of processed items.
+    """
+    runs: List[float] = []
+    items = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        items = func()
+        runs.append(time.perf_counter() - start)
+    result = {"best": min(runs), "mean": sum(runs) / len(runs), "runs": runs}
+    if items is not None:
+        result["items"] = items
+    return result
+
+
+class Suite:
+    def __init__(self, folder: Path, args: argparse.Namespace):
+        self.args = args
+        self.folder = folder
+        self.remote_folder = folder.joinpath("remote")
+        self.local_folder = folder.joinpath("local")
+        self.install_folder = folder.joinpath("install")
+
+        archives_folder = folder.joinpath("archives")
+        archives_folder.mkdir()
+        self.archives = {
+            i: synthetic.generate_archive(archives_folder.joinpath(f"plugin_{i}.zip"), i, "1.0.0")
+            for i in range(min(args.installs, args.plugins))
+        }
+        self.xml_files = synthetic.generate_sources(
+            self.remote_folder,
+            args.plugins,
+            args.versions,
+            args.sources,
+            {i: archive.absolute().as_uri() for i, archive in self.archives.items()},
+            args.seed,
+        )
+        self.names = [synthetic.plugin_name(i) for i in range(args.plugins)]
+        self.installs = [synthetic.plugin_name(i) for i in self.archives]
+        synthetic.generate_plugin_directory(self.local_folder, args.local_plugins)
+
+        # Fetch the index files once for the scenarios reading them
+        with contextlib.redirect_stderr(io.StringIO()):
+            Remote(self.remote_folder, QGIS_VERSION).update()
+
+    def remote(self, **kwargs) -> Remote:
+        return Remote(self.remote_folder, QGIS_VERSION, **kwargs)
+
+    def run_parse(self) -> Dict:
+        remote = self.remote()
+        sources = tuple(remote.plugin_collection_files())
+
+        def run() -> int:
+            plugins: PluginDict = {}
+            for source, xml_file in sources:
+                remote._parse_xml(xml_file, plugins, source)
+            return sum(len(versions) for versions in plugins.values())
+
+        return measure(run, self.args.repeat)
+
+    def run_update(self) -> Dict:
+        def setup():
+            # Force downloading the index files
+            for p in self.remote().cache_directory().iterdir():
+                if p.is_file():
+                    p.unlink()
+
+        def run() -> int:
+            remote = self.remote()
+            remote.update(jobs=self.args.jobs)
+            return len(remote.list)
+
+        return measure(run, self.args.repeat, setup)
+
+    def run_latest(self) -> Dict:
+        names = self.names[:: max(1, len(self.names) // self.args.lookups)]
+
+        def run() -> int:
+            remote = self.remote(fields=RESOLVE_FIELDS)
+            for name in names:
+                remote.latest(name, qgis_version=QGIS_VERSION)
+            return len(names)
+
+        return measure(run, self.args.repeat)
+
+    def run_search(self) -> Dict:
+        def run() -> int:
+            remote = self.remote()
+            return sum(len(list(remote.search(query, limit=20))) for query in SEARCH_QUERIES)
+
+        return measure(run, self.args.repeat)
+
+    def run_list(self) -> Dict:
+        def cold():
+            local_directory._METADATA_CACHE.clear()
+
+        def run() -> int:
+            return len(LocalDirectory(self.local_folder).plugin_list())
+
+        return {
+            "cold": measure(run, self.args.repeat, cold),
+            "warm": measure(run, self.args.repeat),
+        }
+
+    def run_table(self) -> Dict:
+        plugins = LocalDirectory(self.local_folder)
+        infos = tuple(
+            filter(None, (plugins.plugin_info(folder) for folder in sorted(plugins.plugin_list()))),
+        )
+
+        def run() -> int:
+            with contextlib.redirect_stdout(io.StringIO()):
+                print_table(
+                    infos,
+                    (
+                        ("Name", lambda p: p.name),
+                        ("Version", lambda p: p.version_str),
+                        ("Folder", lambda p: p.install_folder or ""),
+                    ),
+                )
+            return len(infos)
+
+        return measure(run, self.args.repeat)
+
+    def run_install(self) -> Dict:
+        runs = iter(range(self.args.repeat))
+        root = self.install_folder
+
+        def setup():
+            nonlocal root
+            root = self.install_folder.joinpath(str(next(runs)))
+            root.mkdir(parents=True)
+
+        def run() -> int:
+            remote = self.remote(fields=RESOLVE_FIELDS)
+            tasks = [InstallTask(name, root=root) for name in self.installs]
+            for task, result in remote.install_all(tasks, jobs=self.args.jobs, remove_zip=False):
+                if not isinstance(result, str):
+                    raise result
+            return len(tasks)
+
+        return measure(run, self.args.repeat, setup)
+
+    def run_download(self) -> Dict:
+        args = self.args
+        server = NetworkSimulator(args.latency, args.bandwidth * 1024 if args.bandwidth else None)
+        http_folder = self.folder.joinpath("http")
+        with server:
+            urls = {i: server.add(archive.name, archive.read_bytes()) for i, archive in self.archives.items()}
+            xml_files = synthetic.generate_sources(
+                http_folder,
+                args.plugins,
+                args.versions,
+                args.sources,
+                urls,
+                args.seed,
+                base_url=server.url("").rstrip("/"),
+            )
+            for xml_file in xml_files:
+                server.add(xml_file.name, xml_file.read_bytes())
+
+            def remote(**kwargs) -> Remote:
+                return Remote(http_folder, QGIS_VERSION, **kwargs)
+
+            def clear_cache():
+                shutil.rmtree(remote().cache_directory(), ignore_errors=True)
+
+            def update() -> int:
+                remote().update(jobs=args.jobs)
+                return len(xml_files)
+
+            update_results = measure(update, args.repeat, clear_cache)
+
+            runs = iter(range(args.repeat))
+            root = http_folder
+
+            def setup():
+                nonlocal root
+                root = http_folder.joinpath("install", str(next(runs)))
+                root.mkdir(parents=True)
+                # Download the archives again
+                archives = remote().archives
+                if archives:
+                    shutil.rmtree(archives.directory, ignore_errors=True)
+
+            def install() -> int:
+                tasks = [InstallTask(name, root=root) for name in self.installs]
+                for task, result in remote(fields=RESOLVE_FIELDS).install_all(tasks, jobs=args.jobs):
+                    if not isinstance(result, str):
+                        raise result
+                return len(tasks)
+
+            install_results = measure(install, args.repeat, setup)
+
+        return {
+            "update": update_results,
+            "install": install_results,
+            "requests": len(server.requests),
+            "bytes_sent": server.bytes_sent,
+        }
+
+
+def run(args: argparse.Namespace) -> Dict:
+    for var in ENVIRONMENT:
+        os.environ.pop(var, None)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Do not share the archive cache of the user
+        os.environ["XDG_CACHE_HOME"] = str(Path(tmpdir, "user_cache"))
+        start = time.perf_counter()
+        suite = Suite(Path(tmpdir), args)
+        setup_time = time.perf_counter() - start
+
+        results = {}
+        for scenario in args.scenario or SCENARIOS:
+            with contextlib.redirect_stderr(io.StringIO()):
+                results[scenario] = getattr(suite, f"run_{scenario}")()
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "plugins": args.plugins,
+            "versions": args.versions,
+            "sources": args.sources,
+            "local_plugins": args.local_plugins,
+            "installs": args.installs,
+            "lookups": args.lookups,
+            "jobs": args.jobs,
+            "latency": args.latency,
+            "bandwidth": args.bandwidth,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "setup_seconds": setup_time,
+        "scenarios": results,
+    }
+
+
+def main(argv: Sequence[str]) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--scenario", action="append", choices=SCENARIOS, help="Scenario to run, all by default"
+    )
+    parser.add_argument("--plugins", type=int, default=10000, help="Number of plugins in the indexes")
+    parser.add_argument("--versions", type=int, default=10, help="Number of versions per plugin")
+    parser.add_argument("--sources", type=int, default=3, help="Number of remotes")
+    parser.add_argument("--local-plugins", type=int, default=1000, help="Number of installed plugins")
+    parser.add_argument("--installs", type=int, default=20, help="Number of plugins to install")
+    parser.add_argument("--lookups", type=int, default=1000, help="Number of plugins to resolve")
+    parser.add_argument("--jobs", type=int, default=4, help="Number of parallel downloads")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated latency in seconds")
+    parser.add_argument(
+        "--bandwidth",
+        type=int,
+        default=10240,
+        help="Simulated bandwidth of each connection in KiB/s, 0 for unlimited",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each scenario")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--output", type=Path, help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = json.dumps(run(args), indent=4)
+    if args.output:
+        args.output.write_text(results, encoding="utf8")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,128 @@
+"""Benchmark the sorting of plugin versions in the XML parser
+
+Compare the tuple-rebuilding insertion formerly used in `Remote._parse_xml`
+with the append-then-sort-once implementation, on a synthetic index with many
+versions per plugin listed in random order.
+
+Usage:
+
+    python -m benchmarks.bench_versions [--plugins N] [--versions N]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import timeit
+
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+from qgis_plugin_manager.definitions import Plugin, PluginDict
+from qgis_plugin_manager.remote import Remote
+
+
+def generate_index(path: Path, plugins: int, versions: int, seed: int = 0):
+    rnd = random.Random(seed)
+    elements = []
+    for i in range(plugins):
+        for v in rnd.sample(range(versions), versions):
+            version = f"{v // 100}.{(v // 10) % 10}.{v % 10}"
+            elements.append(
+                f'<pyqgis_plugin name="plugin_{i}" version="{version}">'
+                f"<file_name>plugin_{i}.{version}.zip</file_name>"
+                f"<download_url>https://foo.bar/plugin_{i}.{version}.zip</download_url>"
+                "</pyqgis_plugin>"
+            )
+    path.write_text(f"<plugins>{''.join(elements)}</plugins>")
+
+
+def legacy_insert(parsed: Sequence[Plugin]) -> PluginDict:
+    """Insertion algorithm formerly used in `_parse_xml`"""
+    plugins: PluginDict = {}
+    for plugin in parsed:
+        name = plugin.name
+        versions = plugins.get(name)
+        if versions:
+            key = plugin.version_key
+            if key < versions[-1].version_key:
+                plugins[name] = (*versions, plugin)
+            elif key > versions[0].version_key:
+                plugins[name] = (plugin, *versions)
+            else:
+                for i, p in enumerate(versions):
+                    if key > p.version_key:
+                        plugins[name] = (*versions[:i], plugin, *versions[i:])
+                        break
+                else:
+                    plugins[name] = (*versions, plugin)
+        else:
+            plugins[name] = (plugin,)
+    return plugins
+
+
+def sorted_insert(parsed: Sequence[Plugin]) -> PluginDict:
+    """Append then sort once, as done in `_parse_xml`"""
+    collected: Dict[str, List[Plugin]] = {}
+    for plugin in parsed:
+        collected.setdefault(plugin.name, []).append(plugin)
+    plugins: PluginDict = {}
+    for name, versions in collected.items():
+        versions.sort(key=lambda p: p.version_key, reverse=True)
+        plugins[name] = tuple(versions)
+    return plugins
+
+
+def best_of(func: Callable, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def run(plugins: int, versions: int, repeat: int, seed: int = 0) -> Dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        xml_file = Path(tmpdir, "plugins.xml")
+        generate_index(xml_file, plugins, versions, seed)
+
+        remote = Remote(Path(tmpdir))
+
+        def parse() -> PluginDict:
+            result: PluginDict = {}
+            remote._parse_xml(xml_file, result)
+            return result
+
+        parse_time = best_of(parse, repeat)
+
+        # Plugin versions in random order
+        parsed = [p for plugin_versions in parse().values() for p in plugin_versions]
+    random.Random(seed).shuffle(parsed)
+
+    assert legacy_insert(parsed) == sorted_insert(parsed)
+
+    legacy = best_of(lambda: legacy_insert(parsed), repeat)
+    current = best_of(lambda: sorted_insert(parsed), repeat)
+
+    return {
+        "plugins": plugins,
+        "versions_per_plugin": versions,
+        "parse_xml_seconds": parse_time,
+        "legacy_insert_seconds": legacy,
+        "sorted_insert_seconds": current,
+        "speedup": legacy / current,
+    }
+
+
+def main(argv: Sequence[str]) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--plugins", type=int, default=100, help="Number of plugins")
+    parser.add_argument("--versions", type=int, default=200, help="Number of versions per plugin")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best is reported")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run(args.plugins, args.versions, args.repeat), indent=4))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
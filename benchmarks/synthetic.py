@@ -0,0 +1,178 @@
+"""Generators of synthetic plugin indexes, archives and plugin directories
+
+Data are generated from a seed, so that benchmarks are reproducible.
+"""
+
+import random
+import zipfile
+
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Sequence,
+)
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "map",
+    "layer",
+    "raster",
+    "vector",
+    "server",
+    "web",
+    "processing",
+    "style",
+    "print",
+    "export",
+    "import",
+    "network",
+    "terrain",
+    "cloud",
+    "database",
+    "geocoding",
+    "routing",
+    "survey",
+    "cadastre",
+    "hydrology",
+)
+
+
+def plugin_name(i: int) -> str:
+    """Name of the i-th synthetic plugin"""
+    return f"{WORDS[i % len(WORDS)].title()} {WORDS[(i // len(WORDS)) % len(WORDS)].title()} {i}"
+
+
+def plugin_folder(i: int) -> str:
+    """Folder of the i-th synthetic plugin"""
+    return f"plugin_{i}"
+
+
+def version_str(v: int) -> str:
+    return f"{v // 100}.{(v // 10) % 10}.{v % 10}"
+
+
+def plugin_element(
+    name: str,
+    version: str,
+    download_url: str,
+    rnd: random.Random,
+    experimental: bool = False,
+) -> str:
+    tags = ",".join(rnd.sample(WORDS, 4))
+    description = " ".join(rnd.choices(WORDS, k=12))
+    return (
+        f'<pyqgis_plugin name="{escape(name)}" version="{version}">'
+        f"<description><![CDATA[{description}]]></description>"
+        f"<about><![CDATA[{description} {description}]]></about>"
+        f"<version>{version}</version>"
+        "<qgis_minimum_version>3.4.0</qgis_minimum_version>"
+        "<qgis_maximum_version>3.99.0</qgis_maximum_version>"
+        f"<file_name>{escape(name)}.{version}.zip</file_name>"
+        f"<author_name>Author {rnd.randrange(1000)}</author_name>"
+        f"<download_url>{escape(download_url)}</download_url>"
+        f"<experimental>{experimental}</experimental>"
+        "<deprecated>False</deprecated>"
+        f"<tags><![CDATA[{tags}]]></tags>"
+        "</pyqgis_plugin>\n"
+    )
+
+
+def generate_index(
+    path: Path,
+    plugins: Sequence[int],
+    versions: int,
+    seed: int = 0,
+    urls: Optional[Dict[int, str]] = None,
+):
+    """Write a `plugins.xml` file with `versions` versions of each plugin
+
+    Plugins are given by their number. `urls` are the download URLs
+    of the archives of plugins, by plugin number.
+    """
+    rnd = random.Random(seed)
+    with path.open("w", encoding="utf8") as f:
+        f.write("<plugins>\n")
+        for i in plugins:
+            name = plugin_name(i)
+            archive_url = (urls or {}).get(i)
+            # Versions are listed in random order
+            for v in rnd.sample(range(versions), versions):
+                version = version_str(v)
+                url = archive_url or f"https://foo.bar/{plugin_folder(i)}/{version}"
+                # The latest version is experimental for some plugins
+                experimental = v == versions - 1 and i % 5 == 0
+                f.write(plugin_element(name, version, url, rnd, experimental))
+        f.write("</plugins>\n")
+
+
+def metadata(i: int, version: str) -> str:
+    return (
+        "[general]\n"
+        f"name={plugin_name(i)}\n"
+        f"version={version}\n"
+        "qgisMinimumVersion=3.4\n"
+        f"author=Author {i}\n"
+        "server=False\n"
+        "experimental=False\n"
+    )
+
+
+def generate_archive(path: Path, i: int, version: str, files: int = 10, file_size: int = 4096) -> Path:
+    """Write the archive of the i-th plugin"""
+    rnd = random.Random(i)
+    folder = plugin_folder(i)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr(f"{folder}/__init__.py", "def classFactory(iface):\n    pass\n")
+        z.writestr(f"{folder}/metadata.txt", metadata(i, version))
+        for n in range(files):
+            z.writestr(f"{folder}/module_{n}.py", rnd.randbytes(file_size).hex())
+    return path
+
+
+def generate_sources(
+    folder: Path,
+    plugins: int,
+    versions: int,
+    sources: int = 3,
+    urls: Optional[Dict[int, str]] = None,
+    seed: int = 0,
+    base_url: Optional[str] = None,
+) -> List[Path]:
+    """Write `sources` index files and the `sources.list` referencing them
+
+    Plugins are split between the sources, the last plugins of each
+    source are also published by the next source. Index files are
+    referenced with `file:` URLs, or relative to `base_url`.
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    per_source = -(-plugins // sources)
+    overlap = per_source // 10
+    indexes = []
+    for s in range(sources):
+        start = s * per_source
+        numbers = range(max(0, start - overlap), min(plugins, start + per_source))
+        index = folder.joinpath(f"plugins_{s}.xml")
+        generate_index(index, numbers, versions, seed + s, urls)
+        indexes.append(index)
+    folder.joinpath("sources.list").write_text(
+        "".join(
+            f"{base_url}/{index.name}\n" if base_url else f"{index.absolute().as_uri()}\n"
+            for index in indexes
+        ),
+        encoding="utf8",
+    )
+    return indexes
+
+
+def generate_plugin_directory(folder: Path, plugins: int, files: int = 5):
+    """Create a plugin directory with `plugins` installed plugins"""
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(plugins):
+        p = folder.joinpath(plugin_folder(i))
+        p.mkdir()
+        p.joinpath("__init__.py").write_text("def classFactory(iface):\n    pass\n")
+        p.joinpath("metadata.txt").write_text(metadata(i, "1.0.0"))
+        for n in range(files):
+            p.joinpath(f"module_{n}.py").touch()
@@ -1,36 +1,43 @@
 import argparse
 import os
+import sys
 
 from argparse import Namespace
+from contextlib import closing
 from pathlib import Path
 from typing import (
+    TYPE_CHECKING,
     Callable,
     Iterator,
+    List,
     Optional,
     Sequence,
 )
 
-from semver import Version
-
-from qgis_plugin_manager import echo
-from qgis_plugin_manager.definitions import Plugin
-from qgis_plugin_manager.local_directory import LocalDirectory
-from qgis_plugin_manager.remote import (
+from qgis_plugin_manager import echo, metrics, timings
+from qgis_plugin_manager.utils import (
+    DEFAULT_JOBS,
+    PluginManagerError,
     PluginNotFoundError,
     PluginVersionNotFoundError,
-    Remote,
     SourcesNotFoundError,
-)
-from qgis_plugin_manager.utils import (
-    PluginManagerError,
     get_semver_version,
     get_semver_version_str,
     install_epilog,
+    parse_limit,
+    parse_owner,
     print_json,
     print_table,
     qgis_server_version,
 )
 
+# Commands import the modules they use, the remote module and its
+# dependencies are not loaded by commands working on local plugins only
+if TYPE_CHECKING:
+    from semver import Version
+
+    from qgis_plugin_manager.definitions import Plugin
+
 cli = argparse.ArgumentParser(
     formatter_class=argparse.ArgumentDefaultsHelpFormatter,
 )
@@ -43,10 +50,32 @@ cli.add_argument(
     help="Activate verbose (debug) mode",
 )
 
+cli.add_argument(
+    "--timings",
+    action="store_true",
+    help="Report the duration of each phase of the command, per plugin, on the standard error",
+)
 
-subparsers = cli.add_subparsers(
-    title="commands",
-    description="qgis-plugin-manager command",
+cli.add_argument(
+    "--timings-format",
+    choices=("text", "json"),
+    default="text",
+    help="Format of the timings report",
+)
+
+cli.add_argument(
+    "--profile",
+    metavar="FILE",
+    type=Path,
+    help="Write the cProfile statistics of the command to FILE",
+)
+
+cli.add_argument(
+    "--metrics-file",
+    metavar="FILE",
+    type=Path,
+    default=os.getenv("QGIS_PLUGIN_MANAGER_METRICS_FILE"),
+    help="Write the metrics of the command to FILE, in the Prometheus text format",
 )
 
 
@@ -61,6 +90,44 @@ def set_default_from_env(kwargs: dict):
                 kwargs["default"] = value
 
 
+class CommandParser(argparse.ArgumentParser):
+    """Parser of a command
+
+    Arguments are added when the command is parsed or its help is
+    formatted, so that only the arguments of the invoked command are
+    set up.
+    """
+
+    def __init__(self, *args, options: Sequence = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self._options = list(options)
+
+    def _setup(self):
+        options, self._options = self._options, []
+        for opt in options:
+            set_default_from_env(opt[1])
+            self.add_argument(*opt[0], **opt[1])
+
+    def parse_known_args(self, args=None, namespace=None):  # type: ignore [override]
+        self._setup()
+        return super().parse_known_args(args, namespace)
+
+    def format_usage(self) -> str:
+        self._setup()
+        return super().format_usage()
+
+    def format_help(self) -> str:
+        self._setup()
+        return super().format_help()
+
+
+subparsers = cli.add_subparsers(
+    title="commands",
+    description="qgis-plugin-manager command",
+    parser_class=CommandParser,
+)
+
+
 def command(name: str, **kwargs) -> Callable:
     """Wrap subcommand function"""
 
@@ -70,11 +137,8 @@ def command(name: str, **kwargs) -> Callable:
         else:
             func = fun
             options = ()
-        parser = subparsers.add_parser(name, description=func.__doc__, **kwargs)
-        for opt in options:
-            set_default_from_env(opt[1])
-            parser.add_argument(*opt[0], **opt[1])
-        parser.set_defaults(func=func)
+        parser = subparsers.add_parser(name, description=func.__doc__, options=options, **kwargs)
+        parser.set_defaults(func=func, command=name)
 
     return decorator
 
@@ -97,17 +161,31 @@ def argument(*args, **kwargs):
 #
 
 
-def get_plugin_path() -> Path:
-    """Get the plugin path"""
+def get_plugin_paths() -> List[Path]:
+    """Get the plugin paths
+
+    QGIS_PLUGINPATH may hold several directories separated by the
+    path separator of the platform: plugins are installed in the
+    first one.
+    """
     qgis_plugin_path = os.environ.get("QGIS_PLUGINPATH")
-    if qgis_plugin_path:
+    plugin_paths = [Path(p) for p in qgis_plugin_path.split(os.pathsep) if p] if qgis_plugin_path else []
+    if plugin_paths:
         # Except if the QGIS_PLUGINPATH is set
-        plugin_path = Path(qgis_plugin_path)
-        echo.info(f"Plugin's directory set by environment variable : {plugin_path.absolute()}\n")
+        directories = ", ".join(str(p.absolute()) for p in plugin_paths)
+        if len(plugin_paths) == 1:
+            echo.info(f"Plugin's directory set by environment variable : {directories}\n")
+        else:
+            echo.info(f"Plugin's directories set by environment variable : {directories}\n")
     else:
-        plugin_path = Path(".")
-        echo.info(f"Plugin's directory set to current directory : {plugin_path.absolute()}\n")
-    return plugin_path
+        plugin_paths = [Path(".")]
+        echo.info(f"Plugin's directory set to current directory : {plugin_paths[0].absolute()}\n")
+    return plugin_paths
+
+
+def get_plugin_path() -> Path:
+    """Get the plugin path where plugins are installed"""
+    return get_plugin_paths()[0]
 
 
 #
@@ -145,6 +223,9 @@ def show_version(args):
                     "QGIS_PLUGIN_MANAGER_INCLUDE_PRERELEASE",
                     "QGIS_PLUGIN_MANAGER_QGIS_VERSION",
                     "QGIS_PLUGIN_MANAGER_DEFAULT_SOURCE_URL",
+                    "QGIS_PLUGIN_MANAGER_JOBS",
+                    "QGIS_PLUGIN_MANAGER_ARCHIVE_CACHE_SIZE",
+                    "QGIS_PLUGIN_MANAGER_METRICS_FILE",
                     "QGSRV_SERVER_PLUGINPATH",
                 )
             ),
@@ -163,6 +244,8 @@ def show_version(args):
 )
 @argument("-u", "--update", action="store_true", help="Update index file")
 def init_sources(args: Namespace):
+    from qgis_plugin_manager.remote import Remote
+
     # Local needed only, with QGIS version
     qgis_version = args.qgis_version
     if qgis_version == "auto":
@@ -203,13 +286,15 @@ def init_sources(args: Namespace):
 )
 def list_plugins(args: Namespace):
     """List all installed plugins"""
+    from qgis_plugin_manager.local_directory import LocalDirectory
+
     qgis_version = qgis_server_version()
 
     if not (args.outdated_target is None or args.outdated):
         echo.critical("'outdated-target' option is only usable with the '--outdated' option")
         cli.exit(1)
 
-    plugins = LocalDirectory(get_plugin_path())
+    plugins = LocalDirectory(get_plugin_paths())
 
     def infos():
         for folder, name in sorted(
@@ -223,14 +308,19 @@ def list_plugins(args: Namespace):
     if args.format == "freeze":
         echo.alert("'freeze' is deprecated, use 'list' instead")
 
-    def install_folder(p: Plugin) -> str:
+    def install_folder(p: "Plugin") -> str:
         if p.install_folder:
+            if plugins.root(p.install_folder) != plugins.folder:
+                # Plugin from another plugin directory
+                return str(plugins.path(p.install_folder))
             return p.install_folder if p.install_folder != p.name else ""
         else:
             return ""
 
     if args.outdated:
-        remote = Remote(plugins.folder, qgis_version=qgis_version)
+        from qgis_plugin_manager.remote import RESOLVE_FIELDS, Remote
+
+        remote = Remote(plugins.folder, qgis_version=qgis_version, fields=RESOLVE_FIELDS)
 
         def outdated():
             for info in infos():
@@ -240,7 +330,7 @@ def list_plugins(args: Namespace):
                     qgis_version=args.outdated_target,
                 )
                 if latest:
-                    if latest.version <= info.version:
+                    if latest.version_key <= info.version_key:
                         continue
                     latest_ver = latest.version_str
                     latest_src = latest.source or ""
@@ -250,6 +340,7 @@ def list_plugins(args: Namespace):
                 yield (info, latest_ver, latest_src)
 
         outdated_list = tuple(outdated())
+        metrics.set_value("outdated_plugins", sum(1 for o in outdated_list if o[1] != "Removed"))
         if args.format == "list":
             for info, latest_ver in outdated_list:
                 if latest_ver == "Removed":
@@ -325,6 +416,17 @@ def list_plugins(args: Namespace):
     action="store_true",
     help="Set files permissions to 0644",
 )
+@argument(
+    "--chown",
+    metavar="OWNER[:GROUP]",
+    type=parse_owner,
+    help="Set the owner and group of the installed files",
+)
+@argument(
+    "--incremental",
+    action="store_true",
+    help="Update the installed plugin in place, writing only changed files",
+)
 @argument(
     "--pre",
     action="store_true",
@@ -335,19 +437,31 @@ def list_plugins(args: Namespace):
     """,
 )
 @argument("--deprecated", action="store_true", help="Include deprecated versions")
+@argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    env="QGIS_PLUGIN_MANAGER_JOBS",
+    help="Maximum number of concurrent downloads",
+)
 def install_plugin(args: Namespace):
     """The version may be specified by appending the suffix '==version'.
     'plugin_name' might require quotes if there is space in its name.
     """
-    plugin_path = get_plugin_path()
+    from qgis_plugin_manager.local_directory import LocalDirectory
+    from qgis_plugin_manager.remote import RESOLVE_FIELDS, InstallTask, Remote
+
+    plugin_paths = get_plugin_paths()
 
     qgis = qgis_server_version()
     echo.info(f"QGIS version:  {qgis or 'Unknown'}")
 
-    remote = Remote(plugin_path, qgis_version=qgis)
-    plugins = LocalDirectory(plugin_path)
+    remote = Remote(plugin_paths[0], qgis_version=qgis, fields=RESOLVE_FIELDS)
+    plugins = LocalDirectory(plugin_paths)
 
     installed = 0
+    tasks = []
 
     for arg in args.plugin_name:
         echo.debug(f"Installing {arg}")
@@ -370,7 +484,7 @@ def install_plugin(args: Namespace):
             if plugin_version is None and args.upgrade:
                 # Asked for upgrade
                 latest = remote.latest(plugin_name, args.pre, args.deprecated)
-                if latest and latest.version == plugin_info.version:
+                if latest and latest.version_key == plugin_info.version_key:
                     echo.alert(f"\t{plugin_name}=={plugin_info.version} is already at latest version")
                     continue
             elif plugin_version is None:
@@ -379,31 +493,51 @@ def install_plugin(args: Namespace):
             elif plugin_info.version == get_semver_version_str(plugin_version):
                 echo.alert(f"\t{plugin_name}=={plugin_version} already installed")
                 continue
-        try:
-            install_version = remote.install(
+        tasks.append(
+            InstallTask(
                 plugin_name=plugin_name,
                 version=plugin_version,
                 plugin_folder=plugin_info.install_folder if plugin_info else None,
                 include_prerelease=args.pre,
                 include_deprecated=args.deprecated,
-                fix_permissions=args.fix_permissions,
-            )
-        except PluginVersionNotFoundError:
-            echo.alert(f"No matching version found for '{plugin_name}=={plugin_version}'.")
-            cli.exit(1)
-        except PluginNotFoundError:
-            echo.alert(f"No matching plugin found for '{plugin_name}'.")
-            similars = remote.check_similar_names(plugin_name)
-            name = next(similars, None)
-            if name:
-                echo.info(f"\n'{plugin_name}' not found. Plugins with similar name:")
-                echo.info(f"\t{name}")
-                for name in similars:
-                    echo.info(name)
-            cli.exit(1)
-        else:
-            echo.success(f"\tOk {plugin_name} {install_version}")
-            installed += 1
+                root=plugins.root(plugin_info.install_folder)
+                if plugin_info and plugin_info.install_folder
+                else None,
+            ),
+        )
+
+    results = remote.install_all(
+        tasks,
+        jobs=args.jobs,
+        fix_permissions=args.fix_permissions,
+        owner=args.chown,
+        incremental=args.incremental,
+    )
+    metrics.set_value("plugins_installed", 0)
+    metrics.set_value("plugins_failed", 0)
+    with closing(results):
+        for task, result in results:
+            if isinstance(result, PluginManagerError):
+                metrics.add("plugins_failed")
+            if isinstance(result, PluginVersionNotFoundError):
+                echo.alert(f"No matching version found for '{task.plugin_name}=={task.version}'.")
+                cli.exit(1)
+            elif isinstance(result, PluginNotFoundError):
+                echo.alert(f"No matching plugin found for '{task.plugin_name}'.")
+                similars = remote.check_similar_names(task.plugin_name)
+                name = next(similars, None)
+                if name:
+                    echo.info(f"\n'{task.plugin_name}' not found. Plugins with similar name:")
+                    echo.info(f"\t{name}")
+                    for name in similars:
+                        echo.info(name)
+                cli.exit(1)
+            elif isinstance(result, PluginManagerError):
+                raise result
+            else:
+                echo.success(f"\tOk {task.plugin_name} {result}")
+                metrics.add("plugins_installed")
+                installed += 1
 
     if installed > 0:
         install_epilog()
@@ -413,8 +547,10 @@ def install_plugin(args: Namespace):
 @command("remove", help="Remove a plugin by its name")
 @argument("plugin_name", help="The plugin to remove")
 def remove_plugin(args: Namespace):
+    from qgis_plugin_manager.local_directory import LocalDirectory
+
     # Local needed only, without QGIS version
-    plugins = LocalDirectory(get_plugin_path())
+    plugins = LocalDirectory(get_plugin_paths())
     if not plugins.remove(args.plugin_name):
         cli.exit(1)
 
@@ -432,6 +568,17 @@ def remove_plugin(args: Namespace):
     action="store_true",
     help="Set files permissions to 0644",
 )
+@argument(
+    "--chown",
+    metavar="OWNER[:GROUP]",
+    type=parse_owner,
+    help="Set the owner and group of the installed files",
+)
+@argument(
+    "--incremental",
+    action="store_true",
+    help="Update the installed plugin in place, writing only changed files",
+)
 @argument(
     "--pre",
     action="store_true",
@@ -441,15 +588,27 @@ def remove_plugin(args: Namespace):
     ),
 )
 @argument("--deprecated", action="store_true", help="Include deprecated versions")
+@argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    env="QGIS_PLUGIN_MANAGER_JOBS",
+    help="Maximum number of concurrent downloads",
+)
 def upgrade_plugins(args: Namespace):
     """Upgrade all plugins for which a
     newer version is available
     """
-    plugin_path = get_plugin_path()
+    from qgis_plugin_manager.local_directory import LocalDirectory
+    from qgis_plugin_manager.remote import RESOLVE_FIELDS, InstallTask, Remote
+
+    plugin_paths = get_plugin_paths()
+    plugin_path = plugin_paths[0]
 
     qgis = qgis_server_version()
-    remote = Remote(plugin_path, qgis_version=qgis)
-    plugins = LocalDirectory(plugin_path)
+    remote = Remote(plugin_path, qgis_version=qgis, fields=RESOLVE_FIELDS)
+    plugins = LocalDirectory(plugin_paths)
     folders = plugins.plugin_list()
 
     # Check for ignored plugins
@@ -461,6 +620,7 @@ def upgrade_plugins(args: Namespace):
 
     installed = 0
     failures = 0
+    tasks = []
 
     for folder in folders:
         plugin_info = plugins.plugin_info(folder)
@@ -474,7 +634,7 @@ def upgrade_plugins(args: Namespace):
 
         if not args.force:
             latest = remote.latest(plugin_info.name, args.pre, args.deprecated)
-            if latest and latest.version == plugin_info.version:
+            if latest and latest.version_key == plugin_info.version_key:
                 echo.success(f"\t\u274e {plugin_info.name:<25} {plugin_info.version_str:<12}\tUnchanged")
                 continue
             elif latest is None:
@@ -484,26 +644,41 @@ def upgrade_plugins(args: Namespace):
         else:
             version = None
 
-        # Need to check version
-        try:
-            install_version = remote.install(
+        tasks.append(
+            InstallTask(
                 plugin_name=plugin_info.name,
                 version=version,
                 plugin_folder=plugin_info.install_folder,
-                fix_permissions=args.fix_permissions,
                 include_prerelease=args.pre,
                 include_deprecated=args.deprecated,
-            )
-        except PluginNotFoundError:
-            echo.alert(f"\t\u26a0\ufe0f {plugin_info.name:<25}\tNot found")
-            failures += 1
-        except PluginManagerError as err:
-            failures += 1
-            echo.critical(f"\t\u274c {plugin_info.name:<25}\tError: {err}")
-        else:
-            installed += 1
-            echo.success(f"\t\u2705 {plugin_info.name:<25} {install_version:<12}\tInstalled")
+                root=plugins.root(folder),
+            ),
+        )
 
+    if not args.force:
+        metrics.set_value("outdated_plugins", len(tasks))
+
+    results = remote.install_all(
+        tasks,
+        jobs=args.jobs,
+        fix_permissions=args.fix_permissions,
+        owner=args.chown,
+        incremental=args.incremental,
+    )
+    with closing(results):
+        for task, result in results:
+            if isinstance(result, PluginNotFoundError):
+                echo.alert(f"\t\u26a0\ufe0f {task.plugin_name:<25}\tNot found")
+                failures += 1
+            elif isinstance(result, PluginManagerError):
+                failures += 1
+                echo.critical(f"\t\u274c {task.plugin_name:<25}\tError: {result}")
+            else:
+                installed += 1
+                echo.success(f"\t\u2705 {task.plugin_name:<25} {result:<12}\tInstalled")
+
+    metrics.set_value("plugins_installed", installed)
+    metrics.set_value("plugins_failed", failures)
     if failures > 0:
         echo.alert(f"Command terminated with {failures} errors")
         cli.exit(1)
@@ -513,15 +688,29 @@ def upgrade_plugins(args: Namespace):
 
 @command("remotes", help="List all remote sources")
 def list_remote_servers(args: Namespace):
+    from qgis_plugin_manager.remote import Remote
+
     remote = Remote(get_plugin_path(), qgis_server_version())
     remote.print_list()
 
 
 # Update
 @command("update", help="Update all index files")
+@argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    env="QGIS_PLUGIN_MANAGER_JOBS",
+    help="Maximum number of concurrent downloads",
+)
 def update_index(args: Namespace):
+    from qgis_plugin_manager.remote import Remote
+
     remote = Remote(get_plugin_path(), qgis_server_version())
-    remote.update()
+    if not remote.update(jobs=args.jobs):
+        echo.alert("Some remotes could not be updated")
+        cli.exit(1)
 
 
 # Cache (Deprecated)
@@ -559,13 +748,14 @@ def plugin_versions(args: Namespace):
 
 
 def plugin_versions_impl(args: Namespace):
+    from qgis_plugin_manager.remote import Remote
+
     remote = Remote(get_plugin_path(), qgis_server_version())
-    plugins = remote.available_plugins()
 
-    versions = plugins.get(args.plugin_name)
+    versions = remote.versions(args.plugin_name)
     if versions:
 
-        def results() -> Iterator[Plugin]:
+        def results() -> Iterator["Plugin"]:
             for plugin in versions:
                 if plugin.is_pre() and not args.pre:
                     continue
@@ -596,7 +786,7 @@ def plugin_versions_impl(args: Namespace):
                 ),
             )
         else:
-            def display_status(p: Plugin) -> str:
+            def display_status(p: "Plugin") -> str:
                 st: Sequence[str] = ()
                 if p.server:
                     st = (*st, "S")
@@ -627,7 +817,21 @@ def plugin_versions_impl(args: Namespace):
 
 # Search
 @command("search", help="Search for plugins")
-@argument("plugin_name", help="Search in tags and plugin names")
+@argument(
+    "plugin_name",
+    nargs="?",
+    default="",
+    help="Search in plugin names, tags and descriptions",
+)
+@argument(
+    "-t",
+    "--tag",
+    dest="tags",
+    action="append",
+    metavar="TAG",
+    help="Consider only plugins with the tag TAG, may be repeated",
+)
+@argument("-n", "--limit", type=parse_limit, help="Display at most LIMIT results")
 @argument("--server", action="store_true", help="Consider only server plugins")
 @argument("--trusted", action="store_true", help="Consider only trusted plugins")
 @argument(
@@ -642,6 +846,13 @@ def plugin_versions_impl(args: Namespace):
 @argument("--deprecated", action="store_true", help="Include deprecated versions")
 @argument("--latest", action="store_true", help="Consider only latest versions")
 def search_plugin(args: Namespace):
+    """Results are sorted by relevance"""
+    from qgis_plugin_manager.remote import Remote
+
+    if not (args.plugin_name or args.tags):
+        echo.critical("A search string or a tag is required")
+        cli.exit(1)
+
     remote = Remote(get_plugin_path(), qgis_server_version())
 
     def pred(p):
@@ -656,9 +867,12 @@ def search_plugin(args: Namespace):
         return True
 
     found = 0
-    for plugin in sorted(
-        remote.search(args.plugin_name, predicat=pred, latest=args.latest),
-        key=lambda p: p.name,
+    for plugin in remote.search(
+        args.plugin_name,
+        predicat=pred,
+        latest=args.latest,
+        tags=args.tags,
+        limit=args.limit,
     ):
         echo.echo(f"{plugin.name}=={plugin.version_str}")
         found += 1
@@ -682,8 +896,9 @@ def check_qgis_compat(args: Namespace):
     """If version is not specified then check against the current QGIS
     installation
     """
+    from qgis_plugin_manager.local_directory import LocalDirectory
 
-    def get_version() -> Version:
+    def get_version() -> "Version":
         ver = args.version if args.version else qgis_server_version()
         if not ver:
             cli.exit(1)
@@ -695,7 +910,7 @@ def check_qgis_compat(args: Namespace):
 
     version = get_version()
 
-    plugins = LocalDirectory(get_plugin_path())
+    plugins = LocalDirectory(get_plugin_paths())
 
     def infos():
         for folder, name in sorted(
@@ -730,6 +945,40 @@ def check_qgis_compat(args: Namespace):
         )
 
 
+# Verify
+@command("verify", help="Check installed plugins for local modifications")
+def verify_plugins(args: Namespace):
+    """Compare the files of the installed plugins with the files
+    recorded at installation.
+    """
+    from qgis_plugin_manager.local_directory import LocalDirectory
+
+    plugins = LocalDirectory(get_plugin_paths())
+
+    modified_plugins = 0
+    for folder, name in sorted(plugins.plugin_list().items(), key=lambda p: p[1]):
+        changes = plugins.verify(folder)
+        if changes is None:
+            echo.alert(f"\t\u26a0\ufe0f {name:<25}\tNot installed by qgis-plugin-manager")
+            continue
+
+        modified, missing, added = changes
+        if modified or missing or added:
+            modified_plugins += 1
+            echo.critical(
+                f"\t\u274c {name:<25}\t{len(modified)} modified, {len(missing)} missing, {len(added)} added",
+            )
+            for label, files in (("modified", modified), ("missing", missing), ("added", added)):
+                for file in files:
+                    echo.debug("\t\t{}: {}", label, file)
+        else:
+            echo.success(f"\t\u2705 {name:<25}\tOk")
+
+    if modified_plugins > 0:
+        echo.alert(f"{modified_plugins} plugins locally modified")
+        cli.exit(1)
+
+
 def main() -> None:
     """Main function for the CLI menu."""
 
@@ -739,14 +988,45 @@ def main() -> None:
         cli.exit(1)
     else:
         echo.set_verbose_mode(args.verbose)
+        timings.TIMINGS.start(args.command)
+        profiler = None
+        if args.profile:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        success = False
         try:
             args.func(args)
+            success = True
         except SourcesNotFoundError:
             echo.alert("No remote sources found, maybe your forgot to run 'init'")
             cli.exit(1)
         except PluginManagerError as e:
             echo.critical(f"{e}")
             cli.exit(1)
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+                echo.info(f"Profile written to {args.profile}")
+            # Only if the command used the network
+            connections = sys.modules.get("qgis_plugin_manager.connections")
+            if connections:
+                connections.report()
+                connections.POOL.close()
+            if args.timings:
+                timings.TIMINGS.report(args.timings_format)
+            if args.metrics_file:
+                write_metrics(args.metrics_file, args.command, success)
+
+
+def write_metrics(path: Path, command: str, success: bool):
+    """Write the metrics of the command, errors are not fatal"""
+    try:
+        metrics.METRICS.write(path, command, success)
+    except OSError as err:
+        echo.alert(f"Cannot write metrics to {path}: {err}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+"""Local cache of plugin archives
+
+Archives are stored by the sha256 digest of their content:
+
+    archives/<digest>.zip
+
+Each downloaded archive is referenced by its download URL and version:
+
+    archives/refs/<sha256 of url and version>.json
+
+The cache is shared by all plugin directories of the host, it is stored
+in `$XDG_CACHE_HOME/qgis-plugin-manager/archives` by default.
+
+The size of the cache is bounded: the least recently used archives are
+evicted when the cache grows beyond its maximum size. Archives used by
+the current command, or recently used by another one, are never evicted.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from pathlib import Path
+from typing import (
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from qgis_plugin_manager import echo
+from qgis_plugin_manager.index import file_digest
+from qgis_plugin_manager.utils import atomic_write
+
+# Default maximum size of the cache in MiB
+DEFAULT_ARCHIVE_CACHE_SIZE = 512
+
+# Archives used in the last seconds may be in use by another process
+EVICTION_GRACE_PERIOD = 600
+
+
+def archive_cache_directory() -> Optional[Path]:
+    """Return the directory of the archive cache
+
+    The `archives` folder of QGIS_PLUGIN_MANAGER_CACHE_DIR if set,
+    the user cache directory otherwise.
+
+    Returns None if the user cache directory cannot be determined.
+    """
+    env_path = os.getenv("QGIS_PLUGIN_MANAGER_CACHE_DIR")
+    if env_path:
+        return Path(env_path, "archives")
+
+    xdg_cache = os.getenv("XDG_CACHE_HOME")
+    if xdg_cache and Path(xdg_cache).is_absolute():
+        cache = Path(xdg_cache)
+    else:
+        try:
+            cache = Path.home().joinpath(".cache")
+        except RuntimeError:
+            return None
+    return cache.joinpath("qgis-plugin-manager", "archives")
+
+
+def archive_cache_size() -> int:
+    """Return the maximum size of the archive cache in bytes
+
+    A size of 0 disables the cache.
+    """
+    size = os.getenv("QGIS_PLUGIN_MANAGER_ARCHIVE_CACHE_SIZE")
+    if size:
+        try:
+            return max(0, int(size)) * 1024 * 1024
+        except ValueError:
+            echo.alert(f"Invalid QGIS_PLUGIN_MANAGER_ARCHIVE_CACHE_SIZE: {size}")
+    return DEFAULT_ARCHIVE_CACHE_SIZE * 1024 * 1024
+
+
+class ArchiveCache:
+    """Content-addressed cache of plugin archives"""
+
+    def __init__(self, directory: Path, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        # Archives used by this process
+        self._pinned: Set[Path] = set()
+        self._lock = threading.Lock()
+
+    def _ref(self, url: str, version: str) -> Path:
+        key = hashlib.sha256(f"{url}\0{version}".encode()).hexdigest()
+        return self.directory.joinpath("refs", f"{key}.json")
+
+    def owns(self, path: Path) -> bool:
+        """Check if `path` is an archive of the cache"""
+        return path.parent == self.directory
+
+    def get(self, url: str, version: str) -> Optional[Path]:
+        """Return the cached archive downloaded from `url`
+
+        Returns None if the archive is not in the cache or if its
+        content does not match its digest.
+        """
+        ref = self._ref(url, version)
+        try:
+            entry = json.loads(ref.read_text(encoding="utf8"))
+            archive = self.directory.joinpath(f"{entry['sha256']}.zip")
+            # Mark as recently used, before checking it, so that
+            # other processes do not evict it
+            os.utime(archive)
+            if archive.stat().st_size != entry["size"] or file_digest(archive) != entry["sha256"]:
+                echo.debug("Invalid cached archive {}", archive)
+                archive.unlink(missing_ok=True)
+                ref.unlink(missing_ok=True)
+                return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        with self._lock:
+            self._pinned.add(archive)
+        return archive
+
+    def put(self, url: str, version: str, zip_file: Path, digest: str) -> Path:
+        """Move a downloaded archive into the cache
+
+        Returns the path of the cached archive.
+        """
+        self.directory.joinpath("refs").mkdir(parents=True, exist_ok=True)
+        archive = self.directory.joinpath(f"{digest}.zip")
+        size = zip_file.stat().st_size
+        with self._lock:
+            self._pinned.add(archive)
+        if archive.exists():
+            zip_file.unlink()
+            os.utime(archive)
+        else:
+            try:
+                os.replace(zip_file, archive)
+            except OSError as err:
+                if err.errno != errno.EXDEV:
+                    raise
+                # The cache is on another file system: copy to a
+                # temporary file, never leave a partial archive
+                with zip_file.open("rb") as src, atomic_write(archive) as dst:
+                    shutil.copyfileobj(src, dst)
+                zip_file.unlink()
+
+        entry = {"url": url, "version": version, "sha256": digest, "size": size}
+        try:
+            with atomic_write(self._ref(url, version), "w", encoding="utf8") as f:
+                json.dump(entry, f)
+        except OSError as err:
+            echo.debug("Cannot write reference of cached archive {}: {}", archive.name, err)
+
+        self.evict()
+        return archive
+
+    def evict(self):
+        """Remove the least recently used archives
+        until the cache fits in its maximum size
+
+        Archives used during the grace period are kept, they may be
+        in use by another process sharing the cache.
+        """
+        archives: List[Tuple[int, int, Path]] = []
+        total = 0
+        for p in self.directory.glob("*.zip"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            total += st.st_size
+            archives.append((st.st_mtime_ns, st.st_size, p))
+
+        archives.sort()
+        recent = time.time_ns() - EVICTION_GRACE_PERIOD * 1_000_000_000
+        for mtime_ns, size, p in archives:
+            if total <= self.max_size or mtime_ns > recent:
+                break
+            with self._lock:
+                if p in self._pinned:
+                    continue
+            echo.debug("Evicting cached archive {}", p.name)
+            p.unlink(missing_ok=True)
+            total -= size
+        # References to evicted archives are replaced on the next download
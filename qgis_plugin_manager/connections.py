@@ -0,0 +1,276 @@
+"""Pool of persistent HTTP connections
+
+Connections are kept alive and reused between requests to the same host,
+for both index files and plugin archives.
+
+Responses and errors are compatible with `urllib.request.urlopen`:
+HTTP errors raise `urllib.error.HTTPError` and connection errors raise
+`urllib.error.URLError`. Other schemes (i.e `file:`) are delegated to
+`urllib.request.urlopen`.
+"""
+
+import base64
+import http.client
+import io
+import ssl
+import threading
+import urllib.error
+import urllib.request
+
+from email.message import Message
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import SplitResult, unquote, urljoin, urlsplit, urlunsplit
+
+from qgis_plugin_manager import echo
+
+MAX_REDIRECTIONS = 10
+
+# Maximum number of idle connections kept per host
+MAX_IDLE = 8
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# Errors raised when reusing a connection closed by the server
+STALE_ERRORS = (ConnectionResetError, BrokenPipeError, http.client.RemoteDisconnected)
+
+# (scheme, host, port, proxy)
+Key = Tuple[str, str, int, str]
+
+
+R = TypeVar("R", bound="Response")
+
+
+class Response(Protocol):
+    """Response returned by `urlopen`"""
+
+    @property
+    def url(self) -> str: ...
+
+    @property
+    def status(self) -> int: ...
+
+    @property
+    def headers(self) -> Message: ...
+
+    def read(self, amt: Optional[int] = None) -> bytes: ...
+
+    def readinto(self, b: memoryview, /) -> int: ...
+
+    def close(self): ...
+
+    def __enter__(self: R) -> R: ...
+
+    def __exit__(self, *args): ...
+
+
+class PooledResponse:
+    """Response holding a connection of the pool until closed
+
+    The connection is returned to the pool if the body has been fully read.
+    """
+
+    def __init__(
+        self,
+        pool: "ConnectionPool",
+        key: Key,
+        conn: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        url: str,
+    ):
+        self._pool = pool
+        self._key = key
+        self._conn: Optional[http.client.HTTPConnection] = conn
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read(amt)
+
+    def readinto(self, b: memoryview) -> int:
+        return self._response.readinto(b)
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str:
+        return self.url
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool._release(self._key, conn)
+        else:
+            self._response.close()
+            conn.close()
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections shared by all requests"""
+
+    def __init__(self, max_idle: int = MAX_IDLE):
+        self.max_idle = max_idle
+        self.opened = 0
+        self.reused = 0
+        self._idle: Dict[Key, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._context: Optional[ssl.SSLContext] = None
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of connections opened and reused"""
+        with self._lock:
+            return {"opened": self.opened, "reused": self.reused}
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def urlopen(self, request: urllib.request.Request) -> Response:
+        """Send a GET request, following redirections"""
+        url = request.full_url
+        # Same header names as urllib
+        headers = {name.title(): value for name, value in request.header_items()}
+        for _ in range(MAX_REDIRECTIONS + 1):
+            u = urlsplit(url)
+            if u.scheme not in ("http", "https"):
+                return urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+
+            response = self._request(url, u, headers)
+            location = response.headers.get("Location")
+            if response.status in REDIRECT_CODES and location:
+                # Drain the body for reusing the connection
+                with response:
+                    response.read()
+                url = urljoin(url, location)
+                echo.debug("Redirected to {}", url)
+                continue
+
+            if response.status >= 300:
+                with response:
+                    body = response.read()
+                raise urllib.error.HTTPError(
+                    url,
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    io.BytesIO(body),
+                )
+            return response
+
+        raise urllib.error.HTTPError(url, response.status, "Too many redirections", response.headers, None)
+
+    def _request(self, url: str, u: SplitResult, headers: Dict[str, str]) -> PooledResponse:
+        proxy = self._proxy(u)
+        port = u.port or (443 if u.scheme == "https" else 80)
+        key = (u.scheme, u.hostname or "", port, proxy or "")
+
+        headers = dict(headers)
+        if proxy and u.scheme == "http":
+            # Plain HTTP requests are sent to the proxy with the full URL
+            path = urlunsplit(u._replace(fragment=""))
+            headers.update(self._proxy_headers(proxy))
+        else:
+            path = urlunsplit(("", "", u.path or "/", u.query, ""))
+
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            except (OSError, http.client.HTTPException) as err:
+                conn.close()
+                if reused and isinstance(err, STALE_ERRORS):
+                    # Closed by the server while idle, try with another one
+                    continue
+                raise urllib.error.URLError(err) from err
+            return PooledResponse(self, key, conn, response, url)
+
+    def _acquire(self, key: Key) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+            self.opened += 1
+        return self._connect(key), False
+
+    def _release(self, key: Key, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _connect(self, key: Key) -> http.client.HTTPConnection:
+        scheme, host, port, proxy = key
+        if scheme == "https" and self._context is None:
+            self._context = ssl.create_default_context()
+
+        if not proxy:
+            if scheme == "https":
+                return http.client.HTTPSConnection(host, port, context=self._context)
+            return http.client.HTTPConnection(host, port)
+
+        p = urlsplit(proxy)
+        proxy_host = p.hostname or ""
+        proxy_port = p.port or 80
+        if scheme == "https":
+            # Tunnel through the proxy
+            conn = http.client.HTTPSConnection(proxy_host, proxy_port, context=self._context)
+            conn.set_tunnel(host, port, headers=self._proxy_headers(proxy))
+            return conn
+        return http.client.HTTPConnection(proxy_host, proxy_port)
+
+    @staticmethod
+    def _proxy(u: SplitResult) -> Optional[str]:
+        """Return the proxy for the URL from the environment"""
+        proxy = urllib.request.getproxies().get(u.scheme)
+        if not proxy or urllib.request.proxy_bypass(u.hostname or ""):
+            return None
+        return proxy if "://" in proxy else f"http://{proxy}"
+
+    @staticmethod
+    def _proxy_headers(proxy: str) -> Dict[str, str]:
+        p = urlsplit(proxy)
+        if not p.username:
+            return {}
+        token = base64.b64encode(f"{unquote(p.username)}:{unquote(p.password or '')}".encode())
+        return {"Proxy-Authorization": f"Basic {token.decode()}"}
+
+
+# Pool shared by all remotes
+POOL = ConnectionPool()
+
+
+def urlopen(request: urllib.request.Request) -> Response:
+    """Open the URL with the shared connection pool"""
+    return POOL.urlopen(request)
+
+
+def report():
+    """Report connection statistics in verbose mode"""
+    stats = POOL.stats()
+    if stats["opened"]:
+        echo.debug("HTTP connections: {opened} opened, {reused} reused", **stats)
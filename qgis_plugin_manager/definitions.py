@@ -1,15 +1,20 @@
+from functools import lru_cache
 from typing import (
+    TYPE_CHECKING,
+    Collection,
     Dict,
     List,
     NamedTuple,
     Optional,
     Protocol,
+    Tuple,
     Union,
 )
 
-from semver import Version
+from .utils import VersionKey, get_semver_version, version_key
 
-from .utils import get_semver_version
+if TYPE_CHECKING:
+    from semver import Version
 
 
 class Element(Protocol):
@@ -21,18 +26,31 @@ class Element(Protocol):
 TRUE_VALUES = ("true", "yes", "1")
 
 
+# NOTE: Version equality ignores build tags, which is fine
+# for memoizing keys that ignore them.
+@lru_cache(maxsize=1024, typed=True)
+def qgis_version_key(version: Union[str, "Version"]) -> VersionKey:
+    """Comparison key for QGIS versions
+
+    Build tags are ignored as in SemVer comparison
+    """
+    if isinstance(version, str):
+        version = get_semver_version(version)
+    return version_key(version)[:4]
+
+
 class Plugin(NamedTuple):
     """Definition of a plugin in the XML file."""
 
     name: str
-    version: Version
+    version: "Version"
     version_str: str
     file_name: Optional[str] = None
     download_url: Optional[str] = None
     description: str = ""
     search: List[str] = []  # noqa RUF012
-    qgis_minimum_version: Optional[Version] = None
-    qgis_maximum_version: Optional[Version] = None
+    qgis_minimum_version: Optional["Version"] = None
+    qgis_maximum_version: Optional["Version"] = None
     homepage: Optional[str] = None
     pre_release: Optional[str] = None
     icon: Optional[str] = None
@@ -51,23 +69,41 @@ class Plugin(NamedTuple):
     trusted: bool = False
     install_folder: Optional[str] = None
     source: Optional[str] = None
+    # Precomputed comparison key of `version`
+    version_key: VersionKey = ()
 
     def is_pre(self) -> bool:
         return self.version.prerelease is not None or self.experimental
 
-    def check_qgis_version(self, version: Union[str, Version]) -> bool:
-        if self.qgis_minimum_version is not None and self.qgis_minimum_version > version:
+    def check_qgis_version(self, version: Union[str, "Version", VersionKey]) -> bool:
+        """Check compatibility with the given QGIS version
+
+        The version may be given as a key returned by `qgis_version_key`.
+        """
+        key = version if isinstance(version, tuple) else qgis_version_key(version)
+        if self.qgis_minimum_version is not None and qgis_version_key(self.qgis_minimum_version) > key:
             return False
-        elif self.qgis_maximum_version is not None and self.qgis_maximum_version < version:
+        elif self.qgis_maximum_version is not None and qgis_version_key(self.qgis_maximum_version) < key:
             return False
         else:
             return True
 
     @staticmethod
-    def from_xml_element(elem: Element, source: Optional[str] = None) -> "Plugin":
+    def from_xml_element(
+        elem: Element,
+        source: Optional[str] = None,
+        fields: Optional[Collection[str]] = None,
+    ) -> "Plugin":
+        """Create a plugin from a XML element
+
+        Only `fields` are read from the element, or all plugin fields
+        if not set.
+        """
+        if fields is None:
+            fields = Plugin._fields
         data: Dict = {"source": source}
         for element in elem:
-            if element.tag in Plugin._fields:
+            if element.tag in fields:
                 data[element.tag] = element.text
 
         experimental = data.get("experimental")
@@ -87,8 +123,9 @@ class Plugin(NamedTuple):
         version_str = elem.attrib["version"]
         data["version_str"] = version_str
         data["version"] = get_semver_version(version_str)
+        data["version_key"] = version_key(data["version"])
 
-        def maybe_version(ver: Optional[str]) -> Optional[Version]:
+        def maybe_version(ver: Optional[str]) -> Optional["Version"]:
             return get_semver_version(ver) if ver else None
 
         data["qgis_minimum_version"] = maybe_version(data.get("qgis_minimum_version"))
@@ -112,3 +149,6 @@ class Plugin(NamedTuple):
         data["search"] = list(dict.fromkeys(search_text))
 
         return Plugin(**data)
+
+
+PluginDict = Dict[str, Tuple[Plugin, ...]]
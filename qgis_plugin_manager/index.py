@@ -0,0 +1,343 @@
+"""Precompiled plugin index
+
+The index is built from the XML files at update time and stores
+the plugin definitions with already normalized versions and sorted
+version lists, so that commands do not have to parse the XML files.
+
+The index is invalidated when the list of sources or the content of
+one of the XML files changes.
+
+Layout of the index file:
+
+    magic | header offset | versions of each plugin... | search index | names | header
+
+The header holds a table of the offset of the versions of each plugin,
+so that a single plugin can be read without loading the whole index.
+
+Entries are stored with `marshal` as plain tuples, lists and dicts:
+the cache directory may be shared, reading the index must never
+execute code.
+"""
+
+import hashlib
+import marshal
+import os
+import struct
+
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from qgis_plugin_manager import echo
+from qgis_plugin_manager.definitions import Plugin, PluginDict
+from qgis_plugin_manager.search import NameSuggestions, SearchIndex
+from qgis_plugin_manager.utils import atomic_write
+
+if TYPE_CHECKING:
+    from semver import Version
+
+# Change this when the layout of the index changes
+INDEX_FORMAT = 4
+
+MARSHAL_VERSION = 4
+
+T = TypeVar("T")
+
+MAGIC = b"QPMI"
+PREAMBLE = struct.Struct("<4sQ")
+
+# (source, size, mtime_ns, sha256 digest)
+SourceStamp = Tuple[str, int, int, str]
+
+# (device, inode, size, mtime_ns) of the index file
+FileIdentity = Tuple[int, int, int, int]
+
+
+def file_digest(path: Path) -> str:
+    """Return the sha256 digest of a file"""
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_stamps(sources: Sequence[Tuple[str, Path]]) -> List[SourceStamp]:
+    stamps = []
+    for source, xml_file in sources:
+        st = xml_file.stat()
+        stamps.append((source, st.st_size, st.st_mtime_ns, file_digest(xml_file)))
+    return stamps
+
+
+def check_stamps(stamps: Sequence[SourceStamp], sources: Sequence[Tuple[str, Path]]) -> bool:
+    """Check that the index has been built from the given sources"""
+    if len(stamps) != len(sources):
+        return False
+    for (source, size, mtime_ns, digest), (current, xml_file) in zip(stamps, sources):
+        if source != current:
+            return False
+        st = xml_file.stat()
+        if st.st_size != size:
+            return False
+        # Unchanged file: do not compute the digest
+        if st.st_mtime_ns != mtime_ns and file_digest(xml_file) != digest:
+            return False
+    return True
+
+
+def check_fields(available: Optional[Collection[str]], requested: Optional[Collection[str]]) -> bool:
+    if available is None:
+        return True
+    if requested is None:
+        return False
+    return available.issuperset(requested)  # type: ignore [attr-defined]
+
+
+# Plugin fields holding a version
+VERSION_FIELDS = tuple(
+    i
+    for i, name in enumerate(Plugin._fields)
+    if name in ("version", "qgis_minimum_version", "qgis_maximum_version")
+)
+
+
+def dump_versions(versions: Sequence[Plugin]) -> bytes:
+    """Serialize the versions of a plugin as plain tuples"""
+    rows = []
+    for plugin in versions:
+        row: List[Any] = list(plugin)
+        for i in VERSION_FIELDS:
+            if row[i] is not None:
+                row[i] = row[i].to_tuple()
+        rows.append(tuple(row))
+    return marshal.dumps(tuple(rows), MARSHAL_VERSION)
+
+
+def load_versions(
+    data: Union[bytes, memoryview],
+    name: str,
+    cache: Dict[Tuple, "Version"],
+) -> Tuple[Plugin, ...]:
+    """Read the versions of the plugin `name`
+
+    Versions are shared through `cache`, QGIS versions repeat heavily.
+    Raises `ValueError` if the entry holds another plugin.
+    """
+    from semver import Version
+
+    versions = []
+    for row in marshal.loads(data):
+        row = list(row)
+        for i in VERSION_FIELDS:
+            parts = row[i]
+            if parts is not None:
+                version = cache.get(parts)
+                if version is None:
+                    version = cache[parts] = Version(*parts)
+                row[i] = version
+        versions.append(Plugin._make(row))
+    if not versions or any(plugin.name != name for plugin in versions):
+        raise ValueError(f"Invalid entry for {name}")
+    return tuple(versions)
+
+
+def file_identity(f: BinaryIO) -> FileIdentity:
+    st = os.fstat(f.fileno())
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def write_index(
+    path: Path,
+    sources: Sequence[Tuple[str, Path]],
+    plugins: PluginDict,
+    fields: Optional[Collection[str]] = None,
+):
+    """Write the precompiled index for the given sources
+
+    `fields` are the plugin fields read from the XML files,
+    None means all fields.
+    """
+    table: Dict[str, Tuple[int, int]] = {}
+    with atomic_write(path) as f:
+        f.write(PREAMBLE.pack(MAGIC, 0))
+        for name, versions in plugins.items():
+            data = dump_versions(versions)
+            table[name] = (f.tell(), len(data))
+            f.write(data)
+
+        data = marshal.dumps(SearchIndex.build(plugins).to_data(), MARSHAL_VERSION)
+        search_entry = (f.tell(), len(data))
+        f.write(data)
+
+        data = marshal.dumps(NameSuggestions.build(plugins).to_data(), MARSHAL_VERSION)
+        names_entry = (f.tell(), len(data))
+        f.write(data)
+
+        header_offset = f.tell()
+        header = {
+            "format": INDEX_FORMAT,
+            "fields": Plugin._fields,
+            "xml_fields": None if fields is None else frozenset(fields),
+            "sources": source_stamps(sources),
+            "table": table,
+            "search": search_entry,
+            "names": names_entry,
+        }
+        f.write(marshal.dumps(header, MARSHAL_VERSION))
+
+        f.seek(0)
+        f.write(PREAMBLE.pack(MAGIC, header_offset))
+
+    echo.debug("Precompiled index written to {}", path)
+
+
+INDEX_ERRORS = (OSError, EOFError, ValueError, TypeError, IndexError, AttributeError, KeyError, struct.error)
+
+
+class PluginIndex:
+    """Reader for the precompiled index
+
+    Entries are read from the file opened by `open()`: if the index
+    has been replaced since then, i.e by a concurrent update, reading
+    fails instead of using the offsets of the old file.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        identity: FileIdentity,
+        header_offset: int,
+        table: Dict[str, Tuple[int, int]],
+        search_entry: Tuple[int, int],
+        names_entry: Tuple[int, int],
+    ):
+        self.path = path
+        self._identity = identity
+        self._header_offset = header_offset
+        self._table = table
+        self._search_entry = search_entry
+        self._names_entry = names_entry
+
+    @classmethod
+    def open(
+        cls,
+        path: Path,
+        sources: Sequence[Tuple[str, Path]],
+        fields: Optional[Collection[str]] = None,
+    ) -> Optional["PluginIndex"]:
+        """Open the precompiled index
+
+        Returns None if the index does not exist, is out of date or does
+        not provide the requested plugin `fields`.
+        """
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as f:
+                identity = file_identity(f)
+                magic, header_offset = PREAMBLE.unpack(f.read(PREAMBLE.size))
+                if magic != MAGIC:
+                    echo.debug("Precompiled index is out of date")
+                    return None
+                f.seek(header_offset)
+                header = marshal.loads(f.read())
+            if not (
+                header.get("format") == INDEX_FORMAT
+                and header.get("fields") == Plugin._fields
+                and check_fields(header["xml_fields"], fields)
+                and check_stamps(header["sources"], sources)
+            ):
+                echo.debug("Precompiled index is out of date")
+                return None
+            return cls(path, identity, header_offset, header["table"], header["search"], header["names"])
+        except INDEX_ERRORS as err:
+            echo.debug("Invalid precompiled index {}: {}", path, err)
+            return None
+
+    def names(self) -> Collection[str]:
+        """Return the names of all plugins"""
+        return self._table.keys()
+
+    def _open_file(self) -> BinaryIO:
+        """Open the index file
+
+        Raises `ValueError` if the file has been replaced since `open()`.
+        """
+        f = self.path.open("rb")
+        if file_identity(f) != self._identity:
+            f.close()
+            raise ValueError("file replaced since opened")
+        return f
+
+    def lookup(self, names: Iterable[str]) -> Optional[PluginDict]:
+        """Read the versions of the given plugins only
+
+        Returns None if the index cannot be read.
+        """
+        entries = sorted((self._table[name], name) for name in set(names) if name in self._table)
+        plugins: PluginDict = {}
+        cache: Dict[Tuple, Version] = {}
+        try:
+            with self._open_file() as f:
+                for (offset, length), name in entries:
+                    f.seek(offset)
+                    plugins[name] = load_versions(f.read(length), name, cache)
+        except INDEX_ERRORS as err:
+            echo.debug("Invalid precompiled index {}: {}", self.path, err)
+            return None
+        return plugins
+
+    def _read_entry(self, entry: Tuple[int, int], load: Callable[[Any], T]) -> Optional[T]:
+        offset, length = entry
+        try:
+            with self._open_file() as f:
+                f.seek(offset)
+                return load(marshal.loads(f.read(length)))
+        except INDEX_ERRORS as err:
+            echo.debug("Invalid precompiled index {}: {}", self.path, err)
+            return None
+
+    def search_index(self) -> Optional[SearchIndex]:
+        """Read the search index
+
+        Returns None if the index cannot be read.
+        """
+        return self._read_entry(self._search_entry, SearchIndex.from_data)
+
+    def name_suggestions(self) -> Optional[NameSuggestions]:
+        """Read the BK-tree of plugin names
+
+        Returns None if the index cannot be read.
+        """
+        return self._read_entry(self._names_entry, NameSuggestions.from_data)
+
+    def load(self) -> Optional[PluginDict]:
+        """Read the versions of all plugins
+
+        Returns None if the index cannot be read.
+        """
+        try:
+            with self._open_file() as f:
+                data = memoryview(f.read(self._header_offset))
+            cache: Dict[Tuple, Version] = {}
+            return {
+                name: load_versions(data[offset : offset + length], name, cache)
+                for name, (offset, length) in self._table.items()
+            }
+        except INDEX_ERRORS as err:
+            echo.debug("Invalid precompiled index {}: {}", self.path, err)
+            return None
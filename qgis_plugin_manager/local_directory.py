@@ -1,65 +1,174 @@
-import configparser
-import shutil
+import os
 
 from pathlib import Path
-from typing import Dict, Optional
-
-from semver import Version
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from qgis_plugin_manager import echo
+from qgis_plugin_manager import echo, timings
 from qgis_plugin_manager.definitions import Plugin
+from qgis_plugin_manager.manifest import (
+    Manifest,
+    compare_files,
+    plugin_files,
+    read_metadata,
+)
 from qgis_plugin_manager.utils import (
     PluginManagerError,
     get_semver_version,
-    similar_names,
+    version_key,
 )
 
+if TYPE_CHECKING:
+    from semver import Version
+
+Metadata = Dict[str, Optional[str]]
+
+# Metadata read by this process, by path of the plugin folder,
+# with the (mtime_ns, size) of the `metadata.txt` file
+_METADATA_CACHE: Dict[str, Tuple[int, int, Metadata]] = {}
+
+# Boolean values of `metadata.txt`, as read by `configparser`
+BOOLEAN_STATES = {
+    "1": True,
+    "yes": True,
+    "true": True,
+    "on": True,
+    "0": False,
+    "no": False,
+    "false": False,
+    "off": False,
+}
+
 
 class LocalDirectory:
-    def __init__(self, folder: Path):
-        """Constructor"""
-        self.folder = folder
+    def __init__(self, folder: Union[Path, Sequence[Path]]):
+        """Constructor
+
+        Several plugin directories may be given: a plugin folder or a
+        plugin name found in a directory hides the ones found in the
+        following directories. Plugins are installed in the first
+        directory.
+        """
+        self.folders = [folder] if isinstance(folder, Path) else list(folder)
+        self.folder = self.folders[0]
         # Dictionary : folder : plugin name
         self._plugins: Dict[str, str] = {}
-        self._plugins_metadata: Dict[str, configparser.SectionProxy] = {}
+        # Dictionary : plugin name : folder
+        self._folders: Dict[str, str] = {}
+        # Dictionary : folder : plugin directory
+        self._roots: Dict[str, Path] = {}
+        self._plugins_metadata: Dict[str, Metadata] = {}
+        self._infos: Dict[str, Plugin] = {}
+        self._manifests: Dict[Path, Manifest] = {}
         self.list_plugins()
 
     def plugin_list(self) -> Dict[str, str]:
         return self._plugins
 
     def list_plugins(self):
-        """Get the list of plugins installed in the current directory."""
-        for folder in self.folder.iterdir():
-            if not folder.is_dir():
-                continue
+        """Get the list of plugins installed in the plugin directories.
+
+        Directories are scanned concurrently. Metadata of plugins are read
+        from the manifest, or from the metadata already read by this
+        process, if their `metadata.txt` file has not changed.
+        """
+        self._plugins.clear()
+        self._folders.clear()
+        self._roots.clear()
+        self._plugins_metadata.clear()
+        self._infos.clear()
+
+        with timings.phase("scan"):
+            if len(self.folders) > 1:
+                from concurrent.futures import ThreadPoolExecutor
+
+                with ThreadPoolExecutor(max_workers=len(self.folders)) as executor:
+                    scans = list(executor.map(self._scan, self.folders))
+            else:
+                scans = [self._scan(self.folder)]
+
+        for root, (manifest, found) in zip(self.folders, scans):
+            self._manifests[root] = manifest
+            for folder, metadata in found:
+                if folder in self._plugins:
+                    echo.debug(f"Plugin folder {root.joinpath(folder)} hidden by {self.path(folder)}")
+                    continue
+                name = metadata["name"]
+                first = self._folders.get(name)  # type: ignore [arg-type]
+                if first is not None and self._roots[first] != root:
+                    echo.debug(f"Plugin {name} in {root.joinpath(folder)} hidden by {self.path(first)}")
+                    continue
+                self._plugins[folder] = name  # type: ignore [assignment]
+                self._roots[folder] = root
+                self._plugins_metadata[folder] = metadata
+                self._folders.setdefault(name, folder)  # type: ignore [arg-type]
+
+    def _scan(self, root: Path) -> Tuple[Manifest, List[Tuple[str, Metadata]]]:
+        """Scan a plugin directory.
+
+        Returns the manifest of the directory and the metadata
+        of each plugin folder.
+        """
+        manifest = Manifest.load(root)
+        found: List[Tuple[str, Metadata]] = []
+        try:
+            entries = sorted(os.scandir(root), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            if root == self.folder:
+                raise
+            echo.alert(f"Plugin directory {root} does not exist")
+            return manifest, found
 
+        for entry in entries:
             # Skip hidden folders
-            if folder.name.startswith("."):
+            if entry.name.startswith(".") or not entry.is_dir():
                 continue
+            try:
+                st = os.stat(os.path.join(entry.path, "metadata.txt"))
+            except OSError:
+                continue
+            if not os.path.exists(os.path.join(entry.path, "__init__.py")):
+                continue
+            try:
+                found.append((entry.name, self._get_plugin_metadata(manifest, entry.path, st)))
+            except KeyError:
+                echo.alert(f"WARNING: invalid metadata found in {entry.path}")
+        return manifest, found
 
-            have_python = folder.joinpath("__init__.py").exists()
-            have_metadata = folder.joinpath("metadata.txt").exists()
-            if have_python and have_metadata:
-                try:
-                    metadata = self._get_plugin_metadata(folder.name)
-                    self._plugins[folder.name] = metadata["name"]
-                    self._plugins_metadata[folder.name] = metadata
-                except KeyError:
-                    echo.alert(f"WARNING: invalid metadata found in {folder}")
-
-    def _get_plugin_metadata(self, plugin_folder: str) -> configparser.SectionProxy:
+    @staticmethod
+    def _get_plugin_metadata(manifest: Manifest, path: str, st: os.stat_result) -> Metadata:
         """For a given plugin installed, get a metadata item."""
-        config_parser = configparser.ConfigParser()
-        with self.folder.joinpath(f"{plugin_folder}", "metadata.txt").open(encoding="utf8") as f:
-            config_parser.read_file(f)
-            return config_parser["general"]
+        stamp = [st.st_mtime_ns, st.st_size]
+        record = manifest.get(os.path.basename(path))
+        if record and record.get("metadata_stamp") == stamp:
+            return record["metadata"]
+
+        cached = _METADATA_CACHE.get(path)
+        if cached and list(cached[:2]) == stamp:
+            return cached[2]
+
+        metadata = read_metadata(Path(path))
+        _METADATA_CACHE[path] = (st.st_mtime_ns, st.st_size, metadata)
+        return metadata
+
+    def path(self, plugin_folder: str) -> Path:
+        """Return the path of a plugin folder"""
+        return self._roots.get(plugin_folder, self.folder).joinpath(plugin_folder)
+
+    def root(self, plugin_folder: str) -> Path:
+        """Return the plugin directory of a plugin folder"""
+        return self._roots.get(plugin_folder, self.folder)
 
     def get_plugin_folder_from_name(self, plugin_name: str) -> Optional[str]:
         """Get the folder name from the plugin name"""
-        for folder, name in self._plugins.items():
-            if plugin_name == name:
-                return folder
-        return None
+        return self._folders.get(plugin_name)
 
     def plugin_info(self, plugin: str) -> Optional[Plugin]:
         """For a given plugin, retrieve all metadata."""
@@ -74,9 +183,15 @@ class LocalDirectory:
             # No plugin
             return None
 
+        info = self._infos.get(plugin_folder)
+        if info is None:
+            info = self._infos[plugin_folder] = self._plugin_info(plugin_folder)
+        return info
+
+    def _plugin_info(self, plugin_folder: str) -> Plugin:
         md = self._plugins_metadata[plugin_folder]
 
-        def maybe_version(ver: Optional[str]) -> Optional[Version]:
+        def maybe_version(ver: Optional[str]) -> Optional["Version"]:
             return get_semver_version(ver) if ver else None
 
         # Make sure that version is semver compatible
@@ -84,17 +199,19 @@ class LocalDirectory:
         qgis_maximum_version = maybe_version(md.get("qgisMaximumVersion"))
 
         version_str = md.get("version") or "0.0.0"
+        version = get_semver_version(version_str)
 
         return Plugin(
-            name=md["name"],
-            version=get_semver_version(version_str),
+            name=md["name"],  # type: ignore [arg-type]
+            version=version,
             version_str=version_str,
-            experimental=md.getboolean("experimental", False),
+            version_key=version_key(version),
+            experimental=getboolean(md, "experimental"),
             qgis_minimum_version=qgis_minimum_version,
             qgis_maximum_version=qgis_maximum_version,
             author_name=md.get("author"),
-            server=md.getboolean("server", False),
-            has_processing=md.getboolean("hasProcessingProvider", False),
+            server=getboolean(md, "server"),
+            has_processing=getboolean(md, "hasProcessingProvider"),
             install_folder=plugin_folder,
         )
 
@@ -105,21 +222,26 @@ class LocalDirectory:
         if not folder:
             echo.alert(f"Plugin name '{plugin_name}' not found")
 
-            similarity = similar_names(plugin_name.lower(), self._plugins.values())
+            from qgis_plugin_manager.search import NameSuggestions
+
+            similarity = NameSuggestions.build(self._plugins.values()).suggest(plugin_name)
             for plugin in similarity:
                 echo.info(f"Do you mean maybe '{plugin}' ?")
 
             return False
 
         # Remove folder
-        plugin_path = self.folder.joinpath(folder)
+        root = self.root(folder)
+        plugin_path = root.joinpath(folder)
         try:
+            import shutil
+
             echo.debug(f"Removing {plugin_path.absolute()}")
             shutil.rmtree(plugin_path)
         except Exception as e:
             raise PluginManagerError(f"Plugin {plugin_name} could not be removed : {e!s}")
 
-        if Path(self.folder.joinpath(plugin_path)).exists():
+        if plugin_path.exists():
             echo.alert(
                 f"Plugin {plugin_name} using folder {plugin_path.absolute()} "
                 "could not be removed for unknown reason."
@@ -127,5 +249,28 @@ class LocalDirectory:
             return False
 
         echo.success(f"Plugin {plugin_name} removed")
-        del self._plugins[folder]
+        manifest = self._manifests[root]
+        manifest.remove(folder)
+        manifest.save()
+        # Plugins hidden by the removed one are listed again
+        self.list_plugins()
         return True
+
+    def verify(self, plugin_folder: str) -> Optional[Tuple[List[str], List[str], List[str]]]:
+        """Compare the files of a plugin with its installation record.
+
+        Returns the modified, missing and added files or None if the
+        plugin has not been installed by the plugin manager.
+        """
+        root = self.root(plugin_folder)
+        record = self._manifests[root].get(plugin_folder)
+        if not record or "files" not in record:
+            return None
+        return compare_files(record["files"], plugin_files(root.joinpath(plugin_folder)))
+
+
+def getboolean(md: Dict[str, Optional[str]], key: str, default: bool = False) -> bool:
+    value = md.get(key)
+    if value is None:
+        return default
+    return BOOLEAN_STATES.get(value.lower(), default)
@@ -0,0 +1,152 @@
+"""Manifest of installed plugins
+
+The manifest is stored in the plugin directory and written by the
+`install`, `upgrade` and `remove` commands. It holds a record for each
+plugin folder installed by the plugin manager:
+
+* the metadata read from `metadata.txt` with the stamp (mtime, size)
+  of that file, so that plugins can be listed without parsing their
+  `metadata.txt` as long as it is unchanged,
+* the remote source, the download URL and the sha256 digest of the
+  archive,
+* the stamp of each installed file, used for detecting local
+  modifications.
+"""
+
+import json
+import os
+
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from qgis_plugin_manager import echo
+from qgis_plugin_manager.utils import atomic_write
+
+MANIFEST_FILE = ".qgis-plugin-manager.json"
+
+# Change this when the layout of the manifest changes
+MANIFEST_FORMAT = 1
+
+# Keys of `metadata.txt` used by the plugin manager
+METADATA_KEYS = (
+    "name",
+    "version",
+    "qgisMinimumVersion",
+    "qgisMaximumVersion",
+    "experimental",
+    "author",
+    "server",
+    "hasProcessingProvider",
+)
+
+# Folders not taken into account when comparing installed files
+IGNORED_FOLDERS = ("__pycache__",)
+
+# (mtime_ns, size)
+Stamp = List[int]
+
+
+def metadata_stamp(plugin_folder: Path) -> Optional[Stamp]:
+    """Return the stamp of the `metadata.txt` file of a plugin"""
+    try:
+        st = plugin_folder.joinpath("metadata.txt").stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def read_metadata(plugin_folder: Path) -> Dict[str, Optional[str]]:
+    """Read the `metadata.txt` file of a plugin
+
+    Raises `KeyError` if the file has no `general` section or no name.
+    """
+    import configparser
+
+    config_parser = configparser.ConfigParser()
+    with plugin_folder.joinpath("metadata.txt").open(encoding="utf8") as f:
+        config_parser.read_file(f)
+    md = config_parser["general"]
+    if not md.get("name"):
+        raise KeyError("name")
+    return {key: md.get(key) for key in METADATA_KEYS}
+
+
+def plugin_files(plugin_folder: Path) -> Dict[str, Stamp]:
+    """Return the stamp of each file of a plugin, by relative path"""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(plugin_folder):
+        dirnames[:] = [name for name in dirnames if name not in IGNORED_FOLDERS]
+        folder = Path(dirpath)
+        for name in filenames:
+            p = folder.joinpath(name)
+            st = p.lstat()
+            files[p.relative_to(plugin_folder).as_posix()] = [st.st_mtime_ns, st.st_size]
+    return files
+
+
+def compare_files(
+    recorded: Dict[str, Stamp],
+    current: Dict[str, Stamp],
+) -> Tuple[List[str], List[str], List[str]]:
+    """Return the modified, missing and added files"""
+    modified = sorted(name for name, stamp in current.items() if name in recorded and recorded[name] != stamp)
+    missing = sorted(name for name in recorded if name not in current)
+    added = sorted(name for name in current if name not in recorded)
+    return modified, missing, added
+
+
+class Manifest:
+    """Manifest of the plugins of a plugin directory"""
+
+    def __init__(self, folder: Path):
+        self.path = folder.joinpath(MANIFEST_FILE)
+        # Plugin folder -> record
+        self.plugins: Dict[str, Dict[str, Any]] = {}
+        self._changed = False
+
+    @classmethod
+    def load(cls, folder: Path) -> "Manifest":
+        """Load the manifest of the plugin directory
+
+        An invalid or out of date manifest is ignored.
+        """
+        manifest = cls(folder)
+        try:
+            with manifest.path.open(encoding="utf8") as f:
+                data = json.load(f)
+            if data.get("format") == MANIFEST_FORMAT:
+                manifest.plugins = data["plugins"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError) as err:
+            echo.debug("Invalid manifest {}: {}", manifest.path, err)
+        return manifest
+
+    def get(self, plugin_folder: str) -> Optional[Dict[str, Any]]:
+        return self.plugins.get(plugin_folder)
+
+    def set(self, plugin_folder: str, record: Dict[str, Any]):
+        """Set the record of a plugin folder"""
+        self.plugins[plugin_folder] = record
+        self._changed = True
+
+    def remove(self, plugin_folder: str):
+        if self.plugins.pop(plugin_folder, None) is not None:
+            self._changed = True
+
+    def save(self):
+        """Write the manifest if it has changed"""
+        if not self._changed:
+            return
+        try:
+            with atomic_write(self.path, "w", encoding="utf8") as f:
+                json.dump({"format": MANIFEST_FORMAT, "plugins": self.plugins}, f, indent=1)
+            self._changed = False
+        except OSError as err:
+            echo.debug("Cannot write manifest {}: {}", self.path, err)
@@ -0,0 +1,143 @@
+"""Metrics of a command in the Prometheus text format
+
+Metrics are written at the end of the command to the file given by the
+`--metrics-file` option or the `QGIS_PLUGIN_MANAGER_METRICS_FILE`
+environment variable, for the textfile collector of the Prometheus
+node exporter. The file is replaced atomically, so that the collector
+never reads a partially written file.
+
+All metrics are gauges holding the values of the last run, labelled
+with the command.
+"""
+
+import os
+import sys
+import threading
+import time
+
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+from qgis_plugin_manager import timings
+from qgis_plugin_manager.utils import atomic_write
+
+PREFIX = "qgis_plugin_manager_"
+
+# Name -> help
+DEFINITIONS = {
+    "last_run_timestamp_seconds": "Time of the end of the last run, in seconds since the epoch",
+    "run_duration_seconds": "Duration of the last run",
+    "run_success": "Whether the last run succeeded",
+    "downloaded_bytes": "Bytes downloaded, by source and kind of file",
+    "cache_hits": "Cache hits, by cache",
+    "cache_misses": "Cache misses, by cache",
+    "index_age_seconds": "Age of the cached index file of a source",
+    "index_update_failures": "Sources which could not be updated",
+    "plugins_installed": "Plugins installed or upgraded",
+    "plugins_failed": "Plugins which could not be installed",
+    "outdated_plugins": "Installed plugins with a newer version available",
+    "http_connections": "HTTP connections, by state",
+}
+
+# Sorted (label, value) pairs
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def escape(value: str) -> str:
+    """Escape a label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    def __init__(self):
+        # Name -> labels -> value
+        self.values: Dict[str, Dict[Labels, float]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self.values.clear()
+
+    def add(self, name: str, value: float = 1, **labels: str):
+        """Add `value` to a metric"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self.values.setdefault(name, {})
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str):
+        """Set the value of a metric"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values.setdefault(name, {})[key] = value
+
+    def get(self, name: str, **labels: str) -> Optional[float]:
+        with self._lock:
+            return self.values.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def lines(self, command: Optional[str]) -> Iterator[str]:
+        """Lines of the text format, labelled with the command"""
+        common = (("command", command),) if command else ()
+        with self._lock:
+            for name in sorted(self.values):
+                metric = f"{PREFIX}{name}"
+                yield f"# HELP {metric} {DEFINITIONS.get(name, name)}"
+                yield f"# TYPE {metric} gauge"
+                for labels, value in sorted(self.values[name].items()):
+                    yield f"{metric}{format_labels(common + labels)} {format_value(value)}"
+
+    def render(self, command: Optional[str]) -> str:
+        return "".join(f"{line}\n" for line in self.lines(command))
+
+    def write(self, path: Path, command: Optional[str], success: bool):
+        """Write the metrics of the command
+
+        Metrics of the run and of the HTTP connections are added.
+        """
+        self.set("last_run_timestamp_seconds", round(time.time(), 3))
+        self.set("run_duration_seconds", round(timings.TIMINGS.elapsed(), 6))
+        self.set("run_success", int(success))
+        # Only if the command used the network
+        connections = sys.modules.get("qgis_plugin_manager.connections")
+        if connections:
+            for state, count in connections.POOL.stats().items():
+                self.set("http_connections", count, state=state)
+
+        # Readable by the collector whatever the umask
+        with atomic_write(path, "w", encoding="utf8") as f:
+            f.write(self.render(command))
+            os.chmod(f.name, 0o644)
+
+
+# Metrics of the current command
+METRICS = Metrics()
+
+
+def add(name: str, value: float = 1, **labels: str):
+    """Add `value` to a metric of the current command"""
+    METRICS.add(name, value, **labels)
+
+
+def set_value(name: str, value: float, **labels: str):
+    """Set a metric of the current command"""
+    METRICS.set(name, value, **labels)
+
+
+def file_age(path: Path) -> float:
+    """Age of a file in seconds"""
+    return max(0.0, time.time() - path.stat().st_mtime)
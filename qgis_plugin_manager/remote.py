@@ -1,62 +1,230 @@
 import base64
+import configparser
+import hashlib
+import http.client
+import json
 import os
 import platform
 import re
 import shutil
+import stat
+import threading
 import urllib
 import urllib.request
 import zipfile
+import zlib
 
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from pathlib import Path
+from secrets import token_hex
 from typing import (
+    IO,
+    Any,
     Callable,
+    Collection,
     Dict,
+    Generator,
     Iterator,
     List,
+    NamedTuple,
     Optional,
+    Sequence,
+    Set,
     Tuple,
     Union,
 )
 from urllib.parse import parse_qs, unquote, urlencode, urlparse, urlunparse
-from xml.etree.ElementTree import parse
+from xml.etree.ElementTree import iterparse
 
 from semver import Version
 
-from qgis_plugin_manager import echo
-from qgis_plugin_manager.definitions import Plugin
+from qgis_plugin_manager import echo, metrics, timings
+from qgis_plugin_manager.archives import ArchiveCache, archive_cache_directory, archive_cache_size
+from qgis_plugin_manager.connections import Response, urlopen
+from qgis_plugin_manager.definitions import Plugin, PluginDict, qgis_version_key
+from qgis_plugin_manager.index import PluginIndex, file_digest, write_index
+from qgis_plugin_manager.manifest import Manifest, metadata_stamp, plugin_files, read_metadata
+from qgis_plugin_manager.search import NameSuggestions, SearchIndex
 from qgis_plugin_manager.utils import (
+    CHUNK_SIZE,
+    DEFAULT_JOBS,
+    Owner,
     PluginManagerError,
+    PluginNotFoundError,
+    PluginVersionNotFoundError,
+    SourcesNotFoundError,
+    atomic_write,
+    content_length,
+    copy_stream,
+    format_size,
     get_semver_version,
-    similar_names,
     sources_file,
+    temporary_path,
 )
 
-PluginDict = Dict[str, Tuple[Plugin, ...]]
-
+DEFAULT_SOURCE_URL = "https://plugins.qgis.org/plugins/plugins.xml?qgis={version}"
 
-class PluginNotFoundError(PluginManagerError):
-    pass
 
+# Plugin fields required for resolving and installing plugins
+RESOLVE_FIELDS = (
+    "file_name",
+    "download_url",
+    "qgis_minimum_version",
+    "qgis_maximum_version",
+    "experimental",
+    "deprecated",
+    "trusted",
+    "server",
+    "tags",
+)
 
-class PluginVersionNotFoundError(PluginManagerError):
-    pass
+# Minimum number of plugins read at once when searching with a limit
+SEARCH_BATCH_SIZE = 32
 
 
-class SourcesNotFoundError(PluginManagerError):
-    pass
+def apply_mode(p: Path, mode: Optional[int], owner: Optional[Owner]):
+    """Set the permissions and the ownership of a file if they differ."""
+    if mode is None and not owner:
+        return
+    with timings.phase("permissions"):
+        st = p.lstat()
+        if mode is not None and stat.S_IMODE(st.st_mode) != mode:
+            p.chmod(mode)
+        if owner and (owner[0] not in (-1, st.st_uid) or owner[1] not in (-1, st.st_gid)):
+            os.chown(p, *owner)
 
 
-DEFAULT_SOURCE_URL = "https://plugins.qgis.org/plugins/plugins.xml?qgis={version}"
+def same_content(p: Path, size: int, crc: int) -> bool:
+    """Check if the file has the given size and CRC32."""
+    try:
+        if p.is_symlink() or not p.is_file() or p.stat().st_size != size:
+            return False
+        value = 0
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                value = zlib.crc32(chunk, value)
+        return value == crc
+    except OSError:
+        return False
+
+
+# Lock file of staging folders, locked by the command using the folder
+STAGING_LOCK = ".lock"
+
+
+def lock_staging(staging: Path) -> Optional[IO[bytes]]:
+    """Lock a new staging folder
+
+    The lock is held until the returned file is closed. The lock file is
+    locked before being moved in the folder: a folder without lock file
+    is being created.
+
+    Returns None on platforms without `fcntl`, where staging folders
+    are not locked.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    tmp = temporary_path(staging.joinpath(STAGING_LOCK))
+    f = tmp.open("xb")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        tmp.rename(staging.joinpath(STAGING_LOCK))
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def lock_stale_staging(staging: Path) -> Optional[IO[bytes]]:
+    """Lock a staging folder left by an interrupted command
+
+    Returns None if the folder is in use, or if it cannot be checked
+    on platforms without `fcntl`.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    try:
+        f = staging.joinpath(STAGING_LOCK).open("rb")
+    except OSError:
+        return None
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def parse_content_range(value: Optional[str]) -> Optional[Tuple[int, int, Optional[int]]]:
+    """Parse a `Content-Range` header: `bytes start-end/length`"""
+    m = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", (value or "").strip())
+    if not m:
+        return None
+    start, end, length = m.groups()
+    return int(start), int(end), None if length == "*" else int(length)
+
+
+class InstallTask(NamedTuple):
+    """A plugin to install"""
+
+    plugin_name: str
+    version: Optional[str] = None
+    # Folder of the existing installation
+    plugin_folder: Optional[str] = None
+    include_prerelease: bool = False
+    include_deprecated: bool = False
+    # Plugin directory of the existing installation
+    root: Optional[Path] = None
+
+
+class Archive(NamedTuple):
+    """Resolved archive of a plugin"""
+
+    plugin_name: str
+    version_str: str
+    url: str
+    file_name: str
+    source: Optional[str] = None
 
 
 class Remote:
-    def __init__(self, folder: Path, qgis_version: Optional[str] = None):
-        """Constructor."""
+    def __init__(
+        self,
+        folder: Path,
+        qgis_version: Optional[str] = None,
+        fields: Optional[Collection[str]] = None,
+    ):
+        """Constructor.
+
+        `fields` restricts the plugin fields read from the XML files,
+        all fields are read by default.
+        """
         self.folder = folder
         self.list: List[str] = []
         self.qgis_version = qgis_version
+        self.fields = fields
 
         self._list_plugins: PluginDict = {}
+        # Versions of plugins looked up by name
+        self._lookups: PluginDict = {}
+        self._index: Optional[PluginIndex] = None
+        self._index_checked = False
+        self._search_index: Optional[SearchIndex] = None
+        self._name_suggestions: Optional[NameSuggestions] = None
+
+        self._lock = threading.Lock()
+        # Locks of partial downloads
+        self._partial_locks: Dict[Path, threading.Lock] = {}
+
+        # Cache of downloaded plugin archives
+        cache_size = archive_cache_size()
+        archives_dir = archive_cache_directory() if cache_size else None
+        self.archives = ArchiveCache(archives_dir, cache_size) if archives_dir else None
 
         self.list_remote()
 
@@ -113,37 +281,38 @@ class Remote:
 
         The token [VERSION] is replaced by the current version X.YY
         """
-        source_list = sources_file(self.folder)
-        if not source_list.exists():
-            return []
-
-        qgis_version = self.check_qgis_dev_version(self.qgis_version)
-
-        with source_list.open(encoding="utf8") as f:
-            for line in f.readlines():
-                raw_line = line.strip()
-                if not raw_line:
-                    # Empty line
-                    continue
-
-                if line.startswith("#"):
-                    # Commented line
-                    continue
+        with timings.phase("sources"):
+            source_list = sources_file(self.folder)
+            if not source_list.exists():
+                return []
+
+            qgis_version = self.check_qgis_dev_version(self.qgis_version)
+
+            with source_list.open(encoding="utf8") as f:
+                for line in f.readlines():
+                    raw_line = line.strip()
+                    if not raw_line:
+                        # Empty line
+                        continue
 
-                if "[VERSION]" in raw_line:
-                    if not qgis_version:
-                        echo.alert(
-                            f"Skipping source '{raw_line}' because it has a "
-                            "token [VERSION] but "
-                            "no QGIS version could be detected.\n"
-                        )
+                    if line.startswith("#"):
+                        # Commented line
                         continue
 
-                    raw_line = raw_line.replace("[VERSION]", f"{qgis_version[0]}.{qgis_version[1]}")
+                    if "[VERSION]" in raw_line:
+                        if not qgis_version:
+                            echo.alert(
+                                f"Skipping source '{raw_line}' because it has a "
+                                "token [VERSION] but "
+                                "no QGIS version could be detected.\n"
+                            )
+                            continue
+
+                        raw_line = raw_line.replace("[VERSION]", f"{qgis_version[0]}.{qgis_version[1]}")
 
-                self.list.append(raw_line)
+                    self.list.append(raw_line)
 
-        return self.list
+            return self.list
 
     def cache_directory(self) -> Path:
         """Return the cache directory.
@@ -173,16 +342,15 @@ class Remote:
         *,
         qgis_version: Optional[Union[str, Version]] = None,
     ) -> Optional[Plugin]:
-        if qgis_version and isinstance(qgis_version, str):
-            qgis_version = get_semver_version(qgis_version)
+        qgis_key = qgis_version_key(qgis_version) if qgis_version else None
 
         plugin = None
-        for plugin in self.available_plugins().get(name, ()):
+        for plugin in self.versions(name):
             if plugin.is_pre() and not include_prerelease:
                 continue
             elif plugin.deprecated and not include_deprecated:
                 continue
-            elif qgis_version is not None and not plugin.check_qgis_version(qgis_version):
+            elif qgis_key is not None and not plugin.check_qgis_version(qgis_key):
                 continue
             else:
                 break
@@ -190,23 +358,93 @@ class Remote:
             plugin = None
         return plugin
 
-    def update(self):
-        """For each remote, it updates the XML file."""
+    def update(self, jobs: Optional[int] = None) -> bool:
+        """For each remote, it updates the XML file.
+
+        Remotes are fetched concurrently with at most `jobs` parallel
+        downloads. Cached files are revalidated with the `ETag` and
+        `Last-Modified` validators returned by the server, so
+        unchanged files are not downloaded again.
+
+        Returns False if at least one remote failed.
+        """
 
         # Clear plugin list
-        self._list_plugins = {}
+        self.clear()
 
         if not self.list:
             raise SourcesNotFoundError()
 
         cache = self.cache_directory()
-        if cache.exists():
-            shutil.rmtree(cache)
-
-        cache.mkdir()
+        cache.mkdir(parents=True, exist_ok=True)
 
+        # Remove files from remotes no longer configured
+        in_use: Set[Path] = set()
         for server in self.list:
-            echo.info(f"Downloading {self.public_remote_name(server)}…")
+            filename = self.server_cache_filename(cache, server)
+            in_use.update((filename, self.server_cache_validators(filename)))
+        for p in cache.iterdir():
+            if p.suffix in (".xml", ".json") and p not in in_use:
+                p.unlink()
+
+        failures = 0
+        # Downloaded files waiting to be moved into the cache
+        fetched: List[Tuple[Path, Path, Dict[str, str]]] = []
+
+        try:
+            workers = max(1, min(jobs or DEFAULT_JOBS, len(self.list)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._fetch_index, server, cache) for server in self.list]
+                # Report in the order of the sources list
+                for server, future in zip(self.list, futures):
+                    echo.info(f"Downloading {self.public_remote_name(server)}…")
+                    try:
+                        result = future.result()
+                    except (PluginManagerError, OSError, http.client.HTTPException) as e:
+                        # HTTPError and URLError are OSError
+                        echo.critical(f"ERROR: {e}")
+                        failures += 1
+                        continue
+
+                    if result:
+                        fetched.append((self.server_cache_filename(cache, server), *result))
+                        echo.success("\tOk")
+                    else:
+                        echo.success("\tOk (not modified)")
+
+            metrics.set_value("index_update_failures", failures)
+
+            # Move all downloaded files in place at once, so that
+            # concurrent readers never see a partially updated cache.
+            # The last good copy is kept for remotes that failed.
+            while fetched:
+                filename, tmpfile, validators = fetched.pop()
+                validators_file = self.server_cache_validators(filename)
+                # Invalidate validators before replacing the file
+                validators_file.unlink(missing_ok=True)
+                os.replace(tmpfile, filename)
+                with atomic_write(validators_file, "w", encoding="utf8") as output:
+                    json.dump(validators, output)
+        finally:
+            for _, tmpfile, _ in fetched:
+                tmpfile.unlink(missing_ok=True)
+
+        try:
+            self.compile_index()
+        except PluginManagerError as err:
+            echo.debug("Precompiled index not written: {}", err)
+
+        return failures == 0
+
+    def _fetch_index(self, server: str, cache: Path) -> Optional[Tuple[Path, Dict[str, str]]]:
+        """Download the XML file of a remote into a temporary file
+        of the cache folder.
+
+        Returns the temporary file and the validators of the response or
+        None if the cached file is still valid. Raises `PluginManagerError`
+        if the body is truncated.
+        """
+        with timings.phase("fetch_index", self.public_remote_name(server)):
             url, login, password = self.credentials(server)
             headers = {
                 "User-Agent": self.user_agent(),
@@ -214,114 +452,309 @@ class Remote:
             if login:
                 token = base64.b64encode(f"{login}:{password}".encode())
                 headers["Authorization"] = f"Basic {token.decode()}"
+
+            filename = self.server_cache_filename(cache, server)
+            validators_file = self.server_cache_validators(filename)
+
+            # Conditional request
+            if filename.exists() and validators_file.exists():
+                try:
+                    validators = json.loads(validators_file.read_text(encoding="utf8"))
+                except ValueError:
+                    validators = {}
+                if validators.get("etag"):
+                    headers["If-None-Match"] = validators["etag"]
+                if validators.get("last_modified"):
+                    headers["If-Modified-Since"] = validators["last_modified"]
+
             request = urllib.request.Request(url, headers=headers)
             try:
-                f = urllib.request.urlopen(request)
+                f = urlopen(request)
             except urllib.error.HTTPError as e:
-                echo.critical(f"ERROR: {e}")
-                continue
-            except urllib.error.URLError as e:
-                echo.critical(f"ERROR: {e}")
-                continue
+                if e.code == 304:
+                    echo.debug("{}: not modified", self.public_remote_name(server))
+                    metrics.add("cache_hits", cache="http")
+                    return None
+                raise
 
-            filename = self.server_cache_filename(cache, server)
+            if "If-None-Match" in headers or "If-Modified-Since" in headers:
+                metrics.add("cache_misses", cache="http")
 
-            with open(filename, "wb") as output:
-                output.write(f.read())
+            tmpfile = temporary_path(filename)
+            try:
+                with f, tmpfile.open("xb") as output:
+                    total = content_length(f.headers)
+                    size, _ = copy_stream(f, output, filename.name, total)
+                if total is not None and size != total:
+                    # Connection closed before the end of the body:
+                    # keep the cached file and its validators
+                    raise PluginManagerError(
+                        f"Invalid size for {self.public_remote_name(server)}: {size} bytes, expected {total}",
+                    )
+                timings.add("fetch_index", size=size, count=0)
+                metrics.add("downloaded_bytes", size, source=self.public_remote_name(server), kind="index")
+            except BaseException:
+                tmpfile.unlink(missing_ok=True)
+                raise
 
-            echo.success("\tOk")
+            validators = {
+                "etag": f.headers.get("ETag"),
+                "last_modified": f.headers.get("Last-Modified"),
+            }
+            return tmpfile, validators
 
     def plugin_collection_files(self) -> Iterator[Tuple[str, Path]]:
         """Returns the list of plugins XML file in the cache folder."""
         cache = self.cache_directory()
         for source in self.list:
             coll = self.server_cache_filename(cache, source)
-            if not coll.exists():
+            try:
+                age = metrics.file_age(coll)
+            except FileNotFoundError:
                 raise PluginManagerError(
                     f"File cache missing for source: {source}\nPlease run the 'update' command"
-                )
+                ) from None
+            metrics.set_value("index_age_seconds", round(age, 3), source=self.public_remote_name(source))
             yield source, coll
 
+    def index_file(self) -> Path:
+        """Return the path of the precompiled index."""
+        return self.cache_directory().joinpath("plugins.index")
+
+    def compile_index(self) -> PluginDict:
+        """Parse all XML files and write the precompiled index."""
+        with timings.phase("compile_index"):
+            sources = tuple(self.plugin_collection_files())
+            plugins: PluginDict = {}
+            for source, xml_file in sources:
+                self._parse_xml(xml_file, plugins, source, self.fields)
+            write_index(self.index_file(), sources, plugins, self.fields)
+            self.clear()
+            self._list_plugins = plugins
+            return plugins
+
+    def clear(self):
+        """Clear loaded plugins."""
+        self._list_plugins = {}
+        self._lookups = {}
+        self._index = None
+        self._index_checked = False
+        self._search_index = None
+        self._name_suggestions = None
+
+    def _open_index(self) -> Optional[PluginIndex]:
+        """Open the precompiled index if it is up to date."""
+        if not self._index_checked:
+            sources = tuple(self.plugin_collection_files())
+            with timings.phase("index"):
+                self._index = PluginIndex.open(self.index_file(), sources, self.fields)
+            metrics.add("cache_hits" if self._index else "cache_misses", cache="index")
+            self._index_checked = True
+        return self._index
+
     def available_plugins(self) -> PluginDict:
-        """Populates the list of available plugins, in all XML files."""
+        """Populates the list of available plugins, in all XML files.
+
+        Use the precompiled index if it is up to date.
+        """
         if not self._list_plugins:
             if not self.list:
                 raise SourcesNotFoundError()
-            for source, xml_file in self.plugin_collection_files():
-                self._parse_xml(xml_file, self._list_plugins, source)
+            index = self._open_index()
+            with timings.phase("index"):
+                plugins = index.load() if index else None
+            if plugins is None:
+                plugins = {}
+                for source, xml_file in self.plugin_collection_files():
+                    self._parse_xml(xml_file, plugins, source, self.fields)
+            self._list_plugins = plugins
         return self._list_plugins
 
-    def _parse_xml(self, xml_file: Path, plugins: PluginDict, source: Optional[str] = None):
-        """Parse the given XML file."""
+    def lookup(self, names: Sequence[str]) -> PluginDict:
+        """Return the versions of the given plugins only.
+
+        Only the requested plugins are read from the precompiled
+        index. Without an up to date index, all the XML files are
+        parsed once.
+        """
+        if not self._list_plugins:
+            if not self.list:
+                raise SourcesNotFoundError()
+            index = self._open_index()
+            if index:
+                missing = [name for name in names if name not in self._lookups]
+                with timings.phase("index"):
+                    found = index.lookup(missing) if missing else {}
+                if found is not None:
+                    for name in missing:
+                        self._lookups[name] = found.get(name, ())
+                    return {name: self._lookups[name] for name in names if self._lookups[name]}
+
+        plugins = self.available_plugins()
+        return {name: plugins[name] for name in names if name in plugins}
+
+    def versions(self, name: str) -> Tuple[Plugin, ...]:
+        """Return the versions of a plugin, latest first."""
+        return self.lookup((name,)).get(name, ())
+
+    def plugin_names(self) -> Collection[str]:
+        """Return the names of all available plugins."""
+        if not self._list_plugins:
+            if not self.list:
+                raise SourcesNotFoundError()
+            index = self._open_index()
+            if index:
+                return index.names()
+        return self.available_plugins().keys()
+
+    def _parse_xml(
+        self,
+        xml_file: Path,
+        plugins: PluginDict,
+        source: Optional[str] = None,
+        fields: Optional[Collection[str]] = None,
+    ):
+        """Parse the given XML file.
+
+        The file is parsed incrementally and only `fields` are read
+        from plugin elements.
+        """
+        with timings.phase("parse", self.public_remote_name(source) if source else xml_file.name):
+            # IMPORTANT
+            # The qgis index usually only show the latest experimental
+            # and stable versions of the a plugin
+            # Then you cannot rely on it for checking intermediate versions
+
+            if fields is not None:
+                # Always required
+                fields = {*fields, "file_name", "download_url"}
+
+            # Versions are collected then sorted once per plugin
+            parsed: Dict[str, List[Plugin]] = {}
+
+            depth = 0
+            root = None
+            for event, elem in iterparse(xml_file.absolute(), events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    depth += 1
+                    continue
 
-        # IMPORTANT
-        # The qgis index usually only show the latest experimental
-        # and stable versions of the a plugin
-        # Then you cannot rely on it for checking intermediate versions
+                depth -= 1
+                if depth != 1:
+                    continue
 
-        tree = parse(xml_file.absolute())
-        root = tree.getroot()
-        for elem in root:
-            plugin = Plugin.from_xml_element(elem, source)
+                # Plugin element is complete
+                plugin = Plugin.from_xml_element(elem, source, fields)
+                # Release memory of parsed elements
+                root.clear()  # type: ignore [union-attr]
 
-            name = plugin.name
+                name = plugin.name
 
-            # Check consistency
-            if not plugin.file_name:
-                echo.critical(f"Incomplete plugin data for'{name}': file_name")
-                continue
+                # Check consistency
+                if not plugin.file_name:
+                    echo.critical(f"Incomplete plugin data for'{name}': file_name")
+                    continue
 
-            if not plugin.download_url:
-                echo.critical(f"Incomplete plugin data for '{name}': url")
-                continue
+                if not plugin.download_url:
+                    echo.critical(f"Incomplete plugin data for '{name}': url")
+                    continue
 
-            versions = plugins.get(name)
-            if versions:
-                # Store as decreasing version order (latest first)
-                if plugin.version < versions[-1].version:
-                    plugins[name] = (*versions, plugin)
-                elif plugin.version > versions[0].version:
-                    plugins[name] = (plugin, *versions)
-                else:  # Need to sort
-                    for i, p in enumerate(versions):
-                        if plugin.version > p.version:
-                            plugins[name] = (*versions[:i], plugin, *versions[i:])
-                            break
-                        elif plugin.version == p.version:
-                            # SEMVER does not take build into account
-                            # but here build are meaningfull because QGIS
-                            # plugin version does not stick to SEMVER scheme
-                            #
-                            # Use lexicographic comparison
-                            if (plugin.version.build or "") > (p.version.build or ""):
-                                plugins[name] = (*versions[:i], plugin, *versions[i:])
-                                break
-                    else:
-                        plugins[name] = (*versions, plugin)
-            else:
-                plugins[name] = (plugin,)
+                parsed.setdefault(name, []).append(plugin)
+
+            # Store as decreasing version order (latest first)
+            # Version keys take build into account: SEMVER does not
+            # but here builds are meaningfull because QGIS plugin version
+            # does not stick to SEMVER scheme.
+            # Sort is stable: already known versions come first
+            # for the same key.
+            for name, versions in parsed.items():
+                versions[:0] = plugins.get(name, ())
+                versions.sort(key=attrgetter("version_key"), reverse=True)
+                plugins[name] = tuple(versions)
+
+    def search_index(self) -> SearchIndex:
+        """Return the search index of available plugins.
+
+        The search index is read from the precompiled index if it is
+        up to date.
+        """
+        if self._search_index is None:
+            if not self._list_plugins:
+                if not self.list:
+                    raise SourcesNotFoundError()
+                index = self._open_index()
+                if index:
+                    self._search_index = index.search_index()
+            if self._search_index is None:
+                self._search_index = SearchIndex.build(self.available_plugins())
+        return self._search_index
 
     def search(
         self,
         search_string: str,
         predicat: Optional[Callable[[Plugin], bool]] = None,
         latest: bool = False,
+        *,
+        tags: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
     ) -> Iterator[Plugin]:
-        """Search in plugin names and tags."""
-        self.available_plugins()
+        """Search in plugin names, tags and descriptions.
 
-        for plugin_name, versions in self._list_plugins.items():
-            for plugin in versions:
-                if predicat is not None and not predicat(plugin):
-                    continue
-                if next(similar_names(search_string, plugin.search), None):
-                    yield plugin
-                    break
+        Plugins are returned by decreasing relevance, with the latest
+        version matching the predicate. If `tags` are given, only plugins
+        having all these tags are returned.
+        """
+        if limit is not None and limit < 0:
+            raise ValueError(f"Invalid search limit: {limit}")
+
+        ranked = [name for name, _ in self.search_index().search(search_string, tags=tags)]
+        if limit is not None and predicat is None:
+            ranked = ranked[:limit]
+
+        # With a limit, versions are read in batches: plugins rejected
+        # by the predicate are not known in advance
+        found = 0
+        start = 0
+        while start < len(ranked) and (limit is None or found < limit):
+            if limit is None:
+                batch = ranked[start:]
+            else:
+                batch = ranked[start : start + max(limit - found, SEARCH_BATCH_SIZE)]
+            start += len(batch)
+            plugins = self.lookup(batch)
+            for name in batch:
+                if limit is not None and found >= limit:
+                    return
+                versions = plugins.get(name, ())
                 if latest:  # Don't look at previous versions
-                    break
+                    versions = versions[:1]
+                plugin = next((p for p in versions if predicat is None or predicat(p)), None)
+                if plugin:
+                    yield plugin
+                    found += 1
+
+    def name_suggestions(self) -> NameSuggestions:
+        """Return the BK-tree of available plugin names.
+
+        The tree is read from the precompiled index if it is
+        up to date.
+        """
+        if self._name_suggestions is None:
+            if not self._list_plugins:
+                if not self.list:
+                    raise SourcesNotFoundError()
+                index = self._open_index()
+                if index:
+                    self._name_suggestions = index.name_suggestions()
+            if self._name_suggestions is None:
+                self._name_suggestions = NameSuggestions.build(self.plugin_names())
+        return self._name_suggestions
 
     def check_similar_names(self, name: str) -> Iterator[str]:
-        yield from similar_names(name, self._list_plugins.keys())
+        """Returns plugin names similar to `name`, closest first."""
+        yield from self.name_suggestions().suggest(name)
 
     def install(
         self,
@@ -332,99 +765,542 @@ class Remote:
         remove_zip: bool = True,
         fix_permissions: bool = False,
         plugin_folder: Optional[str] = None,
+        owner: Optional[Owner] = None,
+        incremental: bool = False,
     ) -> str:
         """Install the plugin with a specific version.
 
         Default version is latest.
         """
-        self.available_plugins()
+        archive = self.resolve(plugin_name, version, include_prerelease, include_deprecated)
+        zip_file = self.download(archive)
+        self.deploy(archive, zip_file, plugin_folder, remove_zip, fix_permissions, owner, incremental)
+        return archive.version_str
 
-        plugin = None
-        # Check for requested version otherwise get the latest
-        if version:
-            # Find version
-            # NOTE that the index file may not contains all versions
-            # available !!!!!
-            versions = self._list_plugins.get(plugin_name)
-            if versions:
+    def install_all(
+        self,
+        tasks: Sequence[InstallTask],
+        jobs: Optional[int] = None,
+        remove_zip: bool = True,
+        fix_permissions: bool = False,
+        owner: Optional[Owner] = None,
+        incremental: bool = False,
+    ) -> Generator[Tuple[InstallTask, Union[str, PluginManagerError]], None, None]:
+        """Install several plugins.
+
+        Archives are downloaded concurrently with at most `jobs` parallel
+        downloads while downloaded archives are extracted one at a time.
+
+        Yield for each task, in order, the installed version or the error
+        that occured.
+        """
+        resolved: List[Union[Archive, PluginManagerError]] = []
+        for task in tasks:
+            try:
+                resolved.append(
+                    self.resolve(
+                        task.plugin_name,
+                        task.version,
+                        task.include_prerelease,
+                        task.include_deprecated,
+                    ),
+                )
+            except PluginManagerError as err:
+                resolved.append(err)
+
+        workers = max(1, min(jobs or DEFAULT_JOBS, len(tasks)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = [
+            executor.submit(self.download, archive) if isinstance(archive, Archive) else None
+            for archive in resolved
+        ]
+        deployed = 0
+        try:
+            for task, archive, future in zip(tasks, resolved, futures):
+                deployed += 1
+                if future is None:
+                    yield task, archive  # type: ignore [misc]
+                    continue
                 try:
-                    requested_ver = get_semver_version(version)
-                    plugin = next((p for p in versions if p.version == requested_ver), None)
-                except ValueError:
-                    # Not a semver version
-                    echo.debug(
-                        f"{version} cannot be turned into SemVer compatible version"
-                        f"Using the the literal requested version for download"
+                    zip_file = future.result()
+                    self.deploy(
+                        archive,  # type: ignore [arg-type]
+                        zip_file,
+                        task.plugin_folder,
+                        remove_zip,
+                        fix_permissions,
+                        owner,
+                        incremental,
+                        task.root,
                     )
-                    pass
-
-                # Build a download URL from the latest version
-                # XXX This is a best effort for getting a specific version
-                # This may no works when using versions splitted accross
-                # several repositories
-                latest = versions[0]
-                url = latest.download_url.replace(  # type: ignore [union-attr]
-                    latest.version_str, version
-                )
-                file_name = latest.file_name.replace(  # type: ignore [union-attr]
-                    latest.version_str, version
-                )
-                version_str = version
+                except PluginManagerError as err:
+                    yield task, err
+                else:
+                    yield task, archive.version_str  # type: ignore [union-attr]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Remove archives downloaded but not installed
+            for archive, future in zip(resolved[deployed:], futures[deployed:]):
+                if (
+                    remove_zip
+                    and future is not None
+                    and not future.cancelled()
+                    and future.exception() is None
+                    and not archive.url.startswith("file:")  # type: ignore [union-attr]
+                    and not self.is_cached(future.result())
+                ):
+                    future.result().unlink(missing_ok=True)
+
+    def resolve(
+        self,
+        plugin_name: str,
+        version: Optional[str] = None,
+        include_prerelease: bool = False,
+        include_deprecated: bool = False,
+    ) -> Archive:
+        """Resolve the archive of the plugin with a specific version.
+
+        Default version is latest.
+        """
+        with timings.phase("resolve", plugin_name):
+            plugin = None
+            # Check for requested version otherwise get the latest
+            if version:
+                # Find version
+                # NOTE that the index file may not contains all versions
+                # available !!!!!
+                versions = self.versions(plugin_name)
+                if versions:
+                    try:
+                        requested_ver = get_semver_version(version)
+                        plugin = next((p for p in versions if p.version == requested_ver), None)
+                    except ValueError:
+                        # Not a semver version
+                        echo.debug(
+                            f"{version} cannot be turned into SemVer compatible version"
+                            f"Using the the literal requested version for download"
+                        )
+                        pass
+
+                    # Build a download URL from the latest version
+                    # XXX This is a best effort for getting a specific version
+                    # This may no works when using versions splitted accross
+                    # several repositories
+                    latest = versions[0]
+                    url = latest.download_url.replace(  # type: ignore [union-attr]
+                        latest.version_str, version
+                    )
+                    file_name = latest.file_name.replace(  # type: ignore [union-attr]
+                        latest.version_str, version
+                    )
+                    version_str = version
+                    source = latest.source
+                else:
+                    raise PluginNotFoundError()
             else:
-                raise PluginNotFoundError()
-        else:
-            plugin = self.latest(
-                plugin_name,
-                include_prerelease,
-                include_deprecated,
-            )
+                plugin = self.latest(
+                    plugin_name,
+                    include_prerelease,
+                    include_deprecated,
+                )
+
+                if not plugin:
+                    raise PluginNotFoundError()
 
-            if not plugin:
-                raise PluginNotFoundError()
+                version_str = plugin.version_str
 
-            version_str = plugin.version_str
+                url = plugin.download_url
+                file_name = plugin.file_name
+                source = plugin.source
 
-            url = plugin.download_url
-            file_name = plugin.file_name
+            return Archive(plugin_name, version_str, url, file_name, source)  # type: ignore [arg-type]
 
-        echo.debug("Downloading {} from {}", file_name, url)
-        zip_file = self._download_zip(url, plugin_name, file_name, version_str)
+    def download(self, archive: Archive) -> Path:
+        """Download the archive of a plugin.
 
-        # Removing existing plugin folder if needed
-        if plugin_folder:
-            existing = self.folder.joinpath(plugin_folder)
-            if existing.exists():
-                echo.debug(f"{plugin_name}: Removing existing installation: {existing}")
+        Use the archive cache if the archive has already been downloaded.
+        """
+        with timings.phase("download", archive.plugin_name):
+            archives = self.archives
+            if archives and not archive.url.startswith("file:"):
+                cached = archives.get(archive.url, archive.version_str)
+                metrics.add("cache_hits" if cached else "cache_misses", cache="archives")
+                if cached:
+                    echo.debug("Using cached archive {} for {}", cached.name, archive.file_name)
+                    return cached
+
+            echo.debug("Downloading {} from {}", archive.file_name, archive.url)
+            zip_file, digest = self._download_zip(
+                archive.url,
+                archive.plugin_name,
+                archive.file_name,
+                archive.version_str,
+                archive.source,
+            )
+            if archives and digest:
                 try:
-                    shutil.rmtree(existing)
-                except OSError as e:
-                    # https://github.com/3liz/qgis-plugin-manager/issues/53
-                    zip_file.unlink()
-                    raise PluginManagerError(f"{e}")
+                    zip_file = archives.put(archive.url, archive.version_str, zip_file, digest)
+                except OSError as err:
+                    echo.alert(f"Cannot store {archive.file_name} in the archive cache: {err}")
+            return zip_file
+
+    def is_cached(self, zip_file: Path) -> bool:
+        """Check if the archive belongs to the archive cache."""
+        return self.archives is not None and self.archives.owns(zip_file)
+
+    def deploy(
+        self,
+        archive: Archive,
+        zip_file: Path,
+        plugin_folder: Optional[str] = None,
+        remove_zip: bool = True,
+        fix_permissions: bool = False,
+        owner: Optional[Owner] = None,
+        incremental: bool = False,
+        root: Optional[Path] = None,
+    ):
+        """Install a downloaded archive in the plugin directory.
 
+        The archive is extracted in a staging folder and checked before
+        replacing the existing installation, `plugin_folder`, with renames.
+        The existing installation is restored on failure.
+
+        With `fix_permissions`, permissions are set to 0644 for files and
+        0755 for directories, and ownership to `owner` if given, while
+        extracting.
+
+        With `incremental`, the existing installation is updated in place
+        and only changed files are written.
+
+        The archive is installed in the plugin directory `root`,
+        the directory of the remote by default.
+        """
+        plugin_name = archive.plugin_name
+        root = root or self.folder
         if not zip_file.exists():
             raise PluginManagerError(
                 f"The zip file does not exist : {zip_file.absolute()}",
             )
-        # Extracting the zip in the folder
-        echo.debug(f"Extracting {zip_file.name}")
-        with zipfile.ZipFile(zip_file, "r") as zip_ref:
-            zip_ref.extractall(self.folder)
 
-        if remove_zip:
+        if incremental and plugin_folder and root.joinpath(plugin_folder).is_dir():
+            echo.debug(f"Updating {plugin_folder} from {zip_file.name}")
+            try:
+                with timings.phase("extract", plugin_name):
+                    updated = self._update_in_place(
+                        plugin_name,
+                        zip_file,
+                        root.joinpath(plugin_folder),
+                        fix_permissions,
+                        owner,
+                    )
+            except (zipfile.BadZipFile, OSError) as e:
+                raise PluginManagerError(f"{plugin_name}: cannot extract {zip_file.name}: {e}") from e
+            if updated:
+                self._record_install(archive, zip_file, [plugin_folder], plugin_folder, root)
+                if remove_zip and not self.is_cached(zip_file):
+                    zip_file.unlink()
+                return
+            echo.debug(f"{plugin_name}: plugin folder changed, installing from scratch")
+
+        self._remove_stale_staging(plugin_name, root)
+
+        # Staging folder on the same file system
+        staging = root.joinpath(f".staging-{self._staging_key(plugin_name)}-{token_hex(4)}")
+        staging.mkdir()
+        lock = None
+        try:
+            lock = lock_staging(staging)
+            # Extracting the zip in the staging folder
+            echo.debug(f"Extracting {zip_file.name}")
+            try:
+                with timings.phase("extract", plugin_name):
+                    self._extract(zip_file, staging.joinpath("new"), fix_permissions, owner)
+            except (zipfile.BadZipFile, OSError) as e:
+                raise PluginManagerError(f"{plugin_name}: cannot extract {zip_file.name}: {e}") from e
+
+            folders = self._staged_folders(plugin_name, staging.joinpath("new"))
+            with timings.phase("swap", plugin_name):
+                self._swap(plugin_name, folders, staging, plugin_folder, root)
+        finally:
+            # Removed before releasing the lock
+            with timings.phase("cleanup", plugin_name):
+                shutil.rmtree(staging, ignore_errors=True)
+            if lock:
+                lock.close()
+            if staging.exists():
+                echo.alert(f"Cannot remove the staging folder {staging}")
+
+        self._record_install(archive, zip_file, [folder.name for folder in folders], plugin_folder, root)
+
+        if remove_zip and not self.is_cached(zip_file):
             # Removing the zip file
             zip_file.unlink()
 
-        # Set permissions to 0644 for files, 0755 for directories
+    def _record_install(
+        self,
+        archive: Archive,
+        zip_file: Path,
+        folders: Sequence[str],
+        plugin_folder: Optional[str],
+        root: Path,
+    ):
+        """Record the installed folders in the manifest of the plugin directory."""
+        with timings.phase("manifest", archive.plugin_name):
+            manifest = Manifest.load(root)
+            # The previous version was installed in another folder
+            if plugin_folder and plugin_folder not in folders:
+                manifest.remove(plugin_folder)
+
+            digest = zip_file.stem if self.is_cached(zip_file) else file_digest(zip_file)
+            for name in folders:
+                path = root.joinpath(name)
+                try:
+                    metadata = read_metadata(path)
+                except (OSError, KeyError, configparser.Error) as err:
+                    echo.debug(f"{archive.plugin_name}: invalid metadata in {name}: {err}")
+                    manifest.remove(name)
+                    continue
+                manifest.set(
+                    name,
+                    {
+                        "metadata": metadata,
+                        "metadata_stamp": metadata_stamp(path),
+                        "source": self.public_remote_name(archive.source) if archive.source else None,
+                        "url": self.public_remote_name(archive.url),
+                        "sha256": digest,
+                        "files": plugin_files(path),
+                    },
+                )
+            manifest.save()
+
+    @staticmethod
+    def _extract(
+        zip_file: Path,
+        dest: Path,
+        fix_permissions: bool = False,
+        owner: Optional[Owner] = None,
+    ):
+        """Extract the archive in `dest`.
+
+        Permissions and ownership are applied to each member as it
+        is extracted, including the intermediate folders.
+        """
         if fix_permissions:
             echo.debug("Fixing files permissions to 0644")
-            for p in self.folder.glob("**"):
-                if p.is_dir():
-                    p.chmod(0o755)
+
+        dest.mkdir()
+        done = {dest}
+
+        def fix(p: Path, mode: int):
+            apply_mode(p, mode if fix_permissions else None, owner)
+
+        with zipfile.ZipFile(zip_file, "r") as zip_ref:
+            for member in zip_ref.infolist():
+                p = Path(zip_ref.extract(member, dest))
+                if not (fix_permissions or owner):
+                    continue
+                # Set permissions to 0644 for files, 0755 for directories
+                folders = [p] if member.is_dir() else []
+                parent = p.parent
+                while parent not in done:
+                    folders.append(parent)
+                    parent = parent.parent
+                for folder in reversed(folders):
+                    if folder not in done:
+                        fix(folder, 0o755)
+                        done.add(folder)
+                if not member.is_dir():
+                    fix(p, 0o644)
+
+    def _update_in_place(
+        self,
+        plugin_name: str,
+        zip_file: Path,
+        target: Path,
+        fix_permissions: bool = False,
+        owner: Optional[Owner] = None,
+    ) -> bool:
+        """Update an existing installation with the changed files only.
+
+        Files are compared with the size and the CRC32 of the archive
+        members: only changed files are written and files no longer
+        in the archive are removed.
+
+        Returns False if the archive does not contain the `target`
+        plugin folder only.
+        """
+        with zipfile.ZipFile(zip_file, "r") as zip_ref:
+            members = [m for m in zip_ref.infolist() if not m.filename.startswith("__MACOSX/")]
+            if {m.filename.split("/", 1)[0] for m in members} != {target.name}:
+                return False
+
+            names = {m.filename.rstrip("/") for m in members}
+            missing = [
+                name for name in ("metadata.txt", "__init__.py") if f"{target.name}/{name}" not in names
+            ]
+            if missing:
+                raise PluginManagerError(
+                    f"{plugin_name}: invalid archive, {', '.join(missing)} missing in {target.name}",
+                )
+
+            plugin_dir = target.parent
+            root = plugin_dir.resolve()
+            dir_mode, file_mode = (0o755, 0o644) if fix_permissions else (None, None)
+            # Paths of the archive
+            keep = {target}
+            written = skipped = 0
+            for member in members:
+                p = plugin_dir.joinpath(member.filename)
+                if not p.resolve().is_relative_to(root):
+                    raise PluginManagerError(f"{plugin_name}: invalid member {member.filename} in archive")
+
+                folders = [p] if member.is_dir() else []
+                parent = p.parent
+                while parent not in keep and parent != plugin_dir:
+                    folders.append(parent)
+                    parent = parent.parent
+                for folder in reversed(folders):
+                    if folder.is_symlink() or (folder.exists() and not folder.is_dir()):
+                        folder.unlink()
+                    folder.mkdir(exist_ok=True)
+                    apply_mode(folder, dir_mode, owner)
+                    keep.add(folder)
+                if member.is_dir():
+                    continue
+
+                keep.add(p)
+                if same_content(p, member.file_size, member.CRC):
+                    skipped += member.file_size
                 else:
-                    p.chmod(0o644)
+                    if p.is_dir() and not p.is_symlink():
+                        shutil.rmtree(p)
+                    with zip_ref.open(member) as src, atomic_write(p) as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                    written += member.file_size
+                apply_mode(p, file_mode, owner)
+
+        # Remove files no longer in the archive
+        removed = 0
+        for dirpath, dirnames, filenames in os.walk(target, topdown=False):
+            folder = Path(dirpath)
+            for name in filenames:
+                p = folder.joinpath(name)
+                if p not in keep:
+                    p.unlink()
+                    removed += 1
+            for name in dirnames:
+                p = folder.joinpath(name)
+                if p not in keep:
+                    if p.is_symlink():
+                        p.unlink()
+                    else:
+                        p.rmdir()
+                    removed += 1
+
+        echo.info(
+            f"\t{plugin_name}: {format_size(written)} written, "
+            f"{format_size(skipped)} unchanged, {removed} removed",
+        )
+        return True
+
+    @staticmethod
+    def _staging_key(plugin_name: str) -> str:
+        return re.sub(r"[^\w.]", "_", plugin_name)
+
+    @classmethod
+    def _remove_stale_staging(cls, plugin_name: str, root: Path):
+        """Remove staging folders of the plugin left by interrupted commands.
+
+        Existing installations moved in a staging folder are restored
+        if they have not been replaced.
+        """
+        key = cls._staging_key(plugin_name)
+        for staging in root.glob(f".staging-{key}-*"):
+            if staging.name.removeprefix(".staging-").rsplit("-", 1)[0] != key:
+                continue
+            # Folders in use are locked by their command
+            lock = lock_stale_staging(staging)
+            if not lock:
+                continue
+            with lock:
+                echo.debug(f"{plugin_name}: Removing stale staging folder {staging.name}")
+                backup = staging.joinpath("old")
+                if backup.is_dir():
+                    for folder in backup.iterdir():
+                        target = root.joinpath(folder.name)
+                        if not (target.exists() or target.is_symlink()):
+                            echo.alert(
+                                f"{plugin_name}: Restoring {folder.name} from an interrupted installation",
+                            )
+                            folder.rename(target)
+                shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def _staged_folders(plugin_name: str, staged: Path) -> List[Path]:
+        """Check the folders extracted from an archive.
+
+        Each folder must be a plugin with a `metadata.txt` and a `__init__.py` file.
+        """
+        folders = []
+        for p in sorted(staged.iterdir()):
+            if p.name == "__MACOSX":
+                continue
+            if not p.is_dir():
+                echo.debug(f"{plugin_name}: Ignoring {p.name} at the root of the archive")
+                continue
+            missing = [name for name in ("metadata.txt", "__init__.py") if not p.joinpath(name).is_file()]
+            if missing:
+                raise PluginManagerError(
+                    f"{plugin_name}: invalid archive, {', '.join(missing)} missing in {p.name}",
+                )
+            folders.append(p)
 
-        return version_str
+        if not folders:
+            raise PluginManagerError(f"{plugin_name}: invalid archive, no plugin folder found")
+        return folders
+
+    def _swap(
+        self,
+        plugin_name: str,
+        folders: Sequence[Path],
+        staging: Path,
+        plugin_folder: Optional[str],
+        root: Path,
+    ):
+        """Replace the existing installation with the staged folders.
+
+        Existing folders are moved in the staging folder, so that they are
+        removed with it, or restored if a rename fails.
+        """
+        backup = staging.joinpath("old")
+        backup.mkdir()
+
+        replaced: List[str] = []
+        installed: List[Path] = []
+        try:
+            for folder in folders:
+                target = root.joinpath(folder.name)
+                if target.exists() or target.is_symlink():
+                    echo.debug(f"{plugin_name}: Replacing existing installation: {target}")
+                    target.rename(backup.joinpath(folder.name))
+                    replaced.append(folder.name)
+                folder.rename(target)
+                installed.append(folder)
+
+            # The previous version was installed in another folder
+            if plugin_folder and plugin_folder not in (folder.name for folder in folders):
+                existing = root.joinpath(plugin_folder)
+                if existing.exists() or existing.is_symlink():
+                    echo.debug(f"{plugin_name}: Removing existing installation: {existing}")
+                    existing.rename(backup.joinpath(plugin_folder))
+                    replaced.append(plugin_folder)
+        except OSError as e:
+            # https://github.com/3liz/qgis-plugin-manager/issues/53
+            for folder in reversed(installed):
+                root.joinpath(folder.name).rename(folder)
+            for name in reversed(replaced):
+                backup.joinpath(name).rename(root.joinpath(name))
+            raise PluginManagerError(f"{plugin_name}: installation failed, existing version kept: {e}") from e
 
     def _download_zip(
         self,
@@ -432,50 +1308,177 @@ class Remote:
         plugin_name: str,
         file_name: str,
         version_str: str,
-    ) -> Path:
-        """Download the ZIP"""
+        source: Optional[str] = None,
+    ) -> Tuple[Path, Optional[str]]:
+        """Download the ZIP
+
+        Returns the archive and its sha256 digest, None for local archives.
+        """
         if url.startswith("file:"):
-            zip_file = Path(unquote(urlparse(url).path))
-        else:
-            headers = {
-                "User-Agent": self.user_agent(),
-            }
-            request = urllib.request.Request(url, headers=headers)
-            try:
-                f = urllib.request.urlopen(request)
-            except urllib.error.HTTPError as e:
-                if e.code == 401:
-                    echo.debug("Authentication required")
-                    for _, login, password in self.all_credentials():
-                        # Hack to try all logins until we find the one working…
-                        token = base64.b64encode(f"{login}:{password}".encode())
-                        headers["Authorization"] = f"Basic {token.decode()}"
-
-                        request = urllib.request.Request(url, headers=headers)
-                        try:
-                            f = urllib.request.urlopen(request)
-                            break
-                        except urllib.error.HTTPError:
-                            continue
-                    else:
-                        raise PluginManagerError("Failed to download plugin")
-                elif e.code == 404:
-                    raise PluginVersionNotFoundError(version_str)
+            return Path(unquote(urlparse(url).path)), None
+
+        part = self.partial_file(url, version_str)
+        # Do not download the same archive twice at the same time
+        with self._lock:
+            lock = self._partial_locks.setdefault(part, threading.Lock())
+        with lock:
+            return self._download_part(url, file_name, version_str, part, source)
+
+    def _download_part(
+        self,
+        url: str,
+        file_name: str,
+        version_str: str,
+        part: Path,
+        source: Optional[str] = None,
+    ) -> Tuple[Path, Optional[str]]:
+        """Download the archive to a partial file
+
+        Resume the partial download if possible. Downloaded bytes are
+        accounted to `source`, or to the host of the URL.
+        """
+        headers = {
+            "User-Agent": self.user_agent(),
+        }
+
+        # Resume a previous partial download
+        part_info = part.with_suffix(".json")
+        info, range_headers = self._resume_headers(part, part_info)
+        try:
+            f = self._open_download(url, version_str, {**headers, **range_headers})
+        except urllib.error.HTTPError:
+            # Range not satisfiable
+            f = self._open_download(url, version_str, headers)
+
+        offset = 0
+        if f.status == 206:
+            content_range = parse_content_range(f.headers.get("Content-Range"))
+            expected = (part.stat().st_size, info["length"])
+            if content_range and (content_range[0], content_range[2]) == expected:
+                offset = content_range[0]
+            else:
+                echo.debug("{}: unexpected range {}", file_name, f.headers.get("Content-Range"))
+                f.close()
+                f = self._open_download(url, version_str, headers)
+
+        h = hashlib.sha256()
+        try:
+            with f:
+                if offset:
+                    echo.debug("{}: resuming download at {}", file_name, format_size(offset))
+                    total = info["length"]
+                    with part.open("rb") as existing:
+                        for chunk in iter(lambda: existing.read(CHUNK_SIZE), b""):
+                            h.update(chunk)
                 else:
-                    raise PluginManagerError(f"Error downloading plugin: {e}")
+                    total = content_length(f.headers)
+                    # Keep the validators for resuming an interrupted download
+                    part.parent.mkdir(parents=True, exist_ok=True)
+                    with atomic_write(part_info, "w", encoding="utf8") as output:
+                        json.dump(
+                            {
+                                "etag": f.headers.get("ETag"),
+                                "last_modified": f.headers.get("Last-Modified"),
+                                "length": total,
+                            },
+                            output,
+                        )
 
-            # Saving the zip from the URL
-            zip_file = self.folder.joinpath(file_name)
+                with part.open("ab" if offset else "wb") as output:
+                    size, digest = copy_stream(
+                        f,
+                        output,
+                        file_name,
+                        total - offset if total is not None else None,
+                        h,
+                    )
+            timings.add("download", size=size, count=0)
+            metrics.add(
+                "downloaded_bytes",
+                size,
+                source=self.public_remote_name(source) if source else urlparse(url).netloc,
+                kind="archive",
+            )
+        except (OSError, http.client.HTTPException) as e:
+            raise PluginManagerError(
+                f"Download of {file_name} interrupted: {e!r}, run the command again to resume",
+            ) from e
 
-            try:
-                with open(zip_file, "wb") as output:
-                    output.write(f.read())
-            except PermissionError:
-                file_path = self.folder.absolute()
-                echo.critical(f"Cannot write to \t{file_path}")
+        if total is not None and offset + size < total:
+            # Connection closed before the end of the body
+            raise PluginManagerError(
+                f"Download of {file_name} interrupted at {format_size(offset + size)}, "
+                "run the command again to resume",
+            )
+        if total is not None and offset + size != total:
+            part.unlink(missing_ok=True)
+            part_info.unlink(missing_ok=True)
+            raise PluginManagerError(f"Invalid size for {file_name}: {offset + size} bytes, expected {total}")
+
+        # Saving the zip from the URL
+        zip_file = self.folder.joinpath(file_name)
+
+        try:
+            shutil.move(part, zip_file)
+        except PermissionError:
+            file_path = self.folder.absolute()
+            echo.critical(f"Cannot write to \t{file_path}")
+            raise
+        part_info.unlink(missing_ok=True)
+
+        echo.debug("{}: sha256 {}", file_name, digest)
+
+        return zip_file, digest
+
+    def _open_download(self, url: str, version_str: str, headers: Dict[str, str]) -> Response:
+        """Send the download request, trying all credentials if needed.
+
+        Raises `urllib.error.HTTPError` only if the requested range is not satisfiable.
+        """
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            return urlopen(request)
+        except urllib.error.HTTPError as e:
+            if e.code == 401:
+                echo.debug("Authentication required")
+                for _, login, password in self.all_credentials():
+                    # Hack to try all logins until we find the one working…
+                    token = base64.b64encode(f"{login}:{password}".encode())
+                    headers["Authorization"] = f"Basic {token.decode()}"
+
+                    request = urllib.request.Request(url, headers=headers)
+                    try:
+                        return urlopen(request)
+                    except urllib.error.HTTPError:
+                        continue
+                raise PluginManagerError("Failed to download plugin")
+            elif e.code == 404:
+                raise PluginVersionNotFoundError(version_str)
+            elif e.code == 416 and "Range" in headers:
                 raise
+            else:
+                raise PluginManagerError(f"Error downloading plugin: {e}")
 
-        return zip_file
+    def partial_file(self, url: str, version: str) -> Path:
+        """Return the path of the partial download of an archive."""
+        key = hashlib.sha256(f"{url}\0{version}".encode()).hexdigest()
+        return self.cache_directory().joinpath("downloads", f"{key}.part")
+
+    @staticmethod
+    def _resume_headers(part: Path, part_info: Path) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Return the validators of a partial download and the headers for resuming it."""
+        try:
+            info = json.loads(part_info.read_text(encoding="utf8"))
+            offset = part.stat().st_size
+        except (OSError, ValueError):
+            return {}, {}
+
+        # Weak ETags cannot be used in If-Range
+        etag = info.get("etag")
+        validator = etag if etag and not etag.startswith("W/") else info.get("last_modified")
+        if not (validator and offset and info.get("length")):
+            return info, {}
+        return info, {"Range": f"bytes={offset}-", "If-Range": validator}
 
     @staticmethod
     def check_qgis_dev_version(qgis_version: Optional[str]) -> Optional[List[str]]:
@@ -499,6 +1502,11 @@ class Remote:
         filename = re.sub(r"\-+", "-", filename)
         return cache_folder.joinpath(f"{filename}.xml")
 
+    @staticmethod
+    def server_cache_validators(cache_file: Path) -> Path:
+        """Return the path for the HTTP validators of a XML file."""
+        return cache_file.with_suffix(".json")
+
     @classmethod
     def credentials(cls, server: str) -> Tuple[str, str, str]:
         """Parse for login and password if needed."""
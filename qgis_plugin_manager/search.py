@@ -0,0 +1,302 @@
+"""Full-text search over plugin names, tags and descriptions
+
+Plugins are indexed with an inverted index of their tokens. Fuzzy
+matching of search terms relies on the trigrams of the indexed tokens.
+"""
+
+import re
+
+from bisect import bisect_left
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from qgis_plugin_manager.definitions import PluginDict
+
+# Weights of indexed fields
+NAME_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Bonus for a search string matching a plugin name
+EXACT_NAME_BONUS = 10.0
+
+# Score of matches relative to an exact token match
+PREFIX_SCORE = 0.9
+FUZZY_SCORE = 0.8
+
+# Minimum trigram similarity of fuzzy matches, short tokens are
+# also matched by edit distance
+FUZZY_THRESHOLD = 0.7
+
+# Minimum length of search terms for prefix and fuzzy matches
+MIN_FUZZY_LENGTH = 3
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return WORD.findall(text.lower())
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a plugin name for comparisons"""
+    return "".join(tokenize(name))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edit_distance(word: str) -> int:
+    """Maximum edit distance of words close to `word`"""
+    return max(1, len(word) // 4)
+
+
+def split_tags(tags: Optional[str]) -> Iterator[str]:
+    if tags:
+        for tag in tags.split(","):
+            tag = tag.strip().lower()
+            if tag:
+                yield tag
+
+
+class SearchIndex:
+    """Inverted index of plugins"""
+
+    def __init__(self):
+        # token -> {plugin name: weight}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # trigram -> tokens
+        self._trigrams: Dict[str, Set[str]] = {}
+        # tag -> plugin names
+        self._tags: Dict[str, Set[str]] = {}
+        # normalized name -> plugin names
+        self._names: Dict[str, Set[str]] = {}
+        # Sorted tokens, for prefix matches
+        self._tokens: List[str] = []
+
+    @classmethod
+    def build(cls, plugins: PluginDict) -> "SearchIndex":
+        """Build the index from all versions of plugins"""
+        index = cls()
+        for name, versions in plugins.items():
+            index._names.setdefault(normalize_name(name), set()).add(name)
+            index._add(name, (*tokenize(name), normalize_name(name)), NAME_WEIGHT)
+            for plugin in versions:
+                for tag in split_tags(plugin.tags):
+                    index._tags.setdefault(tag, set()).add(name)
+                    index._add(name, (*tokenize(tag), normalize_name(tag)), TAG_WEIGHT)
+                if plugin.description:
+                    index._add(name, tokenize(plugin.description), DESCRIPTION_WEIGHT)
+        index._tokens = sorted(index._postings)
+        return index
+
+    def to_data(self) -> Tuple:
+        """Return the index as plain data"""
+        return self._postings, self._trigrams, self._tags, self._names, self._tokens
+
+    @classmethod
+    def from_data(cls, data: Tuple) -> "SearchIndex":
+        index = cls()
+        index._postings, index._trigrams, index._tags, index._names, index._tokens = data
+        return index
+
+    def _add(self, name: str, tokens: Iterable[str], weight: float):
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+            if postings.get(name, 0.0) < weight:
+                postings[name] = weight
+
+    def _matches(self, term: str) -> Iterator[Tuple[str, float]]:
+        """Return indexed tokens matching the search term with their score"""
+        if term in self._postings:
+            yield term, 1.0
+
+        if len(term) < MIN_FUZZY_LENGTH:
+            return
+
+        # Tokens starting with the term follow it in sorted order
+        tokens = self._tokens
+        i = bisect_left(tokens, term)
+        while i < len(tokens) and tokens[i].startswith(term):
+            if tokens[i] != term:
+                yield tokens[i], PREFIX_SCORE
+            i += 1
+
+        # Count trigrams shared with each candidate token
+        grams = trigrams(term)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for token in self._trigrams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+
+        max_distance = max_edit_distance(term)
+        for token, count in shared.items():
+            if token == term or token.startswith(term):
+                continue
+            token_grams = len(trigrams(token))
+            similarity = 2.0 * count / (len(grams) + token_grams)
+            # A single edit changes at most 3 trigrams: only compute the
+            # distance of tokens which may be close enough
+            if (
+                similarity < FUZZY_THRESHOLD
+                and abs(len(token) - len(term)) <= max_distance
+                and count >= max(len(grams), token_grams) - 3 * max_distance
+            ):
+                distance = edit_distance(term, token)
+                if distance <= max_distance:
+                    similarity = max(similarity, 1.0 - distance / max(len(term), len(token)))
+            if similarity >= FUZZY_THRESHOLD:
+                yield token, FUZZY_SCORE * similarity
+
+    def search(
+        self,
+        query: str,
+        tags: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Return plugin names ranked by decreasing score
+
+        If `tags` are given, only plugins with all these tags are returned.
+        """
+        candidates: Optional[Set[str]] = None
+        for tag in tags or ():
+            tagged = self._tags.get(tag.strip().lower(), set())
+            candidates = tagged if candidates is None else candidates & tagged
+
+        terms = list(dict.fromkeys(tokenize(query)))
+
+        scores: Dict[str, float] = {}
+        if terms:
+            matched: Dict[str, int] = {}
+            for term in terms:
+                best: Dict[str, float] = {}
+                for token, score in self._matches(term):
+                    for name, weight in self._postings[token].items():
+                        if best.get(name, 0.0) < score * weight:
+                            best[name] = score * weight
+                for name, score in best.items():
+                    scores[name] = scores.get(name, 0.0) + score
+                    matched[name] = matched.get(name, 0) + 1
+
+            # Favor plugins matching all terms
+            for name in scores:
+                scores[name] *= matched[name] / len(terms)
+
+            for name in self._names.get(normalize_name(query), ()):
+                scores[name] = scores.get(name, 0.0) + EXACT_NAME_BONUS
+
+            if candidates is not None:
+                scores = {name: score for name, score in scores.items() if name in candidates}
+        elif candidates is not None:
+            scores = dict.fromkeys(candidates, 1.0)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0].lower()))
+        return ranked[:limit] if limit is not None else ranked
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ca != cb),
+                ),
+            )
+        previous = current
+    return previous[-1]
+
+
+class NameSuggestions:
+    """BK-tree of normalized plugin names
+
+    Used for suggesting plugin names close to a misspelled one.
+    """
+
+    def __init__(self):
+        # Nodes are [normalized name, {distance: child node}]
+        self._root: Optional[List] = None
+        # normalized name -> plugin names
+        self._names: Dict[str, List[str]] = {}
+
+    @classmethod
+    def build(cls, names: Iterable[str]) -> "NameSuggestions":
+        tree = cls()
+        for name in names:
+            tree.add(name)
+        return tree
+
+    def to_data(self) -> Tuple:
+        """Return the tree as plain data"""
+        return self._root, self._names
+
+    @classmethod
+    def from_data(cls, data: Tuple) -> "NameSuggestions":
+        tree = cls()
+        tree._root, tree._names = data
+        return tree
+
+    def add(self, name: str):
+        word = normalize_name(name)
+        names = self._names.get(word)
+        if names is not None:
+            if name not in names:
+                names.append(name)
+            return
+
+        self._names[word] = [name]
+        if self._root is None:
+            self._root = [word, {}]
+            return
+
+        node = self._root
+        while True:
+            d = edit_distance(word, node[0])
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [word, {}]
+                return
+            node = child
+
+    def suggest(self, name: str, max_distance: Optional[int] = None) -> List[str]:
+        """Return plugin names close to `name`, closest first
+
+        The default maximum distance depends on the length of the name.
+        """
+        word = normalize_name(name)
+        if max_distance is None:
+            max_distance = max_edit_distance(word)
+
+        found: List[Tuple[int, str]] = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            d = edit_distance(word, node[0])
+            if d <= max_distance:
+                found.append((d, node[0]))
+            # Triangle inequality: only children within range may match
+            for dist, child in node[1].items():
+                if d - max_distance <= dist <= d + max_distance:
+                    stack.append(child)
+
+        found.sort()
+        return [name for _, w in found for name in sorted(self._names[w])]
@@ -0,0 +1,150 @@
+"""Timings of the phases of a command
+
+Phases are recorded for the whole command and for each plugin or
+remote source. A phase started while another phase of a plugin is
+running in the same thread is recorded for this plugin too, i.e
+permissions set while extracting a plugin.
+
+Timings are reported with the `--timings` option.
+"""
+
+import json
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterator,
+    Optional,
+)
+
+from qgis_plugin_manager import echo
+
+
+class Phase:
+    """Accumulated duration of a phase"""
+
+    __slots__ = ("count", "seconds", "size")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Bytes transferred
+        self.size = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"count": self.count, "seconds": round(self.seconds, 6)}
+        if self.size:
+            data["bytes"] = self.size
+        return data
+
+
+class Timings:
+    def __init__(self):
+        self.command: Optional[str] = None
+        self.started = time.perf_counter()
+        self.phases: Dict[str, Phase] = {}
+        # Plugin or source -> phases
+        self.items: Dict[str, Dict[str, Phase]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self, command: Optional[str]):
+        self.command = command
+        self.started = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name: str, item: Optional[str] = None) -> Iterator[None]:
+        """Record the duration of a phase, for `item` or the plugin
+        of the enclosing phase
+        """
+        parent = getattr(self._local, "item", None)
+        item = item or parent
+        self._local.item = item
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.item = parent
+            self.add(name, time.perf_counter() - start, item=item)
+
+    def add(
+        self,
+        name: str,
+        seconds: float = 0.0,
+        size: int = 0,
+        item: Optional[str] = None,
+        count: int = 1,
+    ):
+        """Add a measure to a phase"""
+        item = item or getattr(self._local, "item", None)
+        with self._lock:
+            phases = [self.phases.setdefault(name, Phase())]
+            if item:
+                phases.append(self.items.setdefault(item, {}).setdefault(name, Phase()))
+            for phase in phases:
+                phase.count += count
+                phase.seconds += seconds
+                phase.size += size
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "command": self.command,
+                "seconds": round(self.elapsed(), 6),
+                "phases": {name: phase.as_dict() for name, phase in self.phases.items()},
+                "items": {
+                    item: {name: phase.as_dict() for name, phase in phases.items()}
+                    for item, phases in self.items.items()
+                },
+            }
+
+    def report(self, fmt: str = "text"):
+        """Print the timings on the standard error"""
+        if fmt == "json":
+            echo.info(json.dumps(self.as_dict()))
+            return
+
+        from qgis_plugin_manager.utils import format_size
+
+        def line(name: str, phase: Phase) -> str:
+            s = f"{name:<24} {phase.seconds:>9.3f}s {phase.count:>6}"
+            if phase.size:
+                rate = phase.size / phase.seconds if phase.seconds else 0
+                s += f"  {format_size(phase.size)} ({format_size(rate)}/s)"
+            return s
+
+        echo.info(f"\nTimings of '{self.command}': {self.elapsed():.3f}s")
+        echo.info(f"{'Phase':<24} {'Duration':>10} {'Count':>6}")
+        for name, phase in self.phases.items():
+            echo.info(line(name, phase))
+        for item, phases in sorted(self.items.items(), key=lambda i: i[0].lower()):
+            echo.info(f"\n{item}")
+            for name, phase in phases.items():
+                echo.info(line(f"  {name}", phase))
+
+
+# Timings of the current command
+TIMINGS = Timings()
+
+
+def phase(name: str, item: Optional[str] = None) -> ContextManager[None]:
+    """Record the duration of a phase of the current command"""
+    return TIMINGS.phase(name, item)
+
+
+def add(
+    name: str,
+    seconds: float = 0.0,
+    size: int = 0,
+    item: Optional[str] = None,
+    count: int = 1,
+):
+    """Add a measure to a phase of the current command"""
+    TIMINGS.add(name, seconds, size, item, count)
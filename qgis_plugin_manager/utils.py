@@ -1,28 +1,60 @@
 import os
+import time
 
-from difflib import SequenceMatcher
+from contextlib import contextmanager
+from functools import lru_cache
 from itertools import takewhile
 from pathlib import Path
 from typing import (
+    IO,
+    TYPE_CHECKING,
     Any,
     Callable,
     Iterable,
     Iterator,
     Optional,
+    Protocol,
     Sequence,
     Tuple,
     TypeVar,
 )
 
-from semver import Version
+from qgis_plugin_manager import echo, timings
 
-from qgis_plugin_manager import echo
+# Modules used by a few commands only are imported when needed, to keep
+# the startup of the command line fast.
+if TYPE_CHECKING:
+    import hashlib
+
+    from email.message import Message
+
+    from semver import Version
+
+
+class Readable(Protocol):
+    def readinto(self, b: memoryview, /) -> int: ...
 
 
 class PluginManagerError(Exception):
     pass
 
 
+class PluginNotFoundError(PluginManagerError):
+    pass
+
+
+class PluginVersionNotFoundError(PluginManagerError):
+    pass
+
+
+class SourcesNotFoundError(PluginManagerError):
+    pass
+
+
+# Default number of concurrent downloads
+DEFAULT_JOBS = 4
+
+
 def restart_qgis_server():
     """Restart QGIS Server tip."""
     restart_file = os.getenv("QGIS_PLUGIN_MANAGER_RESTART_FILE")
@@ -43,15 +75,6 @@ def install_epilog():
     restart_qgis_server()
 
 
-def similar_names(expected: str, available: Iterable[str]) -> Iterator[str]:
-    """Returns a list of similar names available."""
-    matcher = SequenceMatcher(None, expected.lower())
-    for item in available:
-        matcher.set_seq2(item.lower())
-        if matcher.ratio() > 0.8:
-            yield item
-
-
 def qgis_server_version() -> Optional[str]:
     """Try to guess the QGIS Server version.
 
@@ -61,7 +84,8 @@ def qgis_server_version() -> Optional[str]:
     qgis_version = os.getenv("QGIS_PLUGIN_MANAGER_QGIS_VERSION")
     if qgis_version is None:
         try:
-            from qgis.core import Qgis
+            with timings.phase("qgis_version"):
+                from qgis.core import Qgis
 
             qgis_version = Qgis.QGIS_VERSION.split("-")[0]
         except ImportError:
@@ -87,7 +111,10 @@ def sources_file(current_folder: Path) -> Path:
     return source_file
 
 
-def get_semver_version(version_str: str) -> Version:
+# Version strings repeat heavily across plugins (i.e "3.0", "3.16" for
+# QGIS minimum versions)
+@lru_cache(maxsize=4096)
+def get_semver_version(version_str: str) -> "Version":
     """Ensure that we get a SemvVer compatible version
 
     QGIS does not enforce plugin version to be SemVer
@@ -104,6 +131,8 @@ def get_semver_version(version_str: str) -> Version:
         release    -> 0.0.0+release
         0.6-beta.3 -> 0.6.0-beta.3
     """
+    from semver import Version
+
     for prefix in ("ver.", "ver", "v.", "v"):
         version_str = version_str.removeprefix(prefix)
 
@@ -170,6 +199,34 @@ def get_semver_version(version_str: str) -> Version:
     return version
 
 
+VersionKey = Tuple
+
+RELEASE_KEY = (1,)
+
+
+def version_key(version: "Version") -> VersionKey:
+    """Return a key for comparing versions as plain tuples
+
+    The key follows the SemVer precedence rules but the build tag
+    is also taken into account with a lexicographic comparison: QGIS
+    plugin versions do not stick to the SemVer scheme and build tags are
+    meaningful (i.e 2.4.0.1 -> 2.4.0+1).
+    """
+    if version.prerelease is None:
+        # Release has precedence over prerelease
+        pre: Tuple = RELEASE_KEY
+    else:
+        # Numeric identifiers have lower precedence than alphanumeric ones
+        pre = (
+            0,
+            *(
+                (0, int(part), "") if part.isdecimal() else (1, 0, part)
+                for part in version.prerelease.split(".")
+            ),
+        )
+    return (version.major, version.minor, version.patch, pre, version.build or "")
+
+
 # Infaillible method that attempts to convert
 # version string as a SemVer compatible string
 def get_semver_version_str(v: str) -> str:
@@ -179,6 +236,155 @@ def get_semver_version_str(v: str) -> str:
         return v
 
 
+def temporary_path(path: Path) -> Path:
+    """Return a unique temporary path in the same directory as `path`"""
+    from secrets import token_hex
+
+    return path.with_name(f".{path.name}.{os.getpid()}-{token_hex(4)}.tmp")
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "wb", **kwargs) -> Iterator[IO]:
+    """Write to a temporary file moved to `path` on success
+
+    Readers never see a partially written file.
+    """
+    tmp = temporary_path(path)
+    try:
+        with tmp.open(mode.replace("w", "x"), **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+# Size of the chunks when streaming downloads
+CHUNK_SIZE = 1 << 16
+
+# Delay in seconds between two progress reports
+PROGRESS_INTERVAL = 1.0
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def copy_stream(
+    src: Readable,
+    dst: IO[bytes],
+    name: str = "",
+    total: Optional[int] = None,
+    h: Optional["hashlib._Hash"] = None,
+) -> Tuple[int, str]:
+    """Copy `src` to `dst` in fixed-size chunks
+
+    The sha256 digest is computed in the same pass, `h` is the hash
+    object to update, i.e when appending to a partial download.
+    Progress and throughput are reported in verbose mode.
+
+    Returns the number of bytes copied and the digest.
+    """
+    if h is None:
+        import hashlib
+
+        h = hashlib.sha256()
+    buffer = memoryview(bytearray(CHUNK_SIZE))
+    size = 0
+    start = last = time.monotonic()
+    while True:
+        n = src.readinto(buffer)
+        if not n:
+            break
+        chunk = buffer[:n]
+        dst.write(chunk)
+        h.update(chunk)
+        size += n
+        if echo.verbose:
+            now = time.monotonic()
+            if now - last >= PROGRESS_INTERVAL:
+                last = now
+                done = f" ({100 * size // total}%)" if total else ""
+                echo.debug(
+                    "{}: {}{} at {}/s",
+                    name,
+                    format_size(size),
+                    done,
+                    format_size(size / (now - start)),
+                )
+
+    if echo.verbose:
+        elapsed = max(time.monotonic() - start, 1e-6)
+        echo.debug("{}: {} in {:.2f}s ({}/s)", name, format_size(size), elapsed, format_size(size / elapsed))
+
+    return size, h.hexdigest()
+
+
+def content_length(headers: "Message") -> Optional[int]:
+    """Return the Content-Length of a response"""
+    try:
+        return int(headers.get("Content-Length", ""))
+    except ValueError:
+        return None
+
+
+# (uid, gid), -1 leaves the id unchanged
+Owner = Tuple[int, int]
+
+
+def parse_owner(spec: str) -> Owner:
+    """Parse an `owner[:group]` specification
+
+    Owner and group may be names or numeric ids. Used as an argparse
+    `type`, errors are raised as `ArgumentTypeError` for reporting
+    their message.
+    """
+    from argparse import ArgumentTypeError
+
+    user, _, group = spec.partition(":")
+    try:
+        import grp
+        import pwd
+    except ImportError:
+        raise ArgumentTypeError("Changing ownership is not supported on this platform")
+
+    def lookup(name: str, getter: Callable[[str], Any]) -> int:
+        if not name:
+            return -1
+        if name.isdigit():
+            return int(name)
+        try:
+            return getter(name)[2]
+        except KeyError:
+            raise ArgumentTypeError(f"Unknown user or group: {name}")
+
+    uid = lookup(user, pwd.getpwnam)
+    gid = lookup(group, grp.getgrnam)
+    if uid == -1 and gid == -1:
+        raise ArgumentTypeError(f"Invalid owner: {spec}")
+    return uid, gid
+
+
+def parse_limit(spec: str) -> int:
+    """Parse a non-negative number of results
+
+    Used as an argparse `type`.
+    """
+    from argparse import ArgumentTypeError
+
+    try:
+        limit = int(spec)
+    except ValueError:
+        raise ArgumentTypeError(f"Invalid limit: {spec}")
+    if limit < 0:
+        raise ArgumentTypeError(f"Invalid limit: {spec}, must be non-negative")
+    return limit
+
+
 def getenv_bool(name: str) -> bool:
     return os.getenv(name, "").lower() in ("t", "true", "y", "yes", "1")
 
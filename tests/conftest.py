@@ -1,9 +1,12 @@
 from pathlib import Path
+from typing import Iterator
 
 import pytest
 
 from qgis_plugin_manager import echo
 
+from .netsim import NetworkSimulator
+
 
 @pytest.fixture(scope="session", autouse=True)
 def verbose() -> None:
@@ -15,6 +18,14 @@ def rootdir(request: pytest.FixtureRequest) -> Path:
     return Path(request.config.rootdir.strpath)  # type: ignore [attr-defined]
 
 
+@pytest.fixture(autouse=True)
+def user_cache(tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Isolate the user cache directory, shared by the archive cache"""
+    cache = tmp_path_factory.mktemp("user_cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache))
+    return cache
+
+
 @pytest.fixture(scope="session")
 def fixtures(rootdir: Path) -> Path:
     return rootdir.joinpath("fixtures")
@@ -23,3 +34,10 @@ def fixtures(rootdir: Path) -> Path:
 @pytest.fixture(scope="session")
 def plugins(fixtures: Path) -> Path:
     return fixtures.joinpath("plugins")
+
+
+@pytest.fixture
+def netsim() -> Iterator[NetworkSimulator]:
+    """Local HTTP server with simulated network conditions"""
+    with NetworkSimulator() as server:
+        yield server
@@ -0,0 +1,251 @@
+"""Local HTTP server simulating network conditions
+
+Serves in-memory resources, such as generated index files and plugin
+archives, with:
+
+* a latency before each response,
+* a bandwidth limit for response bodies,
+* `ETag` and `Last-Modified` validators, conditional and range requests,
+* basic authentication, redirections,
+* injected error statuses and connections dropped while sending a body.
+
+Used by the tests of the HTTP code paths and by the benchmark suite.
+"""
+
+import base64
+import email.utils
+import hashlib
+import socket
+import threading
+import time
+
+from email.message import Message
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+# Size of the body chunks written by the server
+CHUNK_SIZE = 1 << 14
+
+
+class Resource(NamedTuple):
+    data: bytes
+    etag: str
+    last_modified: str
+    content_type: str
+
+
+class Fault(NamedTuple):
+    """A failure injected in a response
+
+    Either an error `status` or a connection dropped after sending
+    `drop_after` bytes of the body.
+    """
+
+    status: Optional[int] = None
+    drop_after: Optional[int] = None
+
+
+class Request(NamedTuple):
+    path: str
+    headers: Dict[str, str]
+    status: int
+
+
+class SimulatedRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections
+    protocol_version = "HTTP/1.1"
+
+    server: "NetworkSimulator"
+
+    def do_GET(self):
+        sim = self.server
+        if sim.latency:
+            time.sleep(sim.latency)
+
+        path = self.path.split("?", 1)[0]
+        resource = sim.resources.get(path)
+        fault = sim.next_fault(path)
+
+        if fault and fault.status:
+            self.send_error_status(path, fault.status)
+        elif path in sim.redirects:
+            self.send_error_status(path, 302, {"Location": sim.redirects[path]})
+        elif resource is None:
+            self.send_error_status(path, 404)
+        elif not sim.authorized(path, self.headers.get("Authorization")):
+            self.send_error_status(path, 401, {"WWW-Authenticate": 'Basic realm="netsim"'})
+        elif self.headers.get("If-None-Match") == resource.etag:
+            self.send_error_status(path, 304)
+        else:
+            self.send_resource(path, resource, fault)
+
+    def send_error_status(self, path: str, status: int, headers: Optional[Dict[str, str]] = None):
+        self.server.log(path, self.headers, status)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_resource(self, path: str, resource: Resource, fault: Optional[Fault]):
+        data = resource.data
+        start = 0
+        status = 200
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and if_range in (None, resource.etag, resource.last_modified):
+            # Single range: bytes=start-
+            start = int(range_header.removeprefix("bytes=").split("-")[0])
+            if start >= len(data):
+                self.send_error_status(path, 416, {"Content-Range": f"bytes */{len(data)}"})
+                return
+            status = 206
+
+        self.server.log(path, self.headers, status)
+        self.send_response(status)
+        self.send_header("Content-Type", resource.content_type)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.send_header("ETag", resource.etag)
+        self.send_header("Last-Modified", resource.last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.end_headers()
+
+        body = memoryview(data)[start:]
+        if fault and fault.drop_after is not None:
+            body = body[: fault.drop_after]
+        self.send_body(body)
+
+        if fault and fault.drop_after is not None:
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+    def send_body(self, body: memoryview):
+        bandwidth = self.server.bandwidth
+        started = time.monotonic()
+        sent = 0
+        for offset in range(0, len(body), CHUNK_SIZE):
+            chunk = body[offset : offset + CHUNK_SIZE]
+            sent += len(chunk)
+            if bandwidth:
+                delay = sent / bandwidth - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            self.wfile.write(chunk)
+            self.server.add_sent(len(chunk))
+
+    def log_message(self, *args):
+        pass
+
+
+class NetworkSimulator(ThreadingHTTPServer):
+    """HTTP server with simulated network conditions
+
+    `latency` is the delay in seconds before each response and
+    `bandwidth` the maximum throughput of each response in bytes
+    per second.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, bandwidth: Optional[int] = None):
+        super().__init__(("127.0.0.1", 0), SimulatedRequestHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.resources: Dict[str, Resource] = {}
+        # path -> location
+        self.redirects: Dict[str, str] = {}
+        self.requests: List[Request] = []
+        self.bytes_sent = 0
+        self._faults: Dict[str, List[Fault]] = {}
+        self._credentials: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "NetworkSimulator":
+        # Short poll interval for a fast shutdown
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "NetworkSimulator":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def url(self, path: str) -> str:
+        host, port = self.socket.getsockname()[:2]
+        return f"http://{host}:{port}/{path.lstrip('/')}"
+
+    def add(self, path: str, data: bytes, content_type: str = "application/octet-stream") -> str:
+        """Serve `data` at `path`, replacing the previous content
+
+        Returns the URL of the resource.
+        """
+        path = f"/{path.lstrip('/')}"
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        last_modified = email.utils.formatdate(time.time(), usegmt=True)
+        with self._lock:
+            self.resources[path] = Resource(data, etag, last_modified, content_type)
+        return self.url(path)
+
+    def redirect(self, path: str, location: str) -> str:
+        """Redirect `path` to `location`
+
+        Returns the URL of the redirection.
+        """
+        path = f"/{path.lstrip('/')}"
+        with self._lock:
+            self.redirects[path] = location
+        return self.url(path)
+
+    def require_auth(self, path: str, login: str, password: str):
+        """Require basic authentication for `path`"""
+        self._credentials[f"/{path.lstrip('/')}"] = (login, password)
+
+    def authorized(self, path: str, authorization: Optional[str]) -> bool:
+        credentials = self._credentials.get(path)
+        if credentials is None:
+            return True
+        token = base64.b64encode(":".join(credentials).encode()).decode()
+        return authorization == f"Basic {token}"
+
+    def fail(self, path: str, status: int, times: int = 1):
+        """Answer the next `times` requests of `path` with `status`"""
+        self._inject(path, Fault(status=status), times)
+
+    def drop(self, path: str, after: int, times: int = 1):
+        """Drop the connection of the next `times` requests of `path`
+        after sending `after` bytes of the body
+        """
+        self._inject(path, Fault(drop_after=after), times)
+
+    def _inject(self, path: str, fault: Fault, times: int):
+        with self._lock:
+            self._faults.setdefault(f"/{path.lstrip('/')}", []).extend([fault] * times)
+
+    def next_fault(self, path: str) -> Optional[Fault]:
+        with self._lock:
+            faults = self._faults.get(path)
+            return faults.pop(0) if faults else None
+
+    def log(self, path: str, headers: Message, status: int):
+        with self._lock:
+            self.requests.append(Request(path, dict(headers), status))
+
+    def add_sent(self, size: int):
+        with self._lock:
+            self.bytes_sent += size
@@ -0,0 +1,89 @@
+import errno
+import hashlib
+import os
+
+from pathlib import Path
+
+import pytest
+
+from qgis_plugin_manager.archives import ArchiveCache, archive_cache_directory
+
+
+def put(cache: ArchiveCache, tmp_path: Path, name: str, data: bytes) -> Path:
+    zip_file = tmp_path.joinpath(f"{name}.zip")
+    zip_file.write_bytes(data)
+    return cache.put(f"https://foo.bar/{name}.zip", "1.0", zip_file, hashlib.sha256(data).hexdigest())
+
+
+def test_archive_cache(tmp_path: Path):
+    cache = ArchiveCache(tmp_path.joinpath("archives"), 1024)
+
+    archive = put(cache, tmp_path, "a", b"a" * 100)
+    assert archive.name == f"{hashlib.sha256(b'a' * 100).hexdigest()}.zip"
+    assert not tmp_path.joinpath("a.zip").exists()
+    assert cache.owns(archive)
+
+    assert cache.get("https://foo.bar/a.zip", "1.0") == archive
+    assert cache.get("https://foo.bar/a.zip", "2.0") is None
+
+    # Same content is stored once
+    assert put(cache, tmp_path, "b", b"a" * 100) == archive
+    assert len(list(cache.directory.glob("*.zip"))) == 1
+
+
+def test_archive_cache_other_filesystem(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test caching an archive downloaded on another file system."""
+    cache = ArchiveCache(tmp_path.joinpath("archives"), 1024)
+    zip_file = tmp_path.joinpath("a.zip")
+    replace = os.replace
+
+    def cross_device(src, dst):
+        if Path(src) == zip_file:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", cross_device)
+
+    archive = put(cache, tmp_path, "a", b"a" * 100)
+    assert archive.read_bytes() == b"a" * 100
+    assert not zip_file.exists()
+    assert [p.name for p in cache.directory.iterdir() if p.is_file()] == [archive.name]
+
+
+def test_archive_cache_eviction(tmp_path: Path):
+    cache = ArchiveCache(tmp_path.joinpath("archives"), 1000)
+    a = put(cache, tmp_path, "a", b"a" * 400)
+    b = put(cache, tmp_path, "b", b"b" * 400)
+    os.utime(a, ns=(0, 0))
+
+    # Archives used by the current process are never evicted
+    c = put(cache, tmp_path, "c", b"c" * 400)
+    assert a.exists() and b.exists() and c.exists()
+
+    # Least recently used archive is evicted first
+    cache = ArchiveCache(cache.directory, 1000)
+    put(cache, tmp_path, "d", b"d" * 100)
+    assert not a.exists()
+    assert b.exists() and c.exists()
+    assert cache.get("https://foo.bar/a.zip", "1.0") is None
+
+
+def test_archive_cache_grace_period(tmp_path: Path):
+    """Test that archives recently used by another process are not evicted."""
+    a = put(ArchiveCache(tmp_path.joinpath("archives"), 1000), tmp_path, "a", b"a" * 600)
+    b = put(ArchiveCache(tmp_path.joinpath("archives"), 1000), tmp_path, "b", b"b" * 600)
+    assert a.exists() and b.exists()
+
+    os.utime(a, ns=(0, 0))
+    put(ArchiveCache(tmp_path.joinpath("archives"), 1000), tmp_path, "c", b"c" * 100)
+    assert not a.exists()
+    assert b.exists()
+
+
+def test_archive_cache_directory(user_cache: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that the archive cache is shared by default."""
+    monkeypatch.delenv("QGIS_PLUGIN_MANAGER_CACHE_DIR", raising=False)
+    assert archive_cache_directory() == user_cache.joinpath("qgis-plugin-manager", "archives")
+
+    monkeypatch.setenv("QGIS_PLUGIN_MANAGER_CACHE_DIR", str(tmp_path))
+    assert archive_cache_directory() == tmp_path.joinpath("archives")
@@ -12,12 +12,12 @@ import pytest
 
 from qgis_plugin_manager import echo
 from qgis_plugin_manager.__main__ import (
-    LocalDirectory,
-    Remote,
     cli,
     get_plugin_path,
     qgis_server_version,
 )
+from qgis_plugin_manager.local_directory import LocalDirectory
+from qgis_plugin_manager.remote import Remote
 from qgis_plugin_manager.utils import getenv_bool
 
 
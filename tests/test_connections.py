@@ -0,0 +1,72 @@
+import socket
+import urllib.error
+import urllib.request
+
+from pathlib import Path
+
+import pytest
+
+from qgis_plugin_manager.connections import ConnectionPool
+
+from .netsim import NetworkSimulator
+
+
+@pytest.fixture
+def archive(fixtures: Path) -> bytes:
+    return fixtures.joinpath("xml_files", "minimal_plugin.zip").read_bytes()
+
+
+def test_connection_reused(netsim: NetworkSimulator, archive: bytes):
+    """Test that connections to the same host are kept alive."""
+    pool = ConnectionPool()
+    url = netsim.add("minimal_plugin.zip", archive)
+    for _ in range(3):
+        with pool.urlopen(urllib.request.Request(url)) as f:
+            assert f.status == 200
+            assert f.read() == archive
+
+    # Errors do not close the connection
+    with pytest.raises(urllib.error.HTTPError) as err:
+        pool.urlopen(urllib.request.Request(netsim.url("missing.zip")))
+    assert err.value.code == 404
+
+    assert pool.stats() == {"opened": 1, "reused": 3}
+    pool.close()
+
+
+def test_connection_redirect(netsim: NetworkSimulator, archive: bytes):
+    """Test redirections on the same connection."""
+    pool = ConnectionPool()
+    url = netsim.add("minimal_plugin.zip", archive)
+    with pool.urlopen(urllib.request.Request(netsim.redirect("redirect.zip", "/minimal_plugin.zip"))) as f:
+        assert f.url == url
+        assert f.read() == archive
+
+    assert pool.stats() == {"opened": 1, "reused": 1}
+    pool.close()
+
+
+def test_connection_closed_by_server(netsim: NetworkSimulator):
+    """Test that a stale idle connection is replaced."""
+    pool = ConnectionPool()
+    url = netsim.add("sources.list", b"https://plugins.qgis.org/plugins/plugins.xml")
+    with pool.urlopen(urllib.request.Request(url)) as f:
+        f.read()
+
+    # Close the idle connection behind the back of the pool
+    for conns in pool._idle.values():
+        for conn in conns:
+            conn.sock.shutdown(socket.SHUT_RDWR)
+
+    with pool.urlopen(urllib.request.Request(url)) as f:
+        assert f.status == 200
+        f.read()
+
+    assert pool.stats() == {"opened": 2, "reused": 1}
+    pool.close()
+
+
+def test_connection_error():
+    pool = ConnectionPool()
+    with pytest.raises(urllib.error.URLError):
+        pool.urlopen(urllib.request.Request("http://127.0.0.1:1/plugins.xml"))
@@ -6,6 +6,7 @@ from pathlib import Path
 import pytest
 
 from qgis_plugin_manager.local_directory import LocalDirectory
+from qgis_plugin_manager.manifest import MANIFEST_FILE
 from qgis_plugin_manager.remote import Remote
 
 
@@ -38,6 +39,8 @@ def teardown_local(protocols: Path):
     if sources_list.exists():
         sources_list.unlink()
 
+    protocols.joinpath(MANIFEST_FILE).unlink(missing_ok=True)
+
 
 def test_install_local(protocols: Path, teardown_local: None):
     """Test install local file."""
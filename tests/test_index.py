@@ -0,0 +1,195 @@
+import pickle
+import shutil
+
+from pathlib import Path
+
+import pytest
+
+from qgis_plugin_manager.index import MAGIC, PREAMBLE, PluginIndex
+from qgis_plugin_manager.remote import Remote
+
+
+@pytest.fixture
+def remote(fixtures: Path, tmp_path: Path) -> Remote:
+    index = tmp_path.joinpath("plugins.xml")
+    shutil.copy(fixtures.joinpath("xml_files", "lizmap", "lizmap.xml"), index)
+
+    plugin_dir = tmp_path.joinpath("plugins")
+    plugin_dir.mkdir()
+    plugin_dir.joinpath("sources.list").write_text(index.as_uri())
+
+    remote = Remote(plugin_dir, qgis_version="3.40")
+    assert remote.update()
+    return remote
+
+
+def test_precompiled_index(remote: Remote, monkeypatch: pytest.MonkeyPatch):
+    """Test loading plugins from the precompiled index."""
+    assert remote.index_file().exists()
+
+    expected = remote.available_plugins()
+
+    def no_parse(*args, **kwargs):
+        raise AssertionError("XML file should not be parsed")
+
+    remote = Remote(remote.folder, qgis_version="3.40")
+    monkeypatch.setattr(remote, "_parse_xml", no_parse)
+
+    plugins = remote.available_plugins()
+    assert plugins == expected
+    assert plugins["Lizmap server"][0].version == "1.0.0"
+
+
+def test_precompiled_index_invalidation(remote: Remote):
+    """Test that the index is invalidated when a XML file changes."""
+    sources = tuple(remote.plugin_collection_files())
+    index = PluginIndex.open(remote.index_file(), sources)
+    assert index is not None
+    assert "Lizmap server" in (index.load() or {})
+
+    _, xml_file = sources[0]
+    with xml_file.open("a") as f:
+        f.write("\n")
+    assert PluginIndex.open(remote.index_file(), sources) is None
+
+    # Fallback to XML parsing
+    remote = Remote(remote.folder, qgis_version="3.40")
+    assert "Lizmap server" in remote.available_plugins()
+
+    # Changing the sources list invalidates the index
+    remote.compile_index()
+    assert PluginIndex.open(remote.index_file(), sources) is not None
+    assert PluginIndex.open(remote.index_file(), (*sources, ("other", xml_file))) is None
+
+
+def test_precompiled_index_fields(remote: Remote):
+    """Test that the index provides the requested fields."""
+    sources = tuple(remote.plugin_collection_files())
+    assert PluginIndex.open(remote.index_file(), sources, fields=("tags",)) is not None
+
+    remote = Remote(remote.folder, qgis_version="3.40", fields=("tags",))
+    remote.compile_index()
+    assert PluginIndex.open(remote.index_file(), sources, fields=("tags",)) is not None
+    assert PluginIndex.open(remote.index_file(), sources, fields=("tags", "description")) is None
+    assert PluginIndex.open(remote.index_file(), sources) is None
+
+
+class Payload:
+    called = False
+
+    def __reduce__(self):
+        return (setattr, (Payload, "called", True))
+
+
+def test_precompiled_index_no_code(remote: Remote):
+    """Test that reading the index never executes code."""
+    sources = tuple(remote.plugin_collection_files())
+    payload = pickle.dumps({"format": Payload()})
+    remote.index_file().write_bytes(PREAMBLE.pack(MAGIC, PREAMBLE.size) + payload)
+
+    assert PluginIndex.open(remote.index_file(), sources) is None
+    assert not Payload.called
+
+
+def test_lookup_by_name(remote: Remote, monkeypatch: pytest.MonkeyPatch):
+    """Test reading only requested plugins from the index."""
+    remote = Remote(remote.folder, qgis_version="3.40")
+
+    def no_load(*args, **kwargs):
+        raise AssertionError("Index should not be fully loaded")
+
+    monkeypatch.setattr(PluginIndex, "load", no_load)
+
+    versions = remote.versions("Lizmap server")
+    assert versions[0].version == "1.0.0"
+    assert remote.versions("Foo") == ()
+    assert remote.latest("Lizmap").version == "3.7.4"
+    assert set(remote.plugin_names()) == {"Lizmap", "Lizmap server"}
+    assert remote._list_plugins == {}
+
+
+def test_lookup_replaced_index(remote: Remote):
+    """Test that entries are not read from an index replaced after opening it."""
+    sources = tuple(remote.plugin_collection_files())
+    index = PluginIndex.open(remote.index_file(), sources)
+    assert index is not None
+
+    # Concurrent update
+    remote.compile_index()
+
+    assert index.lookup(["Lizmap"]) is None
+    assert index.load() is None
+    assert index.search_index() is None
+    assert index.name_suggestions() is None
+
+
+def test_lookup_invalid_entry(remote: Remote):
+    """Test that an entry holding another plugin is rejected."""
+    sources = tuple(remote.plugin_collection_files())
+    index = PluginIndex.open(remote.index_file(), sources)
+    assert index is not None
+
+    table = index._table
+    table["Lizmap"], table["Lizmap server"] = table["Lizmap server"], table["Lizmap"]
+    assert index.lookup(["Lizmap"]) is None
+    assert index.load() is None
+
+
+def test_lookup_without_index(remote: Remote):
+    """Test looking up plugins when the index is out of date."""
+    remote.index_file().unlink()
+
+    remote = Remote(remote.folder, qgis_version="3.40")
+    assert remote.versions("Lizmap server")[0].version == "1.0.0"
+    assert remote.versions("Foo") == ()
+
+
+def test_search_from_index(remote: Remote, monkeypatch: pytest.MonkeyPatch):
+    """Test searching with the precompiled index."""
+    remote = Remote(remote.folder, qgis_version="3.40")
+
+    def no_load(*args, **kwargs):
+        raise AssertionError("Index should not be fully loaded")
+
+    monkeypatch.setattr(PluginIndex, "load", no_load)
+
+    results = [p.name for p in remote.search("lizmap")]
+    assert results == ["Lizmap", "Lizmap server"]
+    results = [p.name for p in remote.search("lizmap", limit=1)]
+    assert results == ["Lizmap"]
+
+
+def test_search_limit(remote: Remote, monkeypatch: pytest.MonkeyPatch):
+    """Test that plugins past the search limit are neither returned nor read."""
+    remote = Remote(remote.folder, qgis_version="3.40")
+
+    looked_up = []
+    lookup = remote.lookup
+
+    def lookup_spy(names):
+        looked_up.extend(names)
+        return lookup(names)
+
+    monkeypatch.setattr(remote, "lookup", lookup_spy)
+    monkeypatch.setattr("qgis_plugin_manager.remote.SEARCH_BATCH_SIZE", 1)
+
+    assert list(remote.search("lizmap", limit=0)) == []
+    assert list(remote.search("lizmap", predicat=lambda p: True, limit=0)) == []
+    assert [p.name for p in remote.search("lizmap", predicat=lambda p: True, limit=1)] == ["Lizmap"]
+    assert looked_up == ["Lizmap"]
+
+    with pytest.raises(ValueError):
+        list(remote.search("lizmap", limit=-1))
+
+
+def test_similar_names_from_index(remote: Remote, monkeypatch: pytest.MonkeyPatch):
+    """Test suggestions of plugin names with the precompiled index."""
+    remote = Remote(remote.folder, qgis_version="3.40")
+
+    def no_load(*args, **kwargs):
+        raise AssertionError("Index should not be fully loaded")
+
+    monkeypatch.setattr(PluginIndex, "load", no_load)
+
+    assert list(remote.check_similar_names("lizma")) == ["Lizmap"]
+    assert list(remote.check_similar_names("lizmap_server")) == ["Lizmap server"]
@@ -1,9 +1,15 @@
+import shutil
+
 from pathlib import Path
 from unittest import TestCase
 
 import pytest
 
+from qgis_plugin_manager import local_directory
+from qgis_plugin_manager.index import file_digest
 from qgis_plugin_manager.local_directory import LocalDirectory
+from qgis_plugin_manager.manifest import Manifest
+from qgis_plugin_manager.remote import Archive, Remote
 
 
 @pytest.fixture
@@ -45,3 +51,74 @@ def test_read_metadata(local_dir: LocalDirectory):
     assert not plugin.server
     assert not plugin.has_processing
     assert not plugin.deprecated
+
+
+def test_manifest(fixtures: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test the manifest written at installation."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip", "https://foo.bar")
+    Remote(tmp_path).deploy(archive, zip_file, remove_zip=False)
+
+    manifest = Manifest.load(tmp_path)
+    record = manifest.get("minimal_plugin")
+    assert record["url"] == archive.url
+    assert record["source"] == archive.source
+    assert record["sha256"] == file_digest(zip_file)
+    assert sorted(record["files"]) == ["__init__.py", "metadata.txt"]
+
+    # Metadata of installed plugins are read from the manifest
+    with monkeypatch.context() as m:
+        m.setattr(local_directory, "read_metadata", None)
+        local = LocalDirectory(tmp_path)
+        assert local.plugin_info("Minimal").version == "1.0.0"
+
+    # Plugin not installed by the plugin manager
+    shutil.copytree(fixtures.joinpath("plugins", "plugin_a"), tmp_path.joinpath("plugin_a"))
+    local = LocalDirectory(tmp_path)
+    assert local.plugin_info("Plugin A").version == "1.0.0"
+    assert local.verify("plugin_a") is None
+    assert local.verify("minimal_plugin") == ([], [], [])
+
+    plugin = tmp_path.joinpath("minimal_plugin")
+    plugin.joinpath("__init__.py").write_text("# modified")
+    plugin.joinpath("extra.py").touch()
+    plugin.joinpath("__pycache__").mkdir()
+    plugin.joinpath("__pycache__", "extra.pyc").touch()
+    assert local.verify("minimal_plugin") == (["__init__.py"], [], ["extra.py"])
+
+    assert local.remove("Minimal")
+    assert Manifest.load(tmp_path).get("minimal_plugin") is None
+
+
+def test_plugin_directories(fixtures: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test several plugin directories."""
+    first = tmp_path.joinpath("first")
+    second = tmp_path.joinpath("second")
+    for root in (first, second):
+        shutil.copytree(fixtures.joinpath("plugins", "plugin_a"), root.joinpath("plugin_a"))
+    shutil.copytree(fixtures.joinpath("plugins", "plugin_b"), second.joinpath("plugin_b"))
+    # Same plugin in another folder
+    shutil.copytree(fixtures.joinpath("plugins", "plugin_a"), second.joinpath("another_a"))
+
+    local = LocalDirectory([first, second, tmp_path.joinpath("missing")])
+    assert local.folder == first
+    # The same plugin in another folder is hidden too
+    assert local.plugin_list() == {"plugin_a": "Plugin A", "plugin_b": "Plugin B"}
+    # The first directory takes precedence
+    assert local.get_plugin_folder_from_name("Plugin A") == "plugin_a"
+    assert local.path("plugin_a") == first.joinpath("plugin_a")
+    assert local.root("plugin_b") == second
+    # Plugin objects are built once
+    assert local.plugin_info("Plugin B") is local.plugin_info("plugin_b")
+
+    assert local.remove("Plugin B")
+    assert not second.joinpath("plugin_b").exists()
+    assert local.remove("Plugin A")
+    assert not first.joinpath("plugin_a").exists()
+    assert local.get_plugin_folder_from_name("Plugin A") == "another_a"
+
+    # Unchanged metadata are not read again
+    with monkeypatch.context() as m:
+        m.setattr(local_directory, "read_metadata", None)
+        local = LocalDirectory([first, second])
+        assert local.plugin_list() == {"plugin_a": "Plugin A", "another_a": "Plugin A"}
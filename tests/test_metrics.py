@@ -0,0 +1,95 @@
+import stat
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from qgis_plugin_manager import metrics
+from qgis_plugin_manager.__main__ import main
+from qgis_plugin_manager.metrics import METRICS, Metrics
+from qgis_plugin_manager.remote import InstallTask, Remote
+
+from .netsim import NetworkSimulator
+from .test_network import plugins_xml
+
+
+def test_metrics_file(tmp_path: Path):
+    """Test writing metrics in the Prometheus text format."""
+    m = Metrics()
+    m.add("downloaded_bytes", 100, source="https://foo.bar/plugins.xml", kind="index")
+    m.add("downloaded_bytes", 50, source="https://foo.bar/plugins.xml", kind="index")
+    m.add("cache_hits", cache="archives")
+    m.set("index_age_seconds", 12.5, source='a "quoted" source')
+
+    text = m.render("update")
+    assert "# TYPE qgis_plugin_manager_downloaded_bytes gauge\n" in text
+    assert (
+        'qgis_plugin_manager_downloaded_bytes{command="update",kind="index",'
+        'source="https://foo.bar/plugins.xml"} 150\n'
+    ) in text
+    assert 'qgis_plugin_manager_cache_hits{command="update",cache="archives"} 1\n' in text
+    assert (
+        'qgis_plugin_manager_index_age_seconds{command="update",source="a \\"quoted\\" source"} 12.5\n'
+        in text
+    )
+
+    path = tmp_path.joinpath("qgis.prom")
+    m.write(path, "update", success=False)
+    text = path.read_text()
+    assert 'qgis_plugin_manager_run_success{command="update"} 0\n' in text
+    assert "# HELP qgis_plugin_manager_run_duration_seconds " in text
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert [p.name for p in tmp_path.iterdir()] == ["qgis.prom"]
+
+
+def test_metrics_remote(netsim: NetworkSimulator, fixtures: Path, tmp_path: Path):
+    """Test metrics recorded when updating the index and downloading plugins."""
+    archive = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    xml = plugins_xml([("Minimal", netsim.add("minimal.zip", archive.read_bytes()))])
+    url = netsim.add("plugins.xml", xml)
+    tmp_path.joinpath("sources.list").write_text(f"{url}\n")
+
+    METRICS.clear()
+    remote = Remote(tmp_path, qgis_version="3.34")
+    assert remote.update()
+    assert remote.update()
+    assert METRICS.get("downloaded_bytes", source=url, kind="index") == len(xml)
+    assert METRICS.get("cache_hits", cache="http") == 1
+    assert METRICS.get("index_update_failures") == 0
+    assert METRICS.get("index_age_seconds", source=url) is not None
+
+    for _ in range(2):
+        root = tmp_path.joinpath("plugins")
+        root.mkdir(exist_ok=True)
+        tasks = [InstallTask("Minimal", root=root)]
+        for _, result in Remote(tmp_path, qgis_version="3.34").install_all(tasks):
+            assert result == "1.0.0"
+    assert METRICS.get("downloaded_bytes", source=url, kind="archive") == archive.stat().st_size
+    assert METRICS.get("cache_misses", cache="archives") == 1
+    assert METRICS.get("cache_hits", cache="archives") == 1
+    assert METRICS.get("cache_hits", cache="index") == 2
+
+    metrics.set_value("outdated_plugins", 3)
+    assert "qgis_plugin_manager_outdated_plugins 3\n" in METRICS.render(None)
+    METRICS.clear()
+
+
+def test_metrics_update_failure(netsim: NetworkSimulator, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that a failing remote fails the update command."""
+    url = netsim.add("plugins.xml", plugins_xml([]))
+    tmp_path.joinpath("sources.list").write_text(f"{url}\n{netsim.url('missing.xml')}\n")
+    metrics_file = tmp_path.joinpath("qgis.prom")
+
+    monkeypatch.setenv("QGIS_PLUGINPATH", str(tmp_path))
+    monkeypatch.setenv("QGIS_PLUGIN_MANAGER_QGIS_VERSION", "3.34")
+    monkeypatch.setattr(sys, "argv", ["qgis-plugin-manager", "--metrics-file", str(metrics_file), "update"])
+
+    METRICS.clear()
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 1
+
+    text = metrics_file.read_text()
+    assert 'qgis_plugin_manager_run_success{command="update"} 0\n' in text
+    assert 'qgis_plugin_manager_index_update_failures{command="update"} 1\n' in text
@@ -0,0 +1,151 @@
+"""Download paths under simulated network conditions"""
+
+import hashlib
+import time
+
+from pathlib import Path
+from typing import Iterable, Tuple
+
+import pytest
+
+from qgis_plugin_manager.remote import InstallTask, PluginVersionNotFoundError, Remote
+from qgis_plugin_manager.utils import PluginManagerError
+
+from .netsim import NetworkSimulator
+
+
+def plugins_xml(plugins: Iterable[Tuple[str, str]]) -> bytes:
+    elements = "".join(
+        f'<pyqgis_plugin name="{name}" version="1.0.0">'
+        "<version>1.0.0</version>"
+        "<qgis_minimum_version>3.4.0</qgis_minimum_version>"
+        f"<file_name>{name.lower()}.zip</file_name>"
+        f"<download_url>{url}</download_url>"
+        "</pyqgis_plugin>"
+        for name, url in plugins
+    )
+    return f"<plugins>{elements}</plugins>".encode()
+
+
+@pytest.fixture
+def archive(fixtures: Path) -> bytes:
+    return fixtures.joinpath("xml_files", "minimal_plugin.zip").read_bytes()
+
+
+def test_update(netsim: NetworkSimulator, archive: bytes, tmp_path: Path):
+    """Test revalidation and server errors when updating the index."""
+    url = netsim.add("plugins.xml", plugins_xml([("Minimal", netsim.add("minimal.zip", archive))]))
+    tmp_path.joinpath("sources.list").write_text(f"{url}\n")
+
+    remote = Remote(tmp_path, qgis_version="3.34")
+    assert remote.update()
+    assert remote.update()
+    assert [r.status for r in netsim.requests] == [200, 304]
+
+    # The last good copy is kept
+    netsim.fail("plugins.xml", 500)
+    assert not remote.update()
+    assert remote.latest("Minimal").version_str == "1.0.0"
+
+
+def test_update_dropped(netsim: NetworkSimulator, archive: bytes, tmp_path: Path):
+    """Test that a truncated index keeps the last good copy and its validators."""
+    url = netsim.add("plugins.xml", plugins_xml([("Minimal", netsim.add("minimal.zip", archive))]))
+    tmp_path.joinpath("sources.list").write_text(f"{url}\n")
+
+    remote = Remote(tmp_path, qgis_version="3.34")
+    assert remote.update()
+    cache_file = Remote.server_cache_filename(remote.cache_directory(), url)
+    validators = Remote.server_cache_validators(cache_file).read_text()
+
+    # New content sent partially
+    netsim.add("plugins.xml", plugins_xml([("Other", netsim.add("other.zip", archive))]))
+    netsim.drop("plugins.xml", after=50)
+    assert not remote.update()
+    assert Remote.server_cache_validators(cache_file).read_text() == validators
+    assert not list(remote.cache_directory().glob("*.tmp"))
+    assert remote.latest("Minimal").version_str == "1.0.0"
+
+    # The cached file is not revalidated with the validators of the truncated body
+    assert remote.update()
+    assert netsim.requests[-1].status == 200
+    assert remote.latest("Other").version_str == "1.0.0"
+    assert remote.latest("Minimal") is None
+
+
+def test_download_dropped(netsim: NetworkSimulator, archive: bytes, tmp_path: Path):
+    """Test resuming a download interrupted by a dropped connection."""
+    url = netsim.add("minimal.zip", archive)
+    netsim.drop("minimal.zip", after=500)
+
+    remote = Remote(tmp_path, qgis_version="3.34")
+    with pytest.raises(PluginManagerError, match="interrupted"):
+        remote._download_zip(url, "Minimal", "minimal.zip", "1.0.0")
+    assert remote.partial_file(url, "1.0.0").stat().st_size == 500
+
+    zip_file, digest = remote._download_zip(url, "Minimal", "minimal.zip", "1.0.0")
+    assert zip_file.read_bytes() == archive
+    assert digest == hashlib.sha256(archive).hexdigest()
+    assert netsim.requests[-1].status == 206
+    assert netsim.requests[-1].headers["Range"] == "bytes=500-"
+    # Each byte is sent once
+    assert netsim.bytes_sent == len(archive)
+
+
+def test_download_errors(netsim: NetworkSimulator, archive: bytes, tmp_path: Path):
+    """Test error statuses when downloading an archive."""
+    remote = Remote(tmp_path, qgis_version="3.34")
+    with pytest.raises(PluginVersionNotFoundError):
+        remote._download_zip(netsim.url("missing.zip"), "Minimal", "minimal.zip", "1.0.0")
+
+    url = netsim.add("minimal.zip", archive)
+    netsim.fail("minimal.zip", 500)
+    with pytest.raises(PluginManagerError, match="Error downloading plugin"):
+        remote._download_zip(url, "Minimal", "minimal.zip", "1.0.0")
+
+
+def test_download_authentication(netsim: NetworkSimulator, archive: bytes, tmp_path: Path):
+    """Test downloading an archive with the credentials of the remotes."""
+    url = netsim.add("minimal.zip", archive)
+    netsim.require_auth("minimal.zip", "john", "secret")
+
+    sources = tmp_path.joinpath("sources.list")
+    sources.write_text(f"{netsim.url('plugins.xml')}?username=john&password=wrong\n")
+    with pytest.raises(PluginManagerError, match="Failed to download plugin"):
+        Remote(tmp_path, qgis_version="3.34")._download_zip(url, "Minimal", "minimal.zip", "1.0.0")
+
+    sources.write_text(f"{netsim.url('plugins.xml')}?username=john&password=secret\n")
+    netsim.requests.clear()
+    zip_file, _ = Remote(tmp_path, qgis_version="3.34")._download_zip(url, "Minimal", "minimal.zip", "1.0.0")
+    assert zip_file.read_bytes() == archive
+    assert [r.status for r in netsim.requests] == [401, 200]
+
+
+def test_install_all_failures(netsim: NetworkSimulator, archive: bytes, tmp_path: Path):
+    """Test that a failed download does not prevent other installations."""
+    url = netsim.add(
+        "plugins.xml",
+        plugins_xml([("Minimal", netsim.add("minimal.zip", archive)), ("Broken", netsim.url("broken.zip"))]),
+    )
+    tmp_path.joinpath("sources.list").write_text(f"{url}\n")
+    remote = Remote(tmp_path, qgis_version="3.34")
+    assert remote.update()
+
+    results = dict(remote.install_all([InstallTask("Broken"), InstallTask("Minimal")], jobs=2))
+    assert isinstance(results[InstallTask("Broken")], PluginVersionNotFoundError)
+    assert results[InstallTask("Minimal")] == "1.0.0"
+    assert tmp_path.joinpath("minimal_plugin", "metadata.txt").exists()
+
+
+def test_network_conditions(tmp_path: Path):
+    """Test the simulated latency and bandwidth."""
+    data = bytes(1 << 16)
+    with NetworkSimulator(latency=0.1, bandwidth=1 << 18) as server:
+        url = server.add("data.zip", data)
+        remote = Remote(tmp_path, qgis_version="3.34")
+        start = time.monotonic()
+        zip_file, _ = remote._download_zip(url, "Data", "data.zip", "1.0.0")
+        elapsed = time.monotonic() - start
+    assert zip_file.read_bytes() == data
+    # Latency and 64 KiB at 256 KiB/s
+    assert elapsed >= 0.1 + 0.25 - 0.02
@@ -1,7 +1,23 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import zipfile
+
 from pathlib import Path
+from typing import Sequence
 from unittest import TestCase
 
-from qgis_plugin_manager.remote import Remote
+import pytest
+
+from qgis_plugin_manager.manifest import MANIFEST_FILE
+from qgis_plugin_manager.remote import STAGING_LOCK, Archive, InstallTask, PluginNotFoundError, Remote
+from qgis_plugin_manager.utils import PluginManagerError
+
+from .netsim import NetworkSimulator
 
 
 def test_list_remote(plugins: Path):
@@ -120,3 +136,463 @@ def test_clean_remote():
     # Nothing
     name = Remote.public_remote_name("https://foo.bar/plugins.xml?qgis=3.10")
     assert name == "https://foo.bar/plugins.xml?qgis=3.10"
+
+
+def test_update_concurrent(fixtures: Path, tmp_path: Path):
+    """Test updating several remotes concurrently."""
+    xml_files = fixtures.joinpath("xml_files")
+    sources = [
+        xml_files.joinpath("lizmap", "lizmap.xml").as_uri(),
+        xml_files.joinpath("dataplotly", "dataplotly.xml").as_uri(),
+    ]
+    tmp_path.joinpath("sources.list").write_text("\n".join(sources))
+
+    remote = Remote(tmp_path, qgis_version="3.40")
+    assert remote.update(jobs=2)
+
+    cache = remote.cache_directory()
+    for source in sources:
+        assert Remote.server_cache_filename(cache, source).exists()
+
+    plugins = remote.available_plugins()
+    assert "Lizmap server" in plugins
+    assert "Data Plotly" in plugins
+
+    # A failing remote is reported but does not prevent others from being updated
+    missing = xml_files.joinpath("missing.xml").as_uri()
+    tmp_path.joinpath("sources.list").write_text("\n".join((*sources, missing)))
+
+    remote = Remote(tmp_path, qgis_version="3.40")
+    assert not remote.update(jobs=3)
+    assert Remote.server_cache_filename(cache, sources[0]).exists()
+    assert not Remote.server_cache_filename(cache, missing).exists()
+
+
+def test_update_not_modified(netsim: NetworkSimulator, fixtures: Path, tmp_path: Path):
+    """Test conditional revalidation of the cached files."""
+    source = netsim.add("lizmap.xml", fixtures.joinpath("xml_files", "lizmap", "lizmap.xml").read_bytes())
+    tmp_path.joinpath("sources.list").write_text(source)
+
+    remote = Remote(tmp_path, qgis_version="3.40")
+    assert remote.update()
+
+    cache_file = Remote.server_cache_filename(remote.cache_directory(), source)
+    validators = Remote.server_cache_validators(cache_file)
+    assert cache_file.exists()
+    assert validators.exists()
+
+    mtime = cache_file.stat().st_mtime_ns
+
+    netsim.requests.clear()
+    assert remote.update()
+
+    headers = netsim.requests[0].headers
+    assert netsim.requests[0].status == 304
+    assert "If-None-Match" in headers
+    assert "If-Modified-Since" in headers
+
+    # Cached file has not been rewritten
+    assert cache_file.stat().st_mtime_ns == mtime
+    assert "Lizmap server" in remote.available_plugins()
+
+
+def test_update_keep_last_good_copy(fixtures: Path, tmp_path: Path):
+    """Test that a failing remote keeps its cached file."""
+    index = tmp_path.joinpath("plugins.xml")
+    shutil.copy(fixtures.joinpath("xml_files", "lizmap", "lizmap.xml"), index)
+
+    plugin_dir = tmp_path.joinpath("plugins")
+    plugin_dir.mkdir()
+    plugin_dir.joinpath("sources.list").write_text(index.as_uri())
+
+    remote = Remote(plugin_dir, qgis_version="3.40")
+    assert remote.update()
+
+    index.unlink()
+    assert not remote.update()
+
+    cache = remote.cache_directory()
+    assert Remote.server_cache_filename(cache, index.as_uri()).exists()
+    # No temporary files left
+    assert not list(cache.glob("*.tmp"))
+    assert "Lizmap server" in remote.available_plugins()
+
+
+def test_parse_xml_fields(fixtures: Path):
+    """Test reading only some fields from the XML file."""
+    xml_file = fixtures.joinpath("xml_files", "lizmap", "lizmap.xml")
+    remote = Remote(xml_file.parent)
+
+    plugins: dict = {}
+    remote._parse_xml(xml_file, plugins)
+    plugin = plugins["Lizmap"][0]
+    assert plugin.description.startswith("Publish and share")
+    assert plugin.author_name == "3Liz"
+
+    plugins = {}
+    remote._parse_xml(xml_file, plugins, fields=("tags", "server"))
+    plugin = plugins["Lizmap"][0]
+    assert plugin.version == "3.7.4"
+    assert plugin.server
+    assert plugin.file_name == "lizmap.3.7.4.zip"
+    assert plugin.description == ""
+    assert plugin.author_name is None
+    assert "webgis" in plugin.search
+
+
+def test_parse_xml_versions_order(tmp_path: Path):
+    """Test that versions are sorted from latest to oldest."""
+
+    def write_index(path: Path, versions: Sequence[str]):
+        elements = "".join(
+            f"""<pyqgis_plugin name="Foo" version="{v}">
+                <file_name>foo.{v}.zip</file_name>
+                <download_url>https://foo.bar/foo.{v}.zip</download_url>
+            </pyqgis_plugin>"""
+            for v in versions
+        )
+        path.write_text(f"<plugins>{elements}</plugins>")
+
+    write_index(tmp_path.joinpath("a.xml"), ("1.2.0", "1.10.0", "1.2.0.1", "2.0.0-beta.1", "1.2.0.2"))
+    write_index(tmp_path.joinpath("b.xml"), ("2.0.0", "1.2.0", "0.9"))
+
+    remote = Remote(tmp_path)
+    plugins: dict = {}
+    remote._parse_xml(tmp_path.joinpath("a.xml"), plugins, "a")
+    remote._parse_xml(tmp_path.joinpath("b.xml"), plugins, "b")
+
+    versions = [(p.version_str, p.source) for p in plugins["Foo"]]
+    assert versions == [
+        ("2.0.0", "b"),
+        ("2.0.0-beta.1", "a"),
+        ("1.10.0", "a"),
+        ("1.2.0.2", "a"),
+        ("1.2.0.1", "a"),
+        ("1.2.0", "a"),
+        ("1.2.0", "b"),
+        ("0.9", "b"),
+    ]
+
+
+def test_install_all(netsim: NetworkSimulator, fixtures: Path, tmp_path: Path):
+    """Test installing several plugins with concurrent downloads."""
+    url = netsim.add("minimal_plugin.zip", fixtures.joinpath("xml_files", "minimal_plugin.zip").read_bytes())
+    elements = "".join(
+        f"""<pyqgis_plugin name="{name}" version="1.0.0">
+            <file_name>{name.lower()}.zip</file_name>
+            <download_url>{url}</download_url>
+        </pyqgis_plugin>"""
+        for name in ("Minimal", "Other")
+    )
+    xml_file = tmp_path.joinpath("plugins.xml")
+    xml_file.write_text(f"<plugins>{elements}</plugins>")
+
+    remote = Remote(tmp_path, qgis_version="3.34")
+    remote._parse_xml(xml_file, remote._list_plugins)
+
+    tasks = [InstallTask("Minimal"), InstallTask("Missing"), InstallTask("Other", "1.0.0")]
+    results = list(remote.install_all(tasks, jobs=2))
+
+    assert [task for task, _ in results] == tasks
+    assert results[0][1] == "1.0.0"
+    assert isinstance(results[1][1], PluginNotFoundError)
+    assert results[2][1] == "1.0.0"
+
+    assert tmp_path.joinpath("minimal_plugin", "metadata.txt").exists()
+    assert not tmp_path.joinpath("minimal.zip").exists()
+    assert not tmp_path.joinpath("other.zip").exists()
+
+
+def test_install_archive_cache(netsim: NetworkSimulator, fixtures: Path, tmp_path: Path):
+    """Test that reinstalling a plugin uses the archive cache."""
+    url = netsim.add("minimal_plugin.zip", fixtures.joinpath("xml_files", "minimal_plugin.zip").read_bytes())
+    xml_file = tmp_path.joinpath("plugins.xml")
+    xml_file.write_text(
+        f"""<plugins><pyqgis_plugin name="Minimal" version="1.0.0">
+            <file_name>minimal.zip</file_name>
+            <download_url>{url}</download_url>
+        </pyqgis_plugin></plugins>""",
+    )
+
+    remote = Remote(tmp_path, qgis_version="3.34")
+    remote._parse_xml(xml_file, remote._list_plugins)
+
+    netsim.requests.clear()
+    assert remote.install("Minimal") == "1.0.0"
+    assert len(netsim.requests) == 1
+
+    assert remote.archives
+    (archive,) = remote.archives.directory.glob("*.zip")
+    assert remote.install("Minimal", plugin_folder="minimal_plugin") == "1.0.0"
+    assert len(netsim.requests) == 1
+    assert archive.exists()
+    assert tmp_path.joinpath("minimal_plugin", "metadata.txt").exists()
+
+    # Corrupted archive is downloaded again
+    archive.write_bytes(b"garbage")
+    assert remote.install("Minimal", plugin_folder="minimal_plugin") == "1.0.0"
+    assert len(netsim.requests) == 2
+
+    # The cache is shared by plugin directories
+    other = tmp_path.joinpath("other")
+    other.mkdir()
+    remote = Remote(other, qgis_version="3.34")
+    remote._parse_xml(xml_file, remote._list_plugins)
+    assert remote.install("Minimal") == "1.0.0"
+    assert len(netsim.requests) == 2
+    assert other.joinpath("minimal_plugin", "metadata.txt").exists()
+
+
+def test_download_resume(netsim: NetworkSimulator, fixtures: Path, tmp_path: Path):
+    """Test resuming a partial download with a Range request."""
+    data = fixtures.joinpath("xml_files", "minimal_plugin.zip").read_bytes()
+    url = netsim.add("minimal_plugin.zip", data)
+    etag = netsim.resources["/minimal_plugin.zip"].etag
+
+    remote = Remote(tmp_path, qgis_version="3.34")
+
+    def interrupted(etag: str) -> Path:
+        part = remote.partial_file(url, "1.0.0")
+        part.parent.mkdir(parents=True, exist_ok=True)
+        part.write_bytes(data[:100])
+        part.with_suffix(".json").write_text(
+            json.dumps({"etag": etag, "last_modified": None, "length": len(data)}),
+        )
+        return part
+
+    part = interrupted(etag)
+    netsim.requests.clear()
+    zip_file, digest = remote._download_zip(url, "Minimal", "minimal.zip", "1.0.0")
+    assert netsim.requests[0].status == 206
+    assert netsim.requests[0].headers["Range"] == "bytes=100-"
+    assert zip_file.read_bytes() == data
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert not part.exists()
+    assert not part.with_suffix(".json").exists()
+
+    # Changed archive: download from start
+    part = interrupted('"changed"')
+    zip_file, digest = remote._download_zip(url, "Minimal", "minimal.zip", "1.0.0")
+    assert zip_file.read_bytes() == data
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert not part.exists()
+
+
+def test_deploy_staged(fixtures: Path, tmp_path: Path):
+    """Test that the existing installation is replaced with renames."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip")
+
+    existing = tmp_path.joinpath("minimal_plugin")
+    existing.mkdir()
+    existing.joinpath("old.py").touch()
+    other = tmp_path.joinpath("minimal_old")
+    other.mkdir()
+
+    remote = Remote(tmp_path)
+    remote.deploy(archive, zip_file, plugin_folder="minimal_old", remove_zip=False)
+
+    assert existing.joinpath("metadata.txt").exists()
+    assert not existing.joinpath("old.py").exists()
+    assert not other.exists()
+    # No staging folder left
+    assert sorted(p.name for p in tmp_path.iterdir()) == [MANIFEST_FILE, "minimal_plugin"]
+
+
+def test_deploy_root(fixtures: Path, tmp_path: Path):
+    """Test installing in another plugin directory."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip")
+
+    primary = tmp_path.joinpath("primary")
+    primary.mkdir()
+    root = tmp_path.joinpath("other")
+    root.joinpath("minimal_plugin").mkdir(parents=True)
+
+    for incremental in (False, True):
+        Remote(primary).deploy(archive, zip_file, "minimal_plugin", False, incremental=incremental, root=root)
+        assert root.joinpath("minimal_plugin", "metadata.txt").exists()
+        assert sorted(p.name for p in root.iterdir()) == [MANIFEST_FILE, "minimal_plugin"]
+        assert not any(primary.iterdir())
+
+
+def test_deploy_invalid_archive(tmp_path: Path):
+    """Test that an invalid archive does not remove the existing installation."""
+    zip_file = tmp_path.joinpath("invalid.zip")
+    with zipfile.ZipFile(zip_file, "w") as z:
+        z.writestr("minimal_plugin/__init__.py", "")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/invalid.zip", "invalid.zip")
+
+    existing = tmp_path.joinpath("minimal_plugin")
+    existing.mkdir()
+    existing.joinpath("metadata.txt").touch()
+
+    remote = Remote(tmp_path)
+    with pytest.raises(PluginManagerError, match=r"metadata\.txt missing"):
+        remote.deploy(archive, zip_file, plugin_folder="minimal_plugin", remove_zip=False)
+
+    assert existing.joinpath("metadata.txt").exists()
+    assert not existing.joinpath("__init__.py").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["invalid.zip", "minimal_plugin"]
+
+
+def test_deploy_rollback(fixtures: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that the existing installation is restored if the swap fails."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip")
+
+    existing = tmp_path.joinpath("minimal_plugin")
+    existing.mkdir()
+    existing.joinpath("old.py").touch()
+
+    rename = Path.rename
+
+    def failing_rename(self: Path, target: Path) -> Path:
+        if self.parent.name == "new":
+            raise PermissionError("Permission denied")
+        return rename(self, target)
+
+    monkeypatch.setattr(Path, "rename", failing_rename)
+
+    remote = Remote(tmp_path)
+    with pytest.raises(PluginManagerError, match="existing version kept"):
+        remote.deploy(archive, zip_file, plugin_folder="minimal_plugin", remove_zip=False)
+
+    assert existing.joinpath("old.py").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["minimal_plugin"]
+
+
+def test_deploy_stale_staging(fixtures: Path, tmp_path: Path):
+    """Test that staging folders of interrupted installations are removed."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip")
+
+    # Interrupted after moving the existing installation
+    stale = tmp_path.joinpath(".staging-Minimal-0000")
+    stale.joinpath("old", "minimal_plugin").mkdir(parents=True)
+    stale.joinpath("old", "minimal_plugin", "old.py").touch()
+    stale.joinpath(STAGING_LOCK).touch()
+    # Being created and other plugin
+    created = tmp_path.joinpath(".staging-Minimal-0001")
+    created.mkdir()
+    other = tmp_path.joinpath(".staging-Minimal_other-0000")
+    other.mkdir()
+    other.joinpath(STAGING_LOCK).touch()
+
+    # Running installation, locked by another process: the folder
+    # name does not tell whether its process is still running
+    running = tmp_path.joinpath(".staging-Minimal-0002")
+    running.mkdir()
+    running.joinpath(STAGING_LOCK).touch()
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import fcntl, sys; f = open(sys.argv[1], 'rb'); fcntl.flock(f, fcntl.LOCK_EX); "
+            "print(flush=True); sys.stdin.read()",
+            str(running.joinpath(STAGING_LOCK)),
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        holder.stdout.readline()  # type: ignore [union-attr]
+        Remote._remove_stale_staging("Minimal", tmp_path)
+    finally:
+        holder.communicate()
+
+    assert not stale.exists()
+    assert created.exists()
+    assert other.exists()
+    assert running.exists()
+    assert tmp_path.joinpath("minimal_plugin", "old.py").exists()
+
+    # The process of the running installation has exited
+    stale.mkdir()
+    stale.joinpath(STAGING_LOCK).touch()
+    remote = Remote(tmp_path)
+    remote.deploy(archive, zip_file, plugin_folder="minimal_plugin", remove_zip=False)
+    assert not stale.exists()
+    assert not running.exists()
+    assert not tmp_path.joinpath("minimal_plugin", "old.py").exists()
+
+
+def test_deploy_staging_in_use(fixtures: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that the staging folder is locked while installing."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip")
+
+    remote = Remote(tmp_path)
+    staged = remote._staged_folders
+
+    def concurrent_install(plugin_name: str, staging: Path) -> Sequence[Path]:
+        # Another command installing the same plugin
+        Remote._remove_stale_staging(plugin_name, tmp_path)
+        assert staging.exists()
+        return staged(plugin_name, staging)
+
+    monkeypatch.setattr(remote, "_staged_folders", concurrent_install)
+    remote.deploy(archive, zip_file, remove_zip=False)
+    assert tmp_path.joinpath("minimal_plugin", "metadata.txt").exists()
+
+
+def test_deploy_fix_permissions(fixtures: Path, tmp_path: Path):
+    """Test that permissions are only applied to the installed plugin."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip")
+
+    other = tmp_path.joinpath("other_plugin")
+    other.mkdir()
+    other.joinpath("metadata.txt").touch(mode=0o600)
+
+    umask = os.umask(0o077)
+    try:
+        remote = Remote(tmp_path)
+        remote.deploy(
+            archive,
+            zip_file,
+            remove_zip=False,
+            fix_permissions=True,
+            owner=(os.getuid(), os.getgid()),
+        )
+    finally:
+        os.umask(umask)
+
+    plugin = tmp_path.joinpath("minimal_plugin")
+    assert stat.S_IMODE(plugin.stat().st_mode) == 0o755
+    assert stat.S_IMODE(plugin.joinpath("metadata.txt").stat().st_mode) == 0o644
+    assert stat.S_IMODE(plugin.joinpath("__init__.py").stat().st_mode) == 0o644
+    # Other plugins are not touched
+    assert stat.S_IMODE(other.joinpath("metadata.txt").stat().st_mode) == 0o600
+
+
+def test_deploy_incremental(fixtures: Path, tmp_path: Path):
+    """Test that only changed files are written."""
+    zip_file = fixtures.joinpath("xml_files", "minimal_plugin.zip")
+    archive = Archive("Minimal", "1.0.0", "https://foo.bar/minimal.zip", "minimal.zip")
+
+    with zipfile.ZipFile(zip_file) as z:
+        z.extractall(tmp_path)
+
+    plugin = tmp_path.joinpath("minimal_plugin")
+    metadata = plugin.joinpath("metadata.txt").stat()
+    plugin.joinpath("__init__.py").write_text("# changed")
+    plugin.joinpath("stale").mkdir()
+    plugin.joinpath("stale", "old.py").touch()
+
+    remote = Remote(tmp_path)
+    remote.deploy(
+        archive,
+        zip_file,
+        plugin_folder="minimal_plugin",
+        remove_zip=False,
+        incremental=True,
+    )
+
+    # Unchanged file has not been rewritten
+    assert plugin.joinpath("metadata.txt").stat().st_ino == metadata.st_ino
+    with zipfile.ZipFile(zip_file) as z:
+        assert plugin.joinpath("__init__.py").read_bytes() == z.read("minimal_plugin/__init__.py")
+    assert not plugin.joinpath("stale").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [MANIFEST_FILE, "minimal_plugin"]
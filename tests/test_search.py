@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+
+from qgis_plugin_manager.definitions import Plugin
+from qgis_plugin_manager.remote import Remote
+from qgis_plugin_manager.search import PREFIX_SCORE, NameSuggestions, SearchIndex, edit_distance
+from qgis_plugin_manager.utils import get_semver_version
+
+
+@pytest.fixture
+def index(fixtures: Path) -> SearchIndex:
+    xml_files = fixtures.joinpath("xml_files")
+    remote = Remote(xml_files)
+    plugins: dict = {}
+    remote._parse_xml(xml_files.joinpath("lizmap/lizmap.xml"), plugins)
+    remote._parse_xml(xml_files.joinpath("dataplotly/dataplotly.xml"), plugins)
+    return SearchIndex.build(plugins)
+
+
+def names(results):
+    return [name for name, _ in results]
+
+
+def test_search_ranking(index: SearchIndex):
+    """Test that results are ranked."""
+    # Exact name first
+    assert names(index.search("lizmap")) == ["Lizmap", "Lizmap server"]
+    assert names(index.search("lizmap server"))[0] == "Lizmap server"
+    assert names(index.search("Data Plotly")) == ["Data Plotly"]
+    assert names(index.search("lizmap", limit=1)) == ["Lizmap"]
+
+
+def test_search_fields(index: SearchIndex):
+    """Test searching in tags and descriptions."""
+    # Tags
+    assert names(index.search("dataviz")) == ["Data Plotly"]
+    assert names(index.search("webgis")) == ["Lizmap"]
+    # Description
+    assert "Data Plotly" in names(index.search("d3 plots"))
+    assert index.search("foo") == []
+
+
+def test_search_fuzzy(index: SearchIndex):
+    """Test fuzzy matching of search terms."""
+    # Prefix
+    assert names(index.search("lizma")) == ["Lizmap", "Lizmap server"]
+    # Typo
+    assert names(index.search("dataplotyl")) == ["Data Plotly"]
+
+
+def test_search_fuzzy_short_names():
+    """Test one-typo queries on short plugin names."""
+    version = get_semver_version("1.0.0")
+    index = SearchIndex.build({
+        name: (Plugin(name, version, "1.0.0"),) for name in ("Minimal", "QuickOSM", "QuickWKT", "Lizmap")
+    })
+    assert names(index.search("minmal")) == ["Minimal"]
+    assert names(index.search("quikosm")) == ["QuickOSM"]
+    assert index.search("quikwtk") == []
+
+
+def test_search_prefix(index: SearchIndex):
+    """Test prefix matches of indexed tokens."""
+    prefixed = [token for token, score in index._matches("plot") if score == PREFIX_SCORE]
+    assert prefixed == sorted(
+        token for token in index._postings if token.startswith("plot") and token != "plot"
+    )
+    assert "plotly" in prefixed
+    assert [token for token, score in index._matches("zzz") if score == PREFIX_SCORE] == []
+
+
+def test_search_tags(index: SearchIndex):
+    """Test filtering by tags."""
+    assert names(index.search("", tags=["cloud"])) == ["Lizmap", "Lizmap server"]
+    assert names(index.search("lizmap", tags=["webgis"])) == ["Lizmap"]
+    assert names(index.search("", tags=["Cloud", "webgis"])) == ["Lizmap"]
+    assert index.search("plotly", tags=["cloud"]) == []
+
+
+def test_edit_distance():
+    assert edit_distance("lizmap", "lizmap") == 0
+    assert edit_distance("lizma", "lizmap") == 1
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("", "abc") == 3
+
+
+def test_name_suggestions():
+    """Test suggestions of similar plugin names."""
+    suggestions = NameSuggestions.build(
+        ["Lizmap", "Lizmap server", "Data Plotly", "QuickOSM", "QuickWKT", "a"],
+    )
+    assert suggestions.suggest("lizma") == ["Lizmap"]
+    assert suggestions.suggest("Quickosm") == ["QuickOSM"]
+    assert suggestions.suggest("dataplotly") == ["Data Plotly"]
+    assert suggestions.suggest("lizmapserver") == ["Lizmap server"]
+    # Sorted by distance
+    assert suggestions.suggest("quickosm", max_distance=3) == ["QuickOSM", "QuickWKT"]
+    assert suggestions.suggest("foo") == []
@@ -0,0 +1,105 @@
+"""Startup time of the command line
+
+Commands import only the modules they use, the remote module and its
+dependencies are loaded by commands reading remote sources only.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+from typing import Dict, Sequence
+
+import pytest
+
+# Maximum import time of the command line module, in milliseconds
+IMPORT_BUDGET = int(os.getenv("QGIS_PLUGIN_MANAGER_IMPORT_BUDGET", "120"))
+
+# Modules not needed by commands working on local plugins
+REMOTE_MODULES = (
+    "qgis_plugin_manager.remote",
+    "qgis_plugin_manager.connections",
+    "qgis_plugin_manager.index",
+    "qgis_plugin_manager.archives",
+    "http.client",
+    "urllib.request",
+    "zipfile",
+)
+
+
+def python(rootdir: Path, *args: str, **env: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        (sys.executable, *args),
+        cwd=rootdir.parent,
+        env={**os.environ, "PYTHONPATH": str(rootdir.parent), **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(rootdir: Path) -> Dict[str, int]:
+    """Cumulative import time of each module, in microseconds"""
+    proc = python(rootdir, "-X", "importtime", "-c", "import qgis_plugin_manager.__main__")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdecimal():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def loaded_modules(rootdir: Path, argv: Sequence[str], **env: str) -> Sequence[str]:
+    """Modules loaded by running a command"""
+    code = (
+        "import json, sys\n"
+        "from qgis_plugin_manager.__main__ import main\n"
+        f"sys.argv = ['qgis-plugin-manager', *{list(argv)!r}]\n"
+        "try:\n"
+        "    main()\n"
+        "finally:\n"
+        "    print(json.dumps(sorted(sys.modules)), file=sys.stderr)\n"
+    )
+    proc = python(rootdir, "-c", code, **env)
+    return json.loads(proc.stderr.splitlines()[-1])
+
+
+def test_import_budget(rootdir: Path):
+    """Test the import time of the command line module."""
+    times = import_times(rootdir)
+    for name in ("semver", "configparser", *REMOTE_MODULES):
+        assert name not in times, f"{name} imported at startup"
+
+    # Best of a few runs, the first one may compile the modules
+    best = min(import_times(rootdir)["qgis_plugin_manager.__main__"] for _ in range(3))
+    assert best / 1000 < IMPORT_BUDGET
+
+
+def test_list_imports(rootdir: Path, plugins: Path):
+    """Test the modules loaded by the 'list' command."""
+    modules = loaded_modules(
+        rootdir,
+        ("list", "--format", "json"),
+        QGIS_PLUGINPATH=str(plugins),
+        QGIS_PLUGIN_MANAGER_QGIS_VERSION="3.34",
+    )
+    assert "qgis_plugin_manager.local_directory" in modules
+    for name in REMOTE_MODULES:
+        assert name not in modules
+
+
+def test_command_arguments(capsys: pytest.CaptureFixture):
+    """Test that arguments of commands are set up when parsing."""
+    from qgis_plugin_manager.__main__ import cli
+
+    args = cli.parse_args(["install", "-j", "2", "Lizmap==3.0"])
+    assert args.command == "install"
+    assert args.jobs == 2
+    assert args.plugin_name == ["Lizmap==3.0"]
+
+    with pytest.raises(SystemExit):
+        cli.parse_args(["upgrade", "--help"])
+    assert "--incremental" in capsys.readouterr().out
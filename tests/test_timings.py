@@ -0,0 +1,50 @@
+import json
+import threading
+
+import pytest
+
+from qgis_plugin_manager.timings import Timings
+
+
+def test_timings(capsys: pytest.CaptureFixture):
+    """Test recording phases for the command and for plugins."""
+    timings = Timings()
+    timings.start("upgrade")
+
+    with timings.phase("resolve"):
+        pass
+
+    def download(name: str):
+        with timings.phase("download", name):
+            timings.add("download", size=100, count=0)
+
+    threads = [threading.Thread(target=download, args=(name,)) for name in ("A", "B")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with timings.phase("extract", "A"):
+        # Recorded for the plugin of the enclosing phase
+        with timings.phase("permissions"):
+            pass
+        with timings.phase("permissions"):
+            pass
+
+    data = timings.as_dict()
+    assert data["command"] == "upgrade"
+    assert data["phases"]["resolve"]["count"] == 1
+    assert data["phases"]["download"]["count"] == 2
+    assert data["phases"]["download"]["bytes"] == 200
+    assert data["items"]["A"]["download"]["bytes"] == 100
+    assert data["items"]["A"]["permissions"]["count"] == 2
+    assert sorted(data["items"]) == ["A", "B"]
+    assert "resolve" not in data["items"]["A"]
+
+    timings.report("json")
+    assert json.loads(capsys.readouterr().err)["phases"].keys() == data["phases"].keys()
+
+    timings.report()
+    err = capsys.readouterr().err
+    assert "Timings of 'upgrade'" in err
+    assert "permissions" in err
@@ -2,30 +2,77 @@ __copyright__ = "Copyright 2021, 3Liz"
 __license__ = "GPL version 3"
 __email__ = "info@3liz.org"
 
+import hashlib
+import io
 import unittest
 
-from qgis_plugin_manager.utils import similar_names
+from argparse import ArgumentTypeError
+
+from qgis_plugin_manager.utils import (
+    CHUNK_SIZE,
+    copy_stream,
+    get_semver_version,
+    parse_limit,
+    parse_owner,
+    version_key,
+)
 
 
 class TestUtils(unittest.TestCase):
-    def test_similar_names(self):
-        """Test about similar names in the XML file."""
-        # typo wanted
-        self.assertListEqual(
-            ["Lizmap"],
-            list(similar_names("lizma", ["a", "Lizmap", "QuickOSM"])),
-        )
+    def test_version_key(self):
+        """Test comparison keys of versions."""
+        versions = [
+            "1.0.0-alpha",
+            "1.0.0-alpha.1",
+            "1.0.0-alpha.beta",
+            "1.0.0-beta.2",
+            "1.0.0-beta.11",
+            "1.0.0",
+        ]
+        keys = [version_key(get_semver_version(v)) for v in versions]
+        self.assertListEqual(keys, sorted(keys))
 
-        existing = ["data plotly", "DATA PLOTLY", "Data   PLOTLY"]
+        # Same precedence than semver, without build
+        for a in versions:
+            for b in versions:
+                va, vb = get_semver_version(a), get_semver_version(b)
+                self.assertEqual(va < vb, version_key(va) < version_key(vb))
 
-        # lower case
-        self.assertListEqual(
-            existing,
-            list(similar_names("dataplotly", existing)),
+        # Build is compared lexicographically
+        self.assertLess(
+            version_key(get_semver_version("2.4.0")),
+            version_key(get_semver_version("2.4.0.1")),
         )
-
-        # upper case
-        self.assertListEqual(
-            existing,
-            list(similar_names("DATA PLOT LY", existing)),
+        self.assertLess(
+            version_key(get_semver_version("2.4.0.1")),
+            version_key(get_semver_version("2.4.0.2")),
         )
+
+        # Memoized
+        self.assertIs(get_semver_version("3.16"), get_semver_version("3.16"))
+
+    def test_copy_stream(self):
+        data = bytes(range(256)) * (3 * CHUNK_SIZE // 256 + 7)
+        output = io.BytesIO()
+        size, digest = copy_stream(io.BytesIO(data), output, "data", len(data))
+        self.assertEqual(size, len(data))
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+        self.assertEqual(output.getvalue(), data)
+
+    def test_parse_owner(self):
+        self.assertEqual(parse_owner("1000:1001"), (1000, 1001))
+        self.assertEqual(parse_owner("1000"), (1000, -1))
+        self.assertEqual(parse_owner(":1001"), (-1, 1001))
+        self.assertEqual(parse_owner("root:root"), (0, 0))
+        with self.assertRaisesRegex(ArgumentTypeError, "Unknown user or group: no-such-user-qgis"):
+            parse_owner("no-such-user-qgis")
+        with self.assertRaisesRegex(ArgumentTypeError, "Invalid owner"):
+            parse_owner(":")
+
+    def test_parse_limit(self):
+        self.assertEqual(parse_limit("0"), 0)
+        self.assertEqual(parse_limit("10"), 10)
+        with self.assertRaisesRegex(ArgumentTypeError, "must be non-negative"):
+            parse_limit("-1")
+        with self.assertRaisesRegex(ArgumentTypeError, "Invalid limit: foo"):
+            parse_limit("foo")